@@ -1,16 +1,19 @@
 
-from flask import jsonify
+from flask import jsonify, request
 from app import app
 from models import Player
+from http_cache import conditional
 
 @app.route('/api/leaderboard')
+@conditional()
 def api_leaderboard():
     """API endpoint for leaderboard data with fallback"""
     try:
         sort_by = request.args.get('sort', 'experience')
         limit = min(int(request.args.get('limit', 50)), 100)
         
-        players = Player.get_leaderboard(sort_by=sort_by, limit=limit) or []
+        from leaderboard_rows import leaderboard
+        players = leaderboard(sort_by=sort_by, limit=limit)
         
         # Convert players to dict format
         players_data = []
@@ -18,6 +21,11 @@ def api_leaderboard():
             players_data.append({
                 'id': player.id,
                 'nickname': player.nickname,
+                'role': player.display_role,
+                'nickname_gradient': player.nickname_gradient,
+                'name_color': player.name_color,
+                'role_gradient': player.role_gradient,
+                'role_color': player.role_color,
                 'level': player.level,
                 'experience': player.experience,
                 'kills': player.kills,
@@ -28,13 +28,9 @@ instance_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instanc
 os.makedirs(instance_dir, exist_ok=True)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url or f'sqlite:///{os.path.join(instance_dir, "bedwars_leaderboard.db")}'
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_size": 3,
-    "max_overflow": 0,
-    "pool_timeout": 10,
-    "pool_recycle": 280,
-    "pool_pre_ping": True,
-}
+# Pool and connection settings per backend (DB_PROFILE, see engine_profiles.py)
+from engine_profiles import engine_options, init_engine_profile
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # Custom Jinja2 filters
@@ -69,91 +65,44 @@ def hex_to_rgb_filter(hex_color):
 
 # Initialize the app with the extension
 db.init_app(app)
+init_engine_profile(app, db)
 
 # Register translation filter
 from translations import register_translation_filter
 register_translation_filter(app)
 
-# Import routes first
-import routes
-try:
-    import api_routes
-except ImportError:
-    pass  # API routes are optional
+# Fingerprinted, precompressed static assets and on-the-fly response compression
+from assets import init_assets
+init_assets(app)
 
-with app.app_context():
-    # Import models to ensure tables are created
-    from models import Player, Quest, PlayerQuest, Achievement, PlayerAchievement, CustomTitle, PlayerTitle, GradientTheme, PlayerGradientSetting, SiteTheme, ShopItem, ShopPurchase, CursorTheme, Clan, ClanMember, Tournament, TournamentParticipant, PlayerActiveBooster, AdminCustomRole, PlayerAdminRole, Badge, PlayerBadge
+# Deduplicated, sprited and downscaled custom emojis
+from emoji_sprites import init_emoji_sprites
+init_emoji_sprites(app)
 
-    try:
-        # Always recreate tables to ensure schema is up to date
-        app.logger.info("Updating database schema...")
-        db.drop_all()
-        db.create_all()
-
-        # Test database connection
-        db.session.execute(db.text('SELECT 1')).fetchone()
-
-        # Initialize default data
-        try:
-            if SiteTheme.query.count() == 0:
-                SiteTheme.create_default_themes()
-        except:
-            pass
-
-        try:
-            if Quest.query.count() == 0:
-                Quest.create_default_quests()
-        except:
-            pass
-
-        try:
-            if Achievement.query.count() == 0:
-                Achievement.create_default_achievements()
-        except:
-            pass
-
-        try:
-            if CustomTitle.query.count() == 0:
-                CustomTitle.create_default_titles()
-        except:
-            pass
-
-        try:
-            if GradientTheme.query.count() == 0:
-                GradientTheme.create_default_themes()
-        except:
-            pass
-
-        try:
-            if CursorTheme.query.count() == 0:
-                CursorTheme.create_default_cursors()
-        except:
-            pass
-
-        try:
-            if ShopItem.query.count() == 0:
-                ShopItem.create_default_items()
-        except:
-            pass
-
-        try:
-            if Badge.query.count() == 0:
-                Badge.create_default_badges()
-        except:
-            pass
-
-        app.logger.info("Database initialized successfully!")
-
-    except Exception as e:
-        app.logger.error(f"Database initialization error: {e}")
-        # Continue anyway - errors will be handled in routes
+# Views (routes, api_routes) are imported on the first request
+from lazy_views import init_lazy_views
+init_lazy_views(app)
 
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        print("🏗️ Database initialized successfully!")
+# Register flush hooks that keep clan aggregates in sync with member stats
+import clan_stats
+
+# Register the flush hook that records stat changes as match history facts
+import match_history
+
+# Register the commit hooks that bump the global data version used by caches
+import data_version
 
+# Register the per-player fragment cache and its invalidation hook
+import fragment_cache
+
+# Register the hooks that maintain the denormalized leaderboard rows
+import leaderboard_rows
+
+# Apply pending schema migrations (once, under a lock) instead of recreating the schema
+from migrations import upgrade_on_startup
+upgrade_on_startup()
+
+if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug_mode = os.environ.get('FLASK_ENV') != 'production'
     app.run(host='0.0.0.0', port=port, debug=debug_mode)
\ No newline at end of file
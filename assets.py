@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline and response compression.
+
+At startup (or with `python assets.py build` as a build step) every CSS and JS
+file under static/css and static/js is minified and written to static/dist
+under a content-hashed name, e.g. css/style.3f2a9c1e.css, next to precompressed
+.gz (and .br when the brotli package is installed) variants. url_for('static')
+is rewritten to the hashed names, and those files are served with one-year
+immutable caching, picking the precompressed variant the client accepts.
+
+CSS is minified here; JS is only minified when rjsmin is installed, since a
+safe JS minifier needs a real tokenizer. HTML and JSON responses above
+COMPRESS_MIN_SIZE bytes are compressed on the fly.
+
+Usage: python assets.py build
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+ASSET_DIRS = ('css', 'js')
+DIST_DIR = 'dist'
+HASH_LENGTH = 10
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MIMETYPES = ('text/html', 'application/json', 'text/css', 'application/javascript', 'text/csv')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_CSS_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_CSS_COMMENTS = re.compile(r'/\*.*?\*/', re.S)
+
+# Precompressed variants in order of preference: (encoding, file suffix)
+_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace outside string literals"""
+    parts = _CSS_STRINGS.split(_CSS_COMMENTS.sub('', css))
+    for i in range(0, len(parts), 2):  # even items are outside strings
+        code = re.sub(r'\s+', ' ', parts[i])
+        code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+        parts[i] = code.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(js):
+    return rjsmin.jsmin(js) if rjsmin else js
+
+
+def _write(path, data):
+    """Atomic write, so workers building at the same time never serve a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as out:
+        out.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_dir):
+    """Minify, fingerprint and precompress the assets; returns {source name: dist name}"""
+    manifest = {}
+    for folder in ASSET_DIRS:
+        source_dir = os.path.join(static_dir, folder)
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext not in ('.css', '.js'):
+                continue
+            with open(os.path.join(source_dir, name), encoding='utf-8') as source:
+                text = source.read()
+            data = (minify_css(text) if ext == '.css' else minify_js(text)).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            hashed = f'{DIST_DIR}/{folder}/{stem}.{digest}{ext}'
+            target = os.path.join(static_dir, hashed)
+            if not os.path.exists(target):
+                _write(target + '.gz', gzip.compress(data, 9, mtime=0))
+                if brotli:
+                    _write(target + '.br', brotli.compress(data, quality=11))
+                _write(target, data)
+            manifest[f'{folder}/{name}'] = hashed
+    return manifest
+
+
+def _accepts(encoding):
+    return encoding in request.accept_encodings
+
+
+def _serve_hashed(static_dir, filename):
+    """A fingerprinted file, precompressed when the client accepts it"""
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in _VARIANTS:
+        if _accepts(encoding) and os.path.exists(os.path.join(static_dir, filename + suffix)):
+            response = send_from_directory(static_dir, filename + suffix, mimetype=mimetype,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(static_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
+def compress_response(response):
+    """after_request hook: compress text responses above the size threshold"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if brotli and _accepts('br'):
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif _accepts('gzip'):
+        response.set_data(gzip.compress(data, GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # A strong ETag must differ between the encoded and identity representations
+        response.set_etag(f'{etag}-{response.headers["Content-Encoding"]}')
+    return response
+
+
+def init_assets(app):
+    """Build the assets and hook the rewritten URLs, static serving and compression into the app"""
+    static_dir = app.static_folder
+    try:
+        manifest = build_assets(static_dir)
+    except OSError as e:
+        app.logger.error(f"Asset build failed, serving unprocessed files: {e}")
+        manifest = {}
+    app.config['ASSET_MANIFEST'] = manifest
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    serve_static = app.view_functions['static']
+
+    def static(filename):
+        if filename.startswith(DIST_DIR + '/'):
+            return _serve_hashed(static_dir, filename)
+        return serve_static(filename=filename)
+
+    app.view_functions['static'] = static
+    app.after_request(compress_response)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if sys.argv[1:] != ['build']:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    static_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for source_name, dist_name in build_assets(static_root).items():
+        print(f"{source_name} -> {dist_name}")
@@ -0,0 +1,351 @@
+"""
+Full database backup and restore as NDJSON.
+
+The backup is a stream of JSON lines: a header, then one record per row tagged
+with its table, written table-by-table in foreign-key order with a marker after
+each finished table, then an end marker::
+
+    {"type": "header", "format": "bedwars-backup", "version": 1, "tables": [...]}
+    {"table": "player", "row": {"id": 1, "nickname": "...", ...}}
+    {"type": "table_end", "table": "player", "rows": 1}
+    {"type": "end"}
+
+Rows are read in primary-key order with keyset chunks, so memory is bounded
+by the chunk size. An interrupted download can be resumed by passing the last
+table and row id it contains; the stream then starts right after that row.
+"""
+
+import gzip
+import io
+import itertools
+import json
+from datetime import datetime, date
+
+from sqlalchemy import select, insert, func, text, UniqueConstraint, DateTime, Date
+
+from app import db
+
+BACKUP_FORMAT = 'bedwars-backup'
+BACKUP_VERSION = 1
+BACKUP_CHUNK_SIZE = 2000
+
+
+def backup_tables():
+    """All model tables in foreign-key dependency order, minus derived read models"""
+    return [table for table in db.metadata.sorted_tables if not table.info.get('derived')]
+
+
+def _json_default(value):
+    """JSON encoding for dates and other non-JSON column values"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _line(record):
+    """Serialize one NDJSON record"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n'
+
+
+def table_chunks(connection, table, after_id=None, chunk_size=BACKUP_CHUNK_SIZE):
+    """Yield lists of row mappings of a table in id order, one keyset chunk at a time"""
+    last_id = after_id
+    while True:
+        query = select(table).order_by(table.c.id).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        rows = connection.execute(query).mappings().all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def backup_stream(resume_table=None, resume_id=None, chunk_size=BACKUP_CHUNK_SIZE):
+    """Return a generator of the backup as NDJSON text, one string per chunk of rows.
+
+    resume_table/resume_id restart an interrupted backup right after the last
+    row received; tables before resume_table are skipped. Raises ValueError
+    for an unknown table before anything is streamed.
+    """
+    tables = backup_tables()
+    names = [table.name for table in tables]
+    if resume_table is not None and resume_table not in names:
+        raise ValueError(f"Unknown table: {resume_table}")
+    return _backup_lines(tables, resume_table, resume_id, chunk_size)
+
+
+def _backup_lines(tables, resume_table, resume_id, chunk_size):
+    """Generator behind backup_stream"""
+    names = [table.name for table in tables]
+    yield _line({'type': 'header', 'format': BACKUP_FORMAT, 'version': BACKUP_VERSION,
+                 'created_at': datetime.utcnow(), 'tables': names,
+                 'resumed_from': [resume_table, resume_id] if resume_table else None})
+
+    connection = db.session.connection()
+    skipping = resume_table is not None
+    for table in tables:
+        after_id = None
+        if skipping:
+            if table.name != resume_table:
+                continue
+            skipping, after_id = False, resume_id
+
+        count = 0
+        for rows in table_chunks(connection, table, after_id, chunk_size):
+            count += len(rows)
+            yield ''.join(_line({'table': table.name, 'row': dict(row)}) for row in rows)
+        yield _line({'type': 'table_end', 'table': table.name, 'rows': count})
+
+    yield _line({'type': 'end'})
+
+
+# Restore
+
+IMPORT_CHUNK_SIZE = 2000
+
+# Legacy single-document JSON backups (old /admin/export-db) -> table names
+LEGACY_SECTIONS = {
+    'players': 'player',
+    'quests': 'quest',
+    'achievements': 'achievement',
+    'custom_titles': 'custom_title',
+    'gradient_themes': 'gradient_theme',
+    'shop_items': 'shop_item',
+}
+
+
+def read_backup(stream):
+    """Yield backup records from a binary file object, parsing it incrementally.
+
+    Accepts NDJSON (optionally gzip-compressed) and, for old backups, the
+    legacy single JSON document, which is converted to the same records.
+    """
+    head = stream.read(2)
+    stream.seek(0)
+    if head == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    first = text.readline()
+    if first.strip() in ('{', '{}') or (first.startswith('{') and not first.rstrip().endswith('}')):
+        legacy = json.loads(first + text.read())
+        for section, table in LEGACY_SECTIONS.items():
+            for row in legacy.get(section, []):
+                yield {'table': table, 'row': row}
+        return
+
+    for line in itertools.chain([first], text):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _seed_keys():
+    """Natural keys seeds.py matches the default data on, by table"""
+    import models
+    from seeds import SEEDS
+    return {getattr(models, model_name).__tablename__: (key,) for model_name, key in SEEDS.values()}
+
+
+def _natural_key(table):
+    """Columns identifying an existing row, and the flag column a partial key is limited to.
+
+    A unique column or constraint, else the key seeds.py uses for default data,
+    else a unique index; a partial index (one active clan membership per
+    player) only identifies the rows its WHERE flag selects.
+    """
+    for column in table.columns:
+        if column.unique and not column.primary_key:
+            return (column.name,), None
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            return tuple(column.name for column in constraint.columns), None
+    seed_key = _seed_keys().get(table.name)
+    if seed_key:
+        return seed_key, None
+    for index in table.indexes:
+        if index.unique:
+            where = index.dialect_kwargs.get('sqlite_where')
+            if where is None:
+                where = index.dialect_kwargs.get('postgresql_where')
+            return tuple(column.name for column in index.columns), (where.left.name if where is not None else None)
+    return None, None
+
+
+def _converters(table):
+    """Per-column parsers for values JSON cannot carry natively"""
+    converters = {}
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            converters[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            converters[column.name] = lambda value: date.fromisoformat(value[:10])
+    return converters
+
+
+def sync_id_sequence(session, table_name):
+    """After inserting explicit ids on PostgreSQL, move the table's id sequence past them"""
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+        f"GREATEST((SELECT MAX(id) FROM \"{table_name}\"), 1))"
+    ))
+
+
+class BackupImporter:
+    """Restores backup records with chunked bulk inserts.
+
+    Rows whose natural key already exists are skipped (and their old id mapped
+    to the existing row); new rows get ids above the table's current maximum
+    and are inserted with executemany in chunks, each committed separately.
+    Foreign keys are rewritten through per-table old id -> new id maps.
+    """
+
+    def __init__(self, session, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.tables = {table.name: table for table in backup_tables()}
+        self.id_maps = {}
+        self.stats = {}
+        self._table = None
+        self._pending = []
+
+    def clear_all(self):
+        """Delete every row of every table, children first"""
+        for table in reversed(backup_tables()):
+            self.session.execute(table.delete())
+        self.session.commit()
+
+    def run(self, records):
+        """Import an iterable of backup records; returns per-table inserted/skipped counts"""
+        for record in records:
+            table_name = record.get('table')
+            if 'row' not in record or table_name not in self.tables:
+                continue
+            if table_name != self._table:
+                self._flush()
+                self._finish_table()
+                self._start_table(table_name)
+            self._pending.append(record['row'])
+            if len(self._pending) >= self.chunk_size:
+                self._flush()
+        self._flush()
+        self._finish_table()
+
+        # Derived read models are not in backups; rebuild them from the imported rows
+        from leaderboard_rows import refresh_rows
+        refresh_rows(self.session.connection())
+        self.session.commit()
+        return self.stats
+
+    def _finish_table(self):
+        """Move a PostgreSQL id sequence past the explicitly inserted ids"""
+        if self._table is not None:
+            sync_id_sequence(self.session, self._table)
+            self.session.commit()
+
+    def _start_table(self, table_name):
+        """Prepare column filters, converters and the natural-key index for a table"""
+        table = self.tables[table_name]
+        self._table = table_name
+        self._columns = {column.name for column in table.columns} - {'id'}
+        self._convert = _converters(table)
+        self._foreign_keys = {fk.parent.name: (fk.column.table.name, fk.parent.nullable)
+                              for fk in table.foreign_keys}
+        self._key, self._key_flag = _natural_key(table)
+        if self._key_flag:
+            default = table.c[self._key_flag].default
+            self._key_flag_default = default.arg if default is not None and default.is_scalar else None
+        self._next_id = (self.session.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+        self._existing = {}
+        if self._key:
+            key_columns = [table.c[name] for name in self._key]
+            query = select(table.c.id, *key_columns)
+            if self._key_flag:
+                query = query.where(table.c[self._key_flag] == True)
+            for row in self.session.execute(query):
+                self._existing[tuple(row[1:])] = row[0]
+        self.id_maps.setdefault(table_name, {})
+        self.stats.setdefault(table_name, {'inserted': 0, 'skipped': 0})
+
+    def _remap(self, row):
+        """Rewrite foreign keys to new ids; returns None if a required parent is missing"""
+        for column, (parent, nullable) in self._foreign_keys.items():
+            value = row.get(column)
+            if value is None or parent not in self.id_maps:
+                continue  # parent table not part of this backup: keep the id as is
+            new_id = self.id_maps[parent].get(value)
+            if new_id is None and not nullable:
+                return None
+            row[column] = new_id
+        if self._table == 'rating_history':
+            parent = {'player': 'player', 'clan': 'clan'}.get(row.get('entity_type'))
+            if parent in self.id_maps:
+                row['entity_id'] = self.id_maps[parent].get(row.get('entity_id'))
+                if row['entity_id'] is None:
+                    return None
+        return row
+
+    def _keyed(self, row):
+        """Whether the natural key identifies this row (partial keys skip rows outside their flag)"""
+        if not self._key:
+            return False
+        return not self._key_flag or bool(row.get(self._key_flag, self._key_flag_default))
+
+    def _flush(self):
+        """Insert the pending chunk and commit it"""
+        if not self._pending:
+            return
+        table = self.tables[self._table]
+        id_map = self.id_maps[self._table]
+        stats = self.stats[self._table]
+
+        old_ids, rows = [], []
+        for raw in self._pending:
+            row = {name: value for name, value in raw.items() if name in self._columns}
+            for name, convert in self._convert.items():
+                if isinstance(row.get(name), str):
+                    row[name] = convert(row[name])
+            row = self._remap(row)
+            if row is None:
+                stats['skipped'] += 1
+                continue
+
+            if self._keyed(row):
+                key = tuple(row.get(name) for name in self._key)
+                existing_id = self._existing.get(key)
+                if existing_id is not None:
+                    if raw.get('id') is not None and existing_id > 0:
+                        id_map[raw['id']] = existing_id
+                    stats['skipped'] += 1
+                    continue
+                self._existing[key] = -1  # duplicate inside the backup itself
+            old_ids.append(raw.get('id'))
+            rows.append(row)
+        self._pending = []
+
+        # Ids are assigned here rather than by the database so the chunk can go
+        # out as one plain executemany; ascending backup ids are kept when free
+        for old_id, row in zip(old_ids, rows):
+            new_id = max(self._next_id, old_id) if isinstance(old_id, int) else self._next_id
+            self._next_id = new_id + 1
+            row['id'] = new_id
+            if old_id is not None:
+                id_map[old_id] = new_id
+            if self._keyed(row):
+                self._existing[tuple(row.get(name) for name in self._key)] = new_id
+
+        # Executemany needs identical keys in every parameter set, so rows that
+        # omit columns (older backups) are inserted in groups and get the defaults
+        groups = {}
+        for row in rows:
+            groups.setdefault(frozenset(row), []).append(row)
+        for group in groups.values():
+            self.session.execute(insert(table), group)
+        stats['inserted'] += len(rows)
+
+        self.session.commit()
+        if self.progress:
+            self.progress(self._table, stats)
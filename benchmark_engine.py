@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput of the DB_PROFILE connection profiles (see engine_profiles.py)
+
+Each profile runs in a fresh interpreter against its own copy of a throwaway
+SQLite database with synthetic players. Worker threads, each with its own app
+context and session, mix leaderboard reads with ORM stat updates (which fire
+the same flush hooks as production writes) for a fixed time. Reports reads and
+writes per second and failed operations (lock and pool timeouts).
+
+With a PostgreSQL DATABASE_URL the legacy and postgresql profiles run against
+that database instead; it must already be migrated.
+
+Usage: python benchmark_engine.py [--threads N] [--seconds S] [--write-ratio R]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PLAYERS = 2000
+# (label, extra environment)
+SQLITE_PROFILES = (
+    ('legacy', {'DB_PROFILE': 'legacy'}),
+    ('sqlite-safe', {'DB_PROFILE': 'sqlite-safe'}),
+    ('sqlite', {'DB_PROFILE': 'sqlite'}),
+    ('sqlite+lock', {'DB_PROFILE': 'sqlite', 'SQLITE_WRITER_LOCK': '1'}),
+)
+POSTGRES_PROFILES = (
+    ('legacy', {'DB_PROFILE': 'legacy'}),
+    ('postgresql', {'DB_PROFILE': 'postgresql'}),
+)
+
+
+def fill():
+    from sqlalchemy import insert
+    from app import app, db
+    from models import Player
+    from leaderboard_rows import refresh_rows
+
+    with app.app_context():
+        if Player.query.count():
+            return
+        rng = random.Random(42)
+        db.session.execute(insert(Player), [
+            {'nickname': f'player{i}', 'kills': rng.randint(0, 20000), 'deaths': rng.randint(1, 20000),
+             'games_played': rng.randint(1, 3000), 'wins': rng.randint(0, 1500),
+             'experience': rng.randint(0, 5000000)}
+            for i in range(PLAYERS)
+        ])
+        refresh_rows()
+        db.session.commit()
+
+
+def worker(player_ids, seconds, write_ratio, seed, counts, lock):
+    from app import app, db
+    from models import Player
+    from leaderboard_rows import leaderboard
+
+    rng = random.Random(seed)
+    reads = writes = errors = 0
+    with app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            try:
+                if rng.random() < write_ratio:
+                    player = db.session.get(Player, rng.choice(player_ids))
+                    player.experience += rng.randint(10, 500)
+                    player.kills += 1
+                    db.session.commit()
+                    writes += 1
+                else:
+                    leaderboard(rng.choice(('experience', 'kills', 'kd_ratio')), 50, rng.randint(0, 500))
+                    db.session.commit()
+                    reads += 1
+            except Exception:
+                db.session.rollback()
+                errors += 1
+        db.session.remove()
+    with lock:
+        counts['reads'] += reads
+        counts['writes'] += writes
+        counts['errors'] += errors
+
+
+def run_profile(args):
+    """Child process: drive the workload with the DB_PROFILE from the environment"""
+    from app import app, db
+    from models import Player
+
+    with app.app_context():
+        player_ids = [player_id for player_id, in db.session.query(Player.id)]
+        db.session.remove()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=worker,
+                                args=(player_ids, args.seconds, args.write_ratio, seed, counts, lock))
+               for seed in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    print(f"{os.environ['BENCHMARK_LABEL']:<12} {counts['reads'] / args.seconds:9.1f} reads/s "
+          f"{counts['writes'] / args.seconds:8.1f} writes/s {counts['errors']:6d} failed   "
+          f"pool {options.get('pool_size', 'default')}+{options.get('max_overflow', 'default')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        if os.environ.get('BENCHMARK_FILL'):
+            fill()
+        else:
+            run_profile(args)
+        return
+
+    child = [sys.executable, os.path.abspath(__file__), '--child', '--threads', str(args.threads),
+             '--seconds', str(args.seconds), '--write-ratio', str(args.write_ratio)]
+    env = dict(os.environ, GUNICORN_THREADS=str(args.threads), PAGE_CACHE_DISABLED='1')
+    print(f"{args.threads} threads, {args.seconds:g} s, {args.write_ratio:.0%} writes")
+
+    database_url = os.environ.get('DATABASE_URL', '')
+    if database_url.startswith(('postgres://', 'postgresql://')):
+        for label, extra in POSTGRES_PROFILES:
+            subprocess.run(child, env=dict(env, BENCHMARK_LABEL=label, **extra), check=True)
+        return
+
+    workdir = tempfile.mkdtemp()
+    base = os.path.join(workdir, 'base.db')
+    subprocess.run(child, env=dict(env, DATABASE_URL=f'sqlite:///{base}', DB_PROFILE='sqlite-safe',
+                                   BENCHMARK_FILL='1'), check=True, stderr=subprocess.DEVNULL)
+    for label, extra in SQLITE_PROFILES:
+        path = os.path.join(workdir, f'{label}.db')
+        shutil.copyfile(base, path)
+        subprocess.run(child, env=dict(env, DATABASE_URL=f'sqlite:///{path}', BENCHMARK_LABEL=label, **extra),
+                       check=True)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
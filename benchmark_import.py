@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start - importing the app and serving the first request
+
+Each run is a fresh interpreter (`python -X importtime`) against a throwaway
+SQLite database that has already been migrated, once with the views loaded on
+the first request (the default) and once eagerly (LAZY_VIEWS=0). Prints the
+median import time of `app`, the time of the first request, their sum - the
+time to the first response, which is what a cold start costs - and the modules
+with the largest self time.
+
+Lazy views make importing `app` cheaper for scripts that never serve a request
+(migrations, seeds, backups, rebuild tools); a web process pays the deferred
+cost on its first request, so its time to first response is about the same
+either way (under gunicorn the preloading master pays it before forking).
+
+The script exits non-zero when the median time to first response of the
+default configuration exceeds --budget-ms (DEFAULT_BUDGET_MS unless given),
+so it can gate a CI step.
+
+Usage: python benchmark_import.py [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Time to first response on one CPU was about 1 s; leave headroom for slower CI machines
+DEFAULT_BUDGET_MS = 2000
+
+# Runs in the child interpreter; prints the first request time in ms to stdout
+_FIRST_REQUEST = '''
+import time
+import app
+start = time.perf_counter()
+app.app.test_client().get('/')
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def parse_importtime(stderr):
+    """{module: (self us, cumulative us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _FIRST_REQUEST],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr), float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(label, env, runs):
+    imports, requests, self_times = [], [], {}
+    for _ in range(runs):
+        modules, first_request = run(env)
+        imports.append(modules['app'][1] / 1000)
+        requests.append(first_request)
+        for name, (self_us, _) in modules.items():
+            self_times.setdefault(name, []).append(self_us / 1000)
+    import_ms, request_ms = statistics.median(imports), statistics.median(requests)
+    print(f"{label:<24} import app {import_ms:7.1f} ms, first request {request_ms:7.1f} ms, "
+          f"total {import_ms + request_ms:7.1f} ms")
+    slowest = sorted(self_times.items(), key=lambda item: -statistics.median(item[1]))[:8]
+    print('  ' + ', '.join(f"{name} {statistics.median(times):.1f}" for name, times in slowest))
+    return import_ms + request_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+               PAGE_CACHE_PATH=os.path.join(workdir, 'page_cache.db'))
+    run(env)  # Migrate and seed the database, warm the bytecode cache
+
+    total_ms = measure('lazy views (default)', env, args.runs)
+    measure('eager views (LAZY_VIEWS=0)', dict(env, LAZY_VIEWS='0'), args.runs)
+
+    if total_ms > args.budget_ms:
+        print(f"Time to first response {total_ms:.1f} ms exceeds the budget of {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
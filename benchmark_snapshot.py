@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NDJSON backup round trip vs binary snapshots (SQLite file copy and columnar)
+
+Runs against a throwaway SQLite database filled with synthetic players.
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+_workdir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'benchmark.db')}"
+
+from sqlalchemy import insert, func
+
+from app import app, db
+from models import Player
+from backup import backup_stream, read_backup, BackupImporter
+from snapshot import create_snapshot, restore_snapshot
+
+
+def fill(count):
+    rng = random.Random(42)
+    db.session.execute(insert(Player), [
+        {'nickname': f'player{i}', 'kills': rng.randint(0, 20000), 'final_kills': rng.randint(0, 5000),
+         'deaths': rng.randint(0, 20000), 'beds_broken': rng.randint(0, 3000),
+         'games_played': rng.randint(0, 3000), 'wins': rng.randint(0, 1500),
+         'experience': rng.randint(0, 5000000), 'server_ip': 'play.example.net'}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def timed(label, dump, load):
+    start = time.perf_counter()
+    data = dump()
+    dumped = time.perf_counter()
+    load(data)
+    loaded = time.perf_counter()
+    rows = db.session.query(func.count(Player.id)).scalar()
+    print(f"{label:<22} dump {(dumped - start) * 1000:8.1f} ms, load {(loaded - dumped) * 1000:8.1f} ms, "
+          f"{len(data) / 1024:9.1f} KiB, {rows} players")
+
+
+def ndjson_dump():
+    return ''.join(backup_stream()).encode('utf-8')
+
+
+def ndjson_load(data):
+    importer = BackupImporter(db.session)
+    importer.clear_all()
+    importer.run(read_backup(io.BytesIO(data)))
+
+
+def snapshot_dump(columnar):
+    def dump():
+        out = io.BytesIO()
+        create_snapshot(out, columnar=columnar)
+        return out.getvalue()
+    return dump
+
+
+def snapshot_load(data):
+    restore_snapshot(io.BytesIO(data))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with app.app_context():
+        fill(count)
+        timed('NDJSON export/import', ndjson_dump, ndjson_load)
+        timed('snapshot (columnar)', snapshot_dump(True), snapshot_load)
+        timed('snapshot (sqlite)', snapshot_dump(False), snapshot_load)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Benchmark for team_balancer: skill scoring and team partitioning on synthetic players
+"""
+
+import time
+
+import numpy as np
+
+from team_balancer import stat_matrix, composite_scores, balance_teams, team_totals
+
+
+def synthetic_players(count, rng):
+    """Random but plausible Bedwars stat columns"""
+    games = rng.integers(0, 3000, count)
+    wins = (games * rng.uniform(0.1, 0.7, count)).astype(int)
+    deaths = rng.integers(0, 20000, count)
+    kills = (deaths * rng.uniform(0.3, 3.0, count)).astype(int)
+    final_kills = (kills * rng.uniform(0.1, 0.6, count)).astype(int)
+    experience = rng.integers(0, 15000000, count)
+    return kills, final_kills, deaths, wins, games, experience
+
+
+def run(count, team_count, rng, repeat=5):
+    columns = synthetic_players(count, rng)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scores = composite_scores(stat_matrix(*columns))
+        assignment = balance_teams(scores, team_count)
+        timings.append(time.perf_counter() - start)
+
+    totals = team_totals(scores, assignment, team_count)
+    print(f"{count:>6} players / {team_count:>4} teams: "
+          f"best {min(timings) * 1000:8.2f} ms, median {sorted(timings)[len(timings) // 2] * 1000:8.2f} ms, "
+          f"team total spread {totals.max() - totals.min():.4f}")
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+    for count, team_count in ((100, 2), (100, 25), (1000, 2), (1000, 10), (1000, 250), (2000, 500)):
+        run(count, team_count, rng)
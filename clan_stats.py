@@ -0,0 +1,205 @@
+"""
+Incrementally maintained clan aggregate stats.
+
+Clan.total_* columns hold the sum of the active members' lifetime stats. They are
+never computed at read time: a session after_flush hook turns every change to a
+player's stat columns (and every clan join/leave) into one
+``UPDATE clan SET total_kills = total_kills + ?`` per affected clan. The same
+hook credits experience gains to Clan.experience and ClanMember.contribution.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import event, inspect, select, func
+
+from app import db
+from models import Player, Clan, ClanMember
+
+# Player column -> Clan aggregate column
+CLAN_STAT_FIELDS = {
+    'kills': 'total_kills',
+    'final_kills': 'total_final_kills',
+    'deaths': 'total_deaths',
+    'wins': 'total_wins',
+    'games_played': 'total_games',
+    'beds_broken': 'total_beds_broken',
+    'experience': 'total_experience',
+}
+
+_clan = Clan.__table__
+_member = ClanMember.__table__
+_player = Player.__table__
+
+
+def _avg_kd_expression(kills, deaths):
+    """SQL expression for the aggregate K/D, same rule as Player.kd_ratio"""
+    return db.case((deaths > 0, db.cast(kills, db.Float) / deaths), else_=db.cast(kills, db.Float))
+
+
+def apply_clan_deltas(connection, clan_deltas, contributions=None):
+    """Apply aggregated stat deltas to clan rows.
+
+    clan_deltas maps clan_id -> {player_field: delta}; contributions maps
+    (clan_id, player_id) -> experience gained while a member.
+    """
+    for clan_id, deltas in clan_deltas.items():
+        values = {}
+        for field, delta in deltas.items():
+            if delta:
+                column = _clan.c[CLAN_STAT_FIELDS[field]]
+                values[column.key] = column + delta
+        if not values:
+            continue
+        kills = _clan.c.total_kills + deltas.get('kills', 0)
+        deaths = _clan.c.total_deaths + deltas.get('deaths', 0)
+        values['avg_kd'] = _avg_kd_expression(kills, deaths)
+        connection.execute(_clan.update().where(_clan.c.id == clan_id).values(**values))
+
+    for (clan_id, player_id), xp in (contributions or {}).items():
+        if xp <= 0:
+            continue
+        connection.execute(
+            _clan.update().where(_clan.c.id == clan_id)
+            .values(experience=_clan.c.experience + xp)
+        )
+        connection.execute(
+            _member.update()
+            .where(_member.c.clan_id == clan_id,
+                   _member.c.player_id == player_id,
+                   _member.c.is_active == True)
+            .values(contribution=_member.c.contribution + xp)
+        )
+
+
+def apply_player_deltas(connection, player_deltas):
+    """Route per-player stat deltas to the owning clans in one lookup.
+
+    player_deltas maps player_id -> {player_field: delta}. Players without an
+    active clan membership are ignored.
+    """
+    if not player_deltas:
+        return
+    memberships = connection.execute(
+        select(_member.c.player_id, _member.c.clan_id)
+        .where(_member.c.player_id.in_(list(player_deltas)), _member.c.is_active == True)
+    ).all()
+
+    clan_deltas = defaultdict(lambda: defaultdict(int))
+    contributions = {}
+    for player_id, clan_id in memberships:
+        for field, delta in player_deltas[player_id].items():
+            clan_deltas[clan_id][field] += delta
+        xp = player_deltas[player_id].get('experience', 0)
+        if xp > 0:
+            contributions[(clan_id, player_id)] = xp
+
+    apply_clan_deltas(connection, clan_deltas, contributions)
+
+
+def _player_stats(connection, player_ids):
+    """Load current stat values for the given players"""
+    columns = [_player.c[field] for field in CLAN_STAT_FIELDS]
+    rows = connection.execute(
+        select(_player.c.id, *columns).where(_player.c.id.in_(list(player_ids)))
+    ).all()
+    return {row[0]: dict(zip(CLAN_STAT_FIELDS, row[1:])) for row in rows}
+
+
+def _membership_change(member):
+    """Return +1 if a dirty membership was activated in this flush, -1 if it ended, else 0"""
+    history = inspect(member).attrs.is_active.history
+    if not history.added or not history.deleted:
+        return 0
+    return bool(history.added[0]) - bool(history.deleted[0])
+
+
+def _after_flush(session, flush_context):
+    """Translate the flush's player stat changes into clan aggregate updates"""
+    membership_changes = []
+    for obj in session.new:
+        if isinstance(obj, ClanMember) and obj.is_active is not False:
+            membership_changes.append((obj.clan_id, obj.player_id, 1))
+    for obj in session.deleted:
+        if isinstance(obj, ClanMember) and obj.is_active:
+            membership_changes.append((obj.clan_id, obj.player_id, -1))
+    for obj in session.dirty:
+        if isinstance(obj, ClanMember):
+            sign = _membership_change(obj)
+            if sign:
+                membership_changes.append((obj.clan_id, obj.player_id, sign))
+    changed_members = {player_id for _, player_id, _ in membership_changes}
+
+    player_deltas = {}
+    rebuild_players = set()
+    for obj in session.dirty:
+        if not isinstance(obj, Player) or obj.id in changed_members:
+            continue
+        state = inspect(obj)
+        deltas = {}
+        for field in CLAN_STAT_FIELDS:
+            history = state.attrs[field].history
+            if not history.added:
+                continue
+            if not history.deleted:
+                # Overwritten without the old value being loaded; recount this player's clan
+                rebuild_players.add(obj.id)
+                break
+            delta = (history.added[0] or 0) - (history.deleted[0] or 0)
+            if delta:
+                deltas[field] = delta
+        else:
+            if deltas:
+                player_deltas[obj.id] = deltas
+
+    if not (membership_changes or player_deltas or rebuild_players):
+        return
+
+    connection = session.connection()
+    apply_player_deltas(connection, player_deltas)
+
+    if membership_changes:
+        stats = _player_stats(connection, {player_id for _, player_id, _ in membership_changes})
+        clan_deltas = defaultdict(lambda: defaultdict(int))
+        for clan_id, player_id, sign in membership_changes:
+            for field, value in stats.get(player_id, {}).items():
+                clan_deltas[clan_id][field] += sign * (value or 0)
+        apply_clan_deltas(connection, clan_deltas)
+
+    if rebuild_players:
+        clan_ids = connection.execute(
+            select(_member.c.clan_id)
+            .where(_member.c.player_id.in_(list(rebuild_players)), _member.c.is_active == True)
+        ).scalars().all()
+        rebuild_clan_stats(connection, clan_ids)
+
+
+event.listen(db.session, 'after_flush', _after_flush)
+
+
+def rebuild_clan_stats(connection=None, clan_ids=None):
+    """Recompute clan aggregates from members in one grouped pass.
+
+    This is a repair tool for drift (bulk deletes, raw SQL edits); the read path
+    never calls it. Returns the number of clans rewritten.
+    """
+    connection = connection if connection is not None else db.session.connection()
+    sums = [func.coalesce(func.sum(_player.c[field]), 0).label(field) for field in CLAN_STAT_FIELDS]
+    query = (
+        select(_member.c.clan_id, func.count().label('members'), *sums)
+        .select_from(_member.join(_player, _player.c.id == _member.c.player_id))
+        .where(_member.c.is_active == True)
+        .group_by(_member.c.clan_id)
+    )
+    if clan_ids is not None:
+        query = query.where(_member.c.clan_id.in_(list(clan_ids)))
+    totals = {row.clan_id: row for row in connection.execute(query)}
+
+    target_ids = clan_ids if clan_ids is not None else connection.execute(select(_clan.c.id)).scalars().all()
+    for clan_id in set(target_ids):
+        row = totals.get(clan_id)
+        values = {column: (getattr(row, field) if row else 0) for field, column in CLAN_STAT_FIELDS.items()}
+        values['member_count'] = row.members if row else 0
+        kills, deaths = values['total_kills'], values['total_deaths']
+        values['avg_kd'] = kills / deaths if deaths else float(kills)
+        connection.execute(_clan.update().where(_clan.c.id == clan_id).values(**values))
+    return len(set(target_ids))
@@ -0,0 +1,15 @@
+"""
+Point the app at a throwaway SQLite database before any test imports it, so
+the suite never migrates, fills or drops instance/bedwars_leaderboard.db.
+"""
+
+import os
+import shutil
+import tempfile
+
+_database_dir = tempfile.mkdtemp(prefix='bedwars-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_database_dir, ignore_errors=True)
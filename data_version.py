@@ -0,0 +1,90 @@
+"""
+Global data-version counter for cache validation.
+
+A single DataVersion row is incremented, inside the same transaction, by every
+commit that wrote anything: ORM flushes and bulk INSERT/UPDATE/DELETE
+statements run through the session are both noticed by session hooks (a bulk
+statement only when it matched rows). Rows that pages create with defaults on
+first view (LAZY_DEFAULTS) do not count, since they change nothing shown. Caches
+(HTTP ETags, page and fragment caches) key on the version, so any write
+invalidates them for all workers at once, and reading the version is one
+primary-key lookup.
+
+Writes that bypass the session (raw driver connections, external tools) must
+call bump() themselves.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, select, update, insert
+
+from app import db
+from models import DataVersion, ASCENDData, PlayerSkillRating
+
+_ROW_ID = 1
+_CHANGED = 'data_version_changed'
+
+# Created by get_or_create() on a player's first page view, with default values
+LAZY_DEFAULTS = (ASCENDData, PlayerSkillRating)
+
+_version = DataVersion.__table__
+
+
+def current():
+    """Return (version, updated_at); (0, None) before the first write"""
+    row = db.session.execute(
+        select(_version.c.version, _version.c.updated_at).where(_version.c.id == _ROW_ID)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def bump(session=None):
+    """Increment the version in the current transaction; the caller commits"""
+    session = session or db.session
+    now = datetime.utcnow()
+    session.info[_CHANGED] = False
+    result = session.execute(
+        update(_version).where(_version.c.id == _ROW_ID)
+        .values(version=_version.c.version + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(_version).values(id=_ROW_ID, version=1, updated_at=now))
+    session.info[_CHANGED] = False
+
+
+def _inserts(session):
+    return any(not isinstance(obj, LAZY_DEFAULTS) for obj in session.new)
+
+
+def _after_flush(session, flush_context):
+    if _inserts(session) or session.dirty or session.deleted:
+        session.info[_CHANGED] = True
+
+
+def _on_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    result = orm_execute_state.invoke_statement()
+    # -1 when the driver cannot tell (e.g. some executemany inserts): assume rows were written
+    if getattr(result, 'rowcount', -1) != 0:
+        orm_execute_state.session.info[_CHANGED] = True
+    return result
+
+
+def _before_commit(session):
+    # Runs before the final flush, so pending ORM changes count as writes too
+    pending = _inserts(session) or session.deleted or any(session.is_modified(obj) for obj in session.dirty)
+    if session.info.get(_CHANGED) or pending:
+        bump(session)
+
+
+def _reset(session):
+    # Also after commit: the final flush runs after the bump and must not carry over
+    session.info[_CHANGED] = False
+
+
+event.listen(db.session, 'after_flush', _after_flush)
+event.listen(db.session, 'do_orm_execute', _on_execute)
+event.listen(db.session, 'before_commit', _before_commit)
+event.listen(db.session, 'after_commit', _reset)
+event.listen(db.session, 'after_soft_rollback', lambda session, previous_transaction: _reset(session))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Image pipeline for uploaded custom emojis (static/emojis).
+
+build_sprites() processes every emoji file into static/dist/emojis, which the
+asset pipeline serves with immutable caching:
+
+- identical uploads are stored once, under their content hash;
+- static images are packed into one sprite sheet (PNG and WebP, cells at 2x
+  the 24px display size) with a CSS map of one class per emoji, so a page full
+  of role and badge emojis costs one image request;
+- animated GIFs cannot live in a sprite, so they get an animated WebP variant
+  downscaled to the same 2x size instead of the full-size original.
+
+Resizing and packing need Pillow; without it the pipeline only deduplicates.
+The result is described by manifest.json, which every worker re-reads when it
+changes, so a rebuild after an admin upload reaches all of them.
+AdminCustomRole.display_emoji and Badge.display_emoji render through
+emoji_html().
+
+Usage: python emoji_sprites.py build
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import threading
+
+try:
+    from PIL import Image, ImageOps, ImageSequence
+except ImportError:
+    Image = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+SOURCE_DIR = 'emojis'
+OUTPUT_DIR = 'dist/emojis'
+SOURCE_URL_PREFIX = '/static/emojis/'
+EMOJI_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+DISPLAY_SIZE = 24
+CELL_SIZE = DISPLAY_SIZE * 2
+HASH_LENGTH = 12
+
+_lock = threading.Lock()
+_cache = {'mtime': None, 'manifest': {}}
+
+
+def _manifest_path(static_dir):
+    return os.path.join(static_dir, OUTPUT_DIR, 'manifest.json')
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as out:
+        out.write(data)
+    os.replace(tmp, path)
+
+
+def _kind(path):
+    """'animated', 'static', or 'copy' when Pillow is missing or cannot read the file"""
+    if Image is None:
+        return 'copy'
+    try:
+        with Image.open(path) as image:
+            return 'animated' if getattr(image, 'is_animated', False) else 'static'
+    except OSError:
+        return 'copy'
+
+
+def _animated_webp(source, target):
+    """Downscale every frame of an animated image into an animated WebP"""
+    with Image.open(source) as image:
+        frames = [ImageOps.contain(frame.convert('RGBA'), (CELL_SIZE, CELL_SIZE))
+                  for frame in ImageSequence.Iterator(image)]
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        frames[0].save(target, 'WEBP', save_all=True, append_images=frames[1:],
+                       duration=image.info.get('duration', 100), loop=image.info.get('loop', 0),
+                       quality=85)
+
+
+def _sprite_sheet(static_dir, entries):
+    """Pack static images into one sheet with its CSS map; returns the CSS path"""
+    columns = math.ceil(math.sqrt(len(entries)))
+    rows = math.ceil(len(entries) / columns)
+    sheet = Image.new('RGBA', (columns * CELL_SIZE, rows * CELL_SIZE), (0, 0, 0, 0))
+    positions = {}
+    for index, (digest, path) in enumerate(entries):
+        column, row = index % columns, index // columns
+        with Image.open(path) as image:
+            cell = ImageOps.contain(image.convert('RGBA'), (CELL_SIZE, CELL_SIZE))
+        sheet.paste(cell, (column * CELL_SIZE + (CELL_SIZE - cell.width) // 2,
+                           row * CELL_SIZE + (CELL_SIZE - cell.height) // 2))
+        positions[digest] = (column, row)
+
+    output_dir = os.path.join(static_dir, OUTPUT_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    sheet_key = hashlib.sha256(''.join(digest for digest, _ in entries).encode('ascii')).hexdigest()[:HASH_LENGTH]
+    png_name = f'sprite.{sheet_key}.png'
+    webp_name = f'sprite.{sheet_key}.webp'
+    for name, options in ((png_name, {'format': 'PNG', 'optimize': True}),
+                          (webp_name, {'format': 'WEBP', 'lossless': True})):
+        buffer = io.BytesIO()
+        sheet.save(buffer, **options)
+        _write(os.path.join(output_dir, name), buffer.getvalue())
+
+    width, height = columns * DISPLAY_SIZE, rows * DISPLAY_SIZE
+    css = [
+        '.emoji-sprite{display:inline-block;vertical-align:middle;border-radius:4px;'
+        f'width:{DISPLAY_SIZE}px;height:{DISPLAY_SIZE}px;background-repeat:no-repeat;'
+        f'background-size:{width}px {height}px;background-image:url({png_name});'
+        f'background-image:image-set(url({webp_name}) type("image/webp"),url({png_name}) type("image/png"))}}'
+    ]
+    for digest, (column, row) in positions.items():
+        css.append(f'.emoji-{digest}{{background-position:-{column * DISPLAY_SIZE}px -{row * DISPLAY_SIZE}px}}')
+    css_name = f'sprite.{sheet_key}.css'
+    _write(os.path.join(output_dir, css_name), '\n'.join(css).encode('utf-8'))
+    return f'{OUTPUT_DIR}/{css_name}'
+
+
+def build_sprites(static_dir=STATIC_DIR):
+    """Rebuild the emoji outputs and manifest; returns the manifest"""
+    source_dir = os.path.join(static_dir, SOURCE_DIR)
+    names = sorted(name for name in os.listdir(source_dir)
+                   if os.path.splitext(name)[1].lower() in EMOJI_EXTENSIONS) if os.path.isdir(source_dir) else []
+
+    digests = {}
+    unique = {}
+    for name in names:
+        path = os.path.join(source_dir, name)
+        with open(path, 'rb') as source:
+            digest = hashlib.sha256(source.read()).hexdigest()[:HASH_LENGTH]
+        digests[name] = digest
+        unique.setdefault(digest, path)
+
+    manifest = {'css': None, 'sprites': {}, 'files': {}}
+    sprited = []
+    for digest, path in unique.items():
+        kind = _kind(path)
+        if kind == 'animated':
+            target = f'{OUTPUT_DIR}/{digest}.webp'
+            if not os.path.exists(os.path.join(static_dir, target)):
+                _animated_webp(path, os.path.join(static_dir, target))
+            manifest['files'][digest] = target
+        elif kind == 'static':
+            sprited.append((digest, path))
+        else:
+            target = f'{OUTPUT_DIR}/{digest}{os.path.splitext(path)[1].lower()}'
+            if not os.path.exists(os.path.join(static_dir, target)):
+                os.makedirs(os.path.join(static_dir, OUTPUT_DIR), exist_ok=True)
+                shutil.copyfile(path, os.path.join(static_dir, target))
+            manifest['files'][digest] = target
+    if sprited:
+        manifest['css'] = _sprite_sheet(static_dir, sprited)
+        manifest['sprites'] = {digest: True for digest, _ in sprited}
+
+    manifest['emojis'] = digests
+    _write(_manifest_path(static_dir), json.dumps(manifest, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def manifest(static_dir=STATIC_DIR):
+    """Current manifest, re-read when another worker has rebuilt it"""
+    try:
+        mtime = os.stat(_manifest_path(static_dir)).st_mtime_ns
+    except OSError:
+        return {}
+    with _lock:
+        if _cache['mtime'] != mtime:
+            with open(_manifest_path(static_dir), encoding='utf-8') as source:
+                _cache['manifest'] = json.load(source)
+            _cache['mtime'] = mtime
+        return _cache['manifest']
+
+
+def sprite_css_url():
+    """URL of the sprite CSS map, or None when there is no sheet"""
+    css = manifest().get('css')
+    return f'/static/{css}' if css else None
+
+
+def emoji_html(emoji_url):
+    """Sprite or optimized image HTML for an uploaded emoji URL; None when it is not one"""
+    if not emoji_url or not emoji_url.startswith(SOURCE_URL_PREFIX):
+        return None
+    current = manifest()
+    digest = current.get('emojis', {}).get(emoji_url[len(SOURCE_URL_PREFIX):])
+    if digest is None:
+        return None
+    if digest in current.get('sprites', {}):
+        return f'<span class="emoji-sprite emoji-{digest}" role="img" aria-label="custom emoji"></span>'
+    target = current.get('files', {}).get(digest)
+    if target:
+        return (f'<img src="/static/{target}" class="emoji" alt="custom emoji" '
+                f'width="{DISPLAY_SIZE}" height="{DISPLAY_SIZE}" loading="lazy">')
+    return None
+
+
+def init_emoji_sprites(app):
+    """Build at startup and expose the sprite CSS to templates"""
+    try:
+        build_sprites(app.static_folder)
+    except OSError as e:
+        app.logger.error(f"Emoji sprite build failed: {e}")
+    app.jinja_env.globals['emoji_sprite_css_url'] = sprite_css_url
+
+
+if __name__ == '__main__':
+    import sys
+
+    if sys.argv[1:] != ['build']:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    built = build_sprites()
+    print(f"{len(built['emojis'])} emojis, {len(built['sprites'])} in the sprite sheet, "
+          f"{len(built['files'])} standalone files")
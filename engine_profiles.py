@@ -0,0 +1,171 @@
+"""
+Engine-specific connection settings.
+
+DB_PROFILE picks the profile; the default, auto, follows the database URL:
+
+sqlite      WAL journal (readers never block the writer or each other),
+            synchronous=NORMAL (durable across app crashes, fsync only at
+            checkpoints), a memory-mapped file, a larger page cache, a busy
+            timeout instead of immediate "database is locked" errors, and a
+            pool sized for the worker threads. SQLITE_WRITER_LOCK=1 also
+            makes the threads of a process take turns as the single writer,
+            from a session's first write until its transaction ends. That
+            avoids lock upgrade errors in long read-then-write transactions,
+            but costs throughput with short ones, so it is off by default.
+sqlite-safe rollback journal with synchronous=FULL and the busy timeout.
+postgresql  a pool per worker sized from the thread count (GUNICORN_THREADS)
+            and capped so WEB_CONCURRENCY workers stay within
+            DB_MAX_CONNECTIONS, pre-ping (DB_POOL_PRE_PING=0 turns it off)
+            and a server-side statement timeout (DB_STATEMENT_TIMEOUT_MS,
+            0 for none).
+legacy      the previous fixed options (pool of 3, no overflow, pre-ping) for
+            any backend.
+
+Both SQLite profiles also turn on foreign key enforcement (ON DELETE CASCADE
+included), which SQLite leaves off unless each connection asks for it.
+
+benchmark_engine.py compares the profiles' throughput.
+"""
+
+import os
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = ('auto', 'sqlite', 'sqlite-safe', 'postgresql', 'legacy')
+
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_CACHE_SIZE_KIB = 64 * 1024
+
+LEGACY_OPTIONS = {
+    "pool_size": 3,
+    "max_overflow": 0,
+    "pool_timeout": 10,
+    "pool_recycle": 280,
+    "pool_pre_ping": True,
+}
+
+_WRITER = 'sqlite_writer_lock'
+_writer_lock = threading.RLock()
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def profile_for(database_url):
+    """The configured profile, resolving auto from the URL's backend"""
+    profile = os.environ.get('DB_PROFILE', 'auto')
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
+    if profile != 'auto':
+        return profile
+    backend = make_url(database_url).get_backend_name()
+    return backend if backend in ('sqlite', 'postgresql') else 'legacy'
+
+
+def _is_file_sqlite(database_url):
+    url = make_url(database_url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database URL and profile"""
+    profile = profile_for(database_url)
+    threads = max(1, _env_int('GUNICORN_THREADS', 1))
+
+    if profile in ('sqlite', 'sqlite-safe'):
+        if not _is_file_sqlite(database_url):
+            return {}  # In-memory databases use SQLAlchemy's single-connection pools
+        return {
+            "pool_size": max(5, threads * 2),
+            "max_overflow": 10,
+            "pool_timeout": 30,
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        }
+
+    if profile == 'postgresql':
+        workers = max(1, _env_int('WEB_CONCURRENCY', 4))
+        per_worker = max(2, _env_int('DB_MAX_CONNECTIONS', 20) // workers)
+        pool_size = min(threads + 1, per_worker)  # +1 for work outside request threads
+        options = {
+            "pool_size": pool_size,
+            "max_overflow": per_worker - pool_size,
+            "pool_timeout": 10,
+            "pool_recycle": 280,
+            "pool_pre_ping": os.environ.get('DB_POOL_PRE_PING', '1') != '0',
+        }
+        statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+        if statement_timeout:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+        return options
+
+    return dict(LEGACY_OPTIONS)
+
+
+def _sqlite_pragmas(profile):
+    if profile == 'sqlite':
+        return (
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+            f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}',
+            'PRAGMA temp_store=MEMORY',
+            f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+            'PRAGMA foreign_keys=ON',
+        )
+    return (
+        'PRAGMA journal_mode=DELETE',
+        'PRAGMA synchronous=FULL',
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+        'PRAGMA foreign_keys=ON',
+    )
+
+
+def _acquire_writer(session):
+    if not session.info.get(_WRITER):
+        # Never wait forever: past the busy timeout, fall back to SQLite's own locking
+        session.info[_WRITER] = _writer_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+
+
+def _before_flush(session, flush_context, instances):
+    _acquire_writer(session)
+
+
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _acquire_writer(orm_execute_state.session)
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None and session.info.pop(_WRITER, False):
+        _writer_lock.release()
+
+
+def init_engine_profile(app, db):
+    """Connection-level settings that engine options cannot carry (SQLite pragmas, writer lock)"""
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    profile = profile_for(url)
+    if profile not in ('sqlite', 'sqlite-safe') or not _is_file_sqlite(url):
+        return
+
+    pragmas = _sqlite_pragmas(profile)
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if profile == 'sqlite' and os.environ.get('SQLITE_WRITER_LOCK') == '1':
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'do_orm_execute', _on_execute)
+        event.listen(db.session, 'after_transaction_end', _after_transaction_end)
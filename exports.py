@@ -0,0 +1,98 @@
+"""
+Streaming data exports.
+
+Exports are generators over column-projected queries fetched with yield_per,
+so memory stays constant regardless of table size and the first bytes reach
+the client as soon as the first chunk is read.
+"""
+
+import csv
+import io
+import zlib
+
+from app import db
+from models import Player, level_for_experience
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Sort keys allowed for /export, each backed by a player leaderboard index
+EXPORT_SORTS = {
+    'experience': Player.experience,
+    'kills': Player.kills,
+    'final_kills': Player.final_kills,
+    'beds_broken': Player.beds_broken,
+    'wins': Player.wins,
+}
+
+LEADERBOARD_CSV_HEADER = [
+    'Ник', 'Уровень', 'Опыт', 'Киллы', 'Финальные киллы', 'Смерти',
+    'K/D', 'FK/D', 'Кровати', 'Игры', 'Победы', 'Процент побед',
+    'Роль', 'Сервер', 'Железо', 'Золото', 'Алмазы', 'Изумруды',
+    'Покупки', 'Дата создания', 'Последнее обновление'
+]
+
+_LEADERBOARD_COLUMNS = (
+    Player.nickname, Player.experience, Player.kills, Player.final_kills, Player.deaths,
+    Player.final_deaths, Player.beds_broken, Player.games_played, Player.wins, Player.role,
+    Player.server_ip, Player.iron_collected, Player.gold_collected, Player.diamond_collected,
+    Player.emerald_collected, Player.items_purchased, Player.created_at, Player.last_updated,
+)
+
+
+def _ratio(numerator, denominator):
+    """Same rule as Player.kd_ratio / fkd_ratio"""
+    if denominator == 0:
+        return numerator if numerator > 0 else 0
+    return round(numerator / denominator, 2)
+
+
+def _timestamp(value):
+    """CSV timestamp, empty for missing values"""
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def leaderboard_query(sort_by='experience', server_ip=None, min_games=None):
+    """Column-projected leaderboard query with the /export filters applied"""
+    sort_column = EXPORT_SORTS.get(sort_by, Player.experience)
+    query = db.session.query(*_LEADERBOARD_COLUMNS)
+    if server_ip:
+        query = query.filter(Player.server_ip == server_ip)
+    if min_games:
+        query = query.filter(Player.games_played >= min_games)
+    return query.order_by(sort_column.desc(), Player.id.desc())
+
+
+def leaderboard_csv(query, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the leaderboard CSV as text chunks, one chunk per fetched batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LEADERBOARD_CSV_HEADER)
+
+    for count, row in enumerate(query.yield_per(chunk_size), 1):
+        writer.writerow([
+            row.nickname, level_for_experience(row.experience), row.experience,
+            row.kills, row.final_kills, row.deaths,
+            _ratio(row.kills, row.deaths), _ratio(row.final_kills, row.final_deaths), row.beds_broken,
+            row.games_played, row.wins,
+            round(row.wins / row.games_played * 100, 1) if row.games_played else 0,
+            row.role, row.server_ip, row.iron_collected,
+            row.gold_collected, row.diamond_collected,
+            row.emerald_collected, row.items_purchased,
+            _timestamp(row.created_at), _timestamp(row.last_updated)
+        ])
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
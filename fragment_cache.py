@@ -0,0 +1,152 @@
+"""
+Per-player cache of rendered HTML fragments.
+
+The leaderboard row cells and the nickname / role snippets of a player depend
+only on that player's own data, so they are rendered once and reused for every
+visitor and page until the player changes. Entries are keyed by player id and
+fragment name and stamped with the player's version: last_updated (moved by
+any write to the player row, ORM or bulk) plus render_version, which the flush
+hook below bumps when a gradient, admin role, title or badge of the player -
+or a shared definition it points at - changes. The row is rendered from the
+leaderboard read model; the snippets need a Player, whose
+nickname_display_html / role_display_html they cache.
+
+The cache lives in process memory as a bounded LRU; every worker fills its
+own, and the version stamp read from the loaded row keeps them correct.
+"""
+
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+from sqlalchemy import event, select, update
+
+from app import app, db
+from models import (Player, PlayerGradientSetting, PlayerAdminRole, PlayerTitle, PlayerBadge,
+                    GradientTheme, AdminCustomRole, CustomTitle, Badge)
+
+MAX_ENTRIES = 20000
+GAINS_MARKER = '<!--window-gains-->'
+
+# Per-player link tables whose rows change how a player renders
+PLAYER_LINKS = (PlayerGradientSetting, PlayerAdminRole, PlayerTitle, PlayerBadge)
+
+# Shared definitions -> (link table, link column): editing one re-renders every holder
+SHARED_DEFINITIONS = {
+    GradientTheme: (PlayerGradientSetting, 'gradient_theme_id'),
+    AdminCustomRole: (PlayerAdminRole, 'role_id'),
+    CustomTitle: (PlayerTitle, 'title_id'),
+    Badge: (PlayerBadge, 'badge_id'),
+}
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def player_version(player):
+    return (player.render_version or 0, player.last_updated)
+
+
+def fragment(player, name, render):
+    """Cached HTML of one fragment of a player, rendered with render() on a miss"""
+    key = (player.id, name)
+    version = player_version(player)
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == version:
+            _entries.move_to_end(key)
+            return entry[1]
+
+    html = Markup(render())
+    with _lock:
+        _entries[key] = (version, html)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return html
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def leaderboard_row_html(player, gains_html=None):
+    """Leaderboard row cells from the player column to the performance column"""
+    html = fragment(player, 'leaderboard_row',
+                    lambda: app.jinja_env.get_template('_leaderboard_row.html').render(player=player))
+    if gains_html:
+        html = Markup(html.replace(GAINS_MARKER, str(gains_html), 1))
+    return html
+
+
+def nickname_html(player):
+    """Styled nickname of a Player (Player.nickname_display_html)"""
+    return fragment(player, 'nickname', lambda: player.nickname_display_html)
+
+
+def role_html(player):
+    """Styled role of a Player (Player.role_display_html)"""
+    return fragment(player, 'role', lambda: player.role_display_html)
+
+
+def bump_players(session, player_ids):
+    """Invalidate every cached fragment of the given players"""
+    player_ids = set(player_ids) - {None}
+    if player_ids:
+        player = Player.__table__
+        session.execute(
+            update(player).where(player.c.id.in_(player_ids))
+            .values(render_version=player.c.render_version + 1)
+        )
+
+
+def _holders(session, definition, ids):
+    link, column = SHARED_DEFINITIONS[definition]
+    link_table = link.__table__
+    return session.execute(
+        select(link_table.c.player_id).where(link_table.c[column].in_(ids))
+    ).scalars()
+
+
+def _before_flush(session, flush_context, instances):
+    """Bump render_version of players whose rendering inputs change in this flush"""
+    player_ids = set()
+    shared = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, PLAYER_LINKS):
+            player_ids.add(obj.player_id)
+        elif type(obj) in SHARED_DEFINITIONS and obj.id and obj not in session.new:
+            shared.setdefault(type(obj), set()).add(obj.id)
+
+    for definition, ids in shared.items():
+        player_ids.update(_holders(session, definition, ids))
+    bump_players(session, player_ids)
+
+
+def _on_execute(orm_execute_state):
+    """query.update() / query.delete() on link tables skip the flush; bump their players up front"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    entity = mapper.class_ if mapper is not None else None
+    if entity not in PLAYER_LINKS and entity not in SHARED_DEFINITIONS:
+        return
+    session = orm_execute_state.session
+    whereclause = orm_execute_state.statement.whereclause
+    key = entity.player_id if entity in PLAYER_LINKS else entity.id
+    matched = select(key) if whereclause is None else select(key).where(whereclause)
+    ids = set(session.execute(matched).scalars())
+    if entity in SHARED_DEFINITIONS and ids:
+        ids = set(_holders(session, entity, ids))
+    bump_players(session, ids)
+
+
+event.listen(db.session, 'before_flush', _before_flush)
+event.listen(db.session, 'do_orm_execute', _on_execute)
+
+app.jinja_env.globals.update(
+    leaderboard_row_html=leaderboard_row_html,
+    player_nickname_html=nickname_html,
+    player_role_html=role_html,
+)
@@ -0,0 +1,30 @@
+"""
+gunicorn settings, read automatically from the working directory.
+
+The app is imported once in the master (preload) - migrations, seed check,
+asset build and view loading included - and the workers are forked from it,
+instead of every worker repeating the import on a small container. Each
+forked worker drops the database connections inherited from the master.
+GUNICORN_PRELOAD=0 goes back to importing in every worker.
+"""
+
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+# Also sizes the database pool per worker (engine_profiles.py)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+
+def pre_fork(server, worker):
+    # With lazy views the master would otherwise leave route loading to each worker
+    if preload_app:
+        from lazy_views import load_views
+        load_views()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose(close=False)
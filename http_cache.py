@@ -0,0 +1,59 @@
+"""
+Conditional GET support for polled JSON endpoints.
+
+@conditional computes a weak ETag from the global data version (see
+data_version.py) plus the request path and query string, and answers a
+matching If-None-Match (or an If-Modified-Since not older than the last write)
+with 304 before the view runs any query. Fresh responses carry the ETag,
+Last-Modified and a Cache-Control header that lets clients and proxies serve
+a slightly stale copy while they revalidate.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+
+import data_version
+
+DEFAULT_MAX_AGE = 5
+DEFAULT_STALE_WHILE_REVALIDATE = 60
+
+
+def request_etag(version, updated_at):
+    """Weak ETag for the current request at a data version"""
+    key = f"{version}:{updated_at.isoformat() if updated_at else ''}:{request.full_path}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def _not_modified(etag, updated_at):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and updated_at:
+        return updated_at.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional(max_age=DEFAULT_MAX_AGE, stale_while_revalidate=DEFAULT_STALE_WHILE_REVALIDATE):
+    """Decorator for GET views whose output depends only on the data and the URL"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, updated_at = data_version.current()
+            etag = request_etag(version, updated_at)
+            cache_control = f'public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}'
+
+            if _not_modified(etag, updated_at):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if updated_at:
+                response.last_modified = updated_at
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,205 @@
+"""
+Batched match-result ingestion for game-server plugins.
+
+Servers POST batches of finished matches to /api/ingest/matches. A batch is
+applied in one transaction: match ids already seen are dropped, per-player
+deltas are summed across the batch, and each touched player gets exactly one
+``UPDATE player SET kills = kills + ?, ...`` row in a single executemany. Each
+player's line of each match is also kept as a MatchParticipation fact.
+Experience, clan aggregates and the statistics cache are then refreshed once
+for the whole batch rather than once per match.
+
+Server tokens come from the INGEST_TOKENS environment variable, a comma
+separated list of ``name:token`` pairs (a bare token gets no name).
+"""
+
+import hmac
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, insert, bindparam
+from sqlalchemy.orm import load_only
+
+from app import db
+from models import Player, IngestedMatch, GameMode
+from clan_stats import apply_player_deltas, CLAN_STAT_FIELDS
+from match_history import STAT_FIELDS, record_match_facts
+from leaderboard_rows import refresh_rows
+
+MAX_BATCH_MATCHES = 1000
+MAX_MATCH_PLAYERS = 200
+
+# Counters a server may report per player and match
+DELTA_FIELDS = (
+    'kills', 'final_kills', 'deaths', 'final_deaths', 'beds_broken',
+    'iron_collected', 'gold_collected', 'diamond_collected', 'emerald_collected', 'items_purchased',
+)
+
+_XP_COLUMNS = (Player.kills, Player.final_kills, Player.deaths, Player.beds_broken, Player.wins,
+               Player.games_played, Player.experience, Player.iron_collected, Player.gold_collected,
+               Player.diamond_collected, Player.emerald_collected)
+
+_player = Player.__table__
+
+
+def server_tokens():
+    """Configured server tokens as {token: server name}"""
+    tokens = {}
+    for entry in os.environ.get('INGEST_TOKENS', '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, token = entry.rpartition(':')
+        tokens[token] = name or None
+    return tokens
+
+
+def authenticate(token):
+    """Return (True, server name) for a valid server token, else (False, None)"""
+    if not token:
+        return False, None
+    for known, name in server_tokens().items():
+        if hmac.compare_digest(known.encode('utf-8'), token.encode('utf-8')):
+            return True, name
+    return False, None
+
+
+def _parse_match(match):
+    """Validate one match; returns (match id, mode name, played_at, {nickname: deltas})"""
+    if not isinstance(match, dict):
+        raise ValueError("Each match must be an object")
+    match_id = str(match.get('match_id') or '').strip()
+    if not match_id or len(match_id) > 100:
+        raise ValueError("Each match needs a match_id of at most 100 characters")
+
+    mode = match.get('mode') or None
+    played_at = match.get('played_at')
+    if played_at:
+        try:
+            played_at = datetime.fromisoformat(str(played_at).replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            raise ValueError(f"Match {match_id}: invalid played_at")
+
+    players = match.get('players')
+    if not isinstance(players, list) or not players or len(players) > MAX_MATCH_PLAYERS:
+        raise ValueError(f"Match {match_id}: players must be a list of 1-{MAX_MATCH_PLAYERS} entries")
+
+    deltas = {}
+    for entry in players:
+        nickname = str(entry.get('nickname') or '').strip() if isinstance(entry, dict) else ''
+        if not nickname or len(nickname) > 100:
+            raise ValueError(f"Match {match_id}: every player needs a nickname")
+        if nickname in deltas:
+            raise ValueError(f"Match {match_id}: duplicate player {nickname}")
+        row = {'games_played': 1, 'wins': 1 if entry.get('win') else 0}
+        for field in DELTA_FIELDS:
+            value = entry.get(field, 0)
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"Match {match_id}: {field} for {nickname} must be a non-negative integer")
+            row[field] = value
+        deltas[nickname] = row
+    return match_id, mode, played_at, deltas
+
+
+def _resolve_players(nicknames):
+    """Map nicknames to player ids, creating players seen for the first time"""
+    ids = dict(db.session.execute(
+        select(Player.nickname, Player.id).where(Player.nickname.in_(nicknames))
+    ).all())
+    missing = [nickname for nickname in nicknames if nickname not in ids]
+    if missing:
+        now = datetime.utcnow()
+        db.session.execute(insert(Player), [
+            {'nickname': nickname, 'created_at': now, 'last_updated': now} for nickname in missing
+        ])
+        ids.update(db.session.execute(
+            select(Player.nickname, Player.id).where(Player.nickname.in_(missing))
+        ).all())
+    return ids, len(missing)
+
+
+def _experience_gains(player_ids):
+    """Raise experience to the auto-calculated value where it is higher; returns {player_id: gain}"""
+    players = (Player.query.options(load_only(*_XP_COLUMNS))
+               .filter(Player.id.in_(player_ids))
+               .execution_options(populate_existing=True)
+               .all())
+    gains = {}
+    for player in players:
+        calculated = player.calculate_auto_experience()
+        if calculated > player.experience:
+            gains[player.id] = calculated - player.experience
+    if gains:
+        db.session.execute(
+            _player.update().where(_player.c.id == bindparam('player_id'))
+            .values(experience=_player.c.experience + bindparam('gain')),
+            [{'player_id': player_id, 'gain': gain} for player_id, gain in gains.items()]
+        )
+    return gains
+
+
+def ingest_matches(matches, server_name=None):
+    """Apply a batch of match results; the caller commits.
+
+    Raises ValueError for a malformed batch before anything is written.
+    Returns counts of accepted and duplicate matches, updated and created players.
+    """
+    if not isinstance(matches, list) or not matches:
+        raise ValueError("matches must be a non-empty list")
+    if len(matches) > MAX_BATCH_MATCHES:
+        raise ValueError(f"At most {MAX_BATCH_MATCHES} matches per batch")
+    parsed = [_parse_match(match) for match in matches]
+
+    seen = set(db.session.execute(
+        select(IngestedMatch.match_id).where(IngestedMatch.match_id.in_({m[0] for m in parsed}))
+    ).scalars())
+    fresh = []
+    for match in parsed:
+        if match[0] not in seen:
+            seen.add(match[0])
+            fresh.append(match)
+    result = {'accepted': len(fresh), 'duplicates': len(parsed) - len(fresh), 'players': 0, 'created': 0}
+    if not fresh:
+        return result
+
+    totals = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+    for _, _, _, deltas in fresh:
+        for nickname, row in deltas.items():
+            total = totals[nickname]
+            for field, value in row.items():
+                total[field] += value
+    ids, result['created'] = _resolve_players(list(totals))
+    player_deltas = {ids[nickname]: total for nickname, total in totals.items()}
+
+    now = datetime.utcnow()
+    db.session.execute(
+        _player.update().where(_player.c.id == bindparam('player_id'))
+        .values(last_updated=now, **{field: _player.c[field] + bindparam(f'delta_{field}')
+                                     for field in STAT_FIELDS}),
+        [dict({f'delta_{field}': value for field, value in total.items()}, player_id=player_id)
+         for player_id, total in player_deltas.items()]
+    )
+
+    gains = _experience_gains(list(player_deltas))
+    clan_deltas = {}
+    for player_id, total in player_deltas.items():
+        clan_deltas[player_id] = {field: total[field] for field in CLAN_STAT_FIELDS if field in total}
+        clan_deltas[player_id]['experience'] = gains.get(player_id, 0)
+    apply_player_deltas(db.session.connection(), clan_deltas)
+    refresh_rows(db.session.connection(), list(player_deltas))
+
+    modes = dict(db.session.execute(select(GameMode.name, GameMode.id)).all())
+    record_match_facts([
+        dict(row, match_id=match_id, player_id=ids[nickname], game_mode_id=modes.get(mode),
+             played_at=played_at or now)
+        for match_id, mode, played_at, deltas in fresh
+        for nickname, row in deltas.items()
+    ], recorded_at=now)
+    db.session.execute(insert(IngestedMatch), [
+        {'match_id': match_id, 'server_name': server_name, 'player_count': len(deltas),
+         'played_at': played_at, 'ingested_at': now}
+        for match_id, _, played_at, deltas in fresh
+    ])
+    result['players'] = len(player_deltas)
+    return result
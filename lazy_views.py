@@ -0,0 +1,56 @@
+"""
+Deferred loading of the view modules.
+
+routes.py and the optional api_routes.py register ~130 URL rules, which is the
+largest part of importing the app after the models: the module itself, its
+imports, and werkzeug compiling a URL builder for every rule. Scripts that only
+need the app and models (migrations, seeds, backups, rebuild tools) never use
+them, and a web worker only needs them once a request arrives.
+
+init_lazy_views() wraps app.wsgi_app so VIEW_MODULES are imported on the first
+request, before Flask marks the app as set up. The views stay registered on the
+app itself, so endpoint names and url_for() are unchanged. LAZY_VIEWS=0 loads
+them at import instead; under gunicorn the preloading master loads them before
+forking (see gunicorn.conf.py).
+"""
+
+import importlib
+import os
+import threading
+
+VIEW_MODULES = ('routes',)
+OPTIONAL_VIEW_MODULES = ('api_routes',)
+
+_lock = threading.Lock()
+_state = {'loaded': False}
+
+
+def load_views():
+    """Import the view modules once; safe to call from any thread"""
+    if _state['loaded']:
+        return
+    with _lock:
+        if _state['loaded']:
+            return
+        for name in VIEW_MODULES:
+            importlib.import_module(name)
+        for name in OPTIONAL_VIEW_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass  # Optional view modules
+        _state['loaded'] = True
+
+
+def init_lazy_views(app):
+    """Load the views on the first request (or now, with LAZY_VIEWS=0)"""
+    wsgi_app = app.wsgi_app
+
+    def lazy_wsgi_app(environ, start_response):
+        if not _state['loaded']:
+            load_views()
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = lazy_wsgi_app
+    if os.environ.get('LAZY_VIEWS', '1') == '0':
+        load_views()
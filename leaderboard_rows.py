@@ -0,0 +1,283 @@
+"""
+Denormalized leaderboard read model.
+
+LeaderboardRow holds every field the main leaderboard and /api/leaderboard
+display for a player: raw stats, derived ratios, level and progress, star
+rating, skin URL, the resolved role name and the role / nickname colors and
+gradients. The read side is one query on one narrow indexed table, with no
+joins to roles, gradients or themes.
+
+Rows are written, never computed per request. An after_flush hook refreshes
+the rows of players touched by ORM changes: the player itself, its gradient
+settings and admin roles, or a GradientTheme / AdminCustomRole it uses. Paths
+that skip the flush are covered too: query.update() / query.delete() on those
+classes by a do_orm_execute hook, and bulk Core statements (match ingest,
+total rebuilds, backup import, snapshot load) by calling refresh_rows().
+
+Usage: python leaderboard_rows.py rebuild
+"""
+
+from sqlalchemy import event, inspect, select, delete, insert
+
+from app import db
+from models import (Player, LeaderboardRow, PlayerGradientSetting, PlayerAdminRole,
+                    GradientTheme, AdminCustomRole)
+
+REFRESH_CHUNK_SIZE = 500
+
+# ?sort= value -> LeaderboardRow column
+ROW_SORTS = {
+    'experience': LeaderboardRow.experience,
+    'level': LeaderboardRow.level,
+    'kills': LeaderboardRow.kills,
+    'final_kills': LeaderboardRow.final_kills,
+    'beds_broken': LeaderboardRow.beds_broken,
+    'wins': LeaderboardRow.wins,
+    'kd_ratio': LeaderboardRow.kd_ratio,
+    'win_rate': LeaderboardRow.win_rate,
+}
+
+COPIED_FIELDS = ('nickname', 'server_ip', 'experience', 'kills', 'final_kills', 'deaths', 'final_deaths',
+                 'beds_broken', 'games_played', 'wins', 'render_version', 'last_updated')
+SOURCE_FIELDS = COPIED_FIELDS + ('role', 'custom_avatar_url', 'skin_type', 'skin_url', 'is_premium',
+                                 'custom_role_purchased', 'custom_role_color', 'custom_role_gradient',
+                                 'leaderboard_name_color')
+GRADIENT_ELEMENTS = ('nickname', 'role')
+
+_row = LeaderboardRow.__table__
+_player = Player.__table__
+_setting = PlayerGradientSetting.__table__
+_theme = GradientTheme.__table__
+_player_role = PlayerAdminRole.__table__
+_role = AdminCustomRole.__table__
+
+
+def _admin_roles(connection, player_ids):
+    """First active admin role per player, as Player.active_admin_role picks it"""
+    rows = connection.execute(
+        select(_player_role.c.player_id, _role.c.name, _role.c.color,
+               _role.c.has_gradient, _role.c.gradient_end_color)
+        .join(_role, _role.c.id == _player_role.c.role_id)
+        .where(_player_role.c.player_id.in_(player_ids), _player_role.c.is_active == True)
+        .order_by(_player_role.c.id)
+    )
+    roles = {}
+    for row in rows:
+        roles.setdefault(row.player_id, row)
+    return roles
+
+
+def _css_gradient(row):
+    """Same rule as PlayerGradientSetting.css_gradient"""
+    if row.gradient_theme_id and row.color1:
+        colors = ', '.join(c for c in (row.color1, row.color2, row.color3) if c)
+        return f"linear-gradient({row.gradient_direction}, {colors})"
+    if row.custom_color1 and row.custom_color2:
+        colors = ', '.join(c for c in (row.custom_color1, row.custom_color2, row.custom_color3) if c)
+        return f"linear-gradient(45deg, {colors})"
+    return None
+
+
+def _gradients(connection, player_ids):
+    """{(player_id, element): css} for the enabled nickname and role gradient settings"""
+    rows = connection.execute(
+        select(_setting.c.player_id, _setting.c.element_type, _setting.c.gradient_theme_id,
+               _setting.c.custom_color1, _setting.c.custom_color2, _setting.c.custom_color3,
+               _theme.c.color1, _theme.c.color2, _theme.c.color3, _theme.c.gradient_direction)
+        .outerjoin(_theme, _theme.c.id == _setting.c.gradient_theme_id)
+        .where(_setting.c.player_id.in_(player_ids), _setting.c.is_enabled == True,
+               _setting.c.element_type.in_(GRADIENT_ELEMENTS))
+        .order_by(_setting.c.id)
+    )
+    gradients = {}
+    for row in rows:
+        gradients.setdefault((row.player_id, row.element_type), _css_gradient(row))
+    return gradients
+
+
+def build_rows(connection, player_ids):
+    """Compute LeaderboardRow values for a chunk of players"""
+    sources = connection.execute(
+        select(_player.c.id, *[_player.c[field] for field in SOURCE_FIELDS])
+        .where(_player.c.id.in_(player_ids))
+    ).mappings().all()
+    roles = _admin_roles(connection, player_ids)
+    gradients = _gradients(connection, player_ids)
+
+    rows = []
+    for source in sources:
+        # A detached Player supplies the derived values with the model's own formulas
+        player = Player(**source)
+        row = {field: source[field] for field in COPIED_FIELDS}
+        row.update(
+            player_id=source['id'],
+            minecraft_skin_url=player.minecraft_skin_url,
+            level=player.level,
+            level_progress=player.level_progress,
+            kd_ratio=player.kd_ratio,
+            win_rate=player.win_rate,
+            star_rating=player.star_rating,
+            nickname_gradient=gradients.get((source['id'], 'nickname')),
+            name_color=source['leaderboard_name_color'],
+        )
+        role = roles.get(source['id'])
+        if role:
+            row.update(display_role=role.name, role_color=role.color,
+                       role_gradient=(f"linear-gradient(45deg, {role.color}, {role.gradient_end_color})"
+                                      if role.has_gradient and role.gradient_end_color else None))
+        elif source['custom_role_purchased']:
+            row.update(display_role=source['role'], role_color=source['custom_role_color'],
+                       role_gradient=source['custom_role_gradient'])
+        else:
+            row.update(display_role=source['role'], role_color=None,
+                       role_gradient=gradients.get((source['id'], 'role')))
+        rows.append(row)
+    return rows
+
+
+def refresh_rows(connection=None, player_ids=None):
+    """Rewrite the rows of the given players (all players when None); returns rows written"""
+    connection = connection if connection is not None else db.session.connection()
+    if player_ids is None:
+        connection.execute(delete(_row))
+        player_ids = connection.execute(select(_player.c.id).order_by(_player.c.id)).scalars().all()
+    player_ids = list(player_ids)
+
+    written = 0
+    for start in range(0, len(player_ids), REFRESH_CHUNK_SIZE):
+        chunk = player_ids[start:start + REFRESH_CHUNK_SIZE]
+        rows = build_rows(connection, chunk)
+        connection.execute(delete(_row).where(_row.c.player_id.in_(chunk)))
+        if rows:
+            connection.execute(insert(_row), rows)
+        written += len(rows)
+    return written
+
+
+def leaderboard(sort_by='experience', limit=50, offset=0):
+    """Leaderboard page straight from the read model"""
+    column = ROW_SORTS.get(sort_by, LeaderboardRow.experience)
+    query = LeaderboardRow.query
+    if sort_by == 'win_rate':
+        query = query.filter(LeaderboardRow.games_played > 0)
+    limit = min(max(1, limit), 100)
+    return (query.order_by(column.desc(), LeaderboardRow.player_id.desc())
+            .offset(max(0, offset)).limit(limit).all())
+
+
+def rows_for(player_ids):
+    """Rows of the given players, in the given order (for rankings kept elsewhere)"""
+    player_ids = list(player_ids)
+    if not player_ids:
+        return []
+    rows = {row.player_id: row for row in LeaderboardRow.query.filter(LeaderboardRow.player_id.in_(player_ids))}
+    return [rows[player_id] for player_id in player_ids if player_id in rows]
+
+
+def search(text, limit=50, offset=0):
+    """Nickname search over the read model"""
+    text = (text or '').strip()[:50]
+    if not text:
+        return []
+    limit = min(max(1, limit), 100)
+    return (LeaderboardRow.query.filter(LeaderboardRow.nickname.ilike(f'%{text}%'))
+            .order_by(LeaderboardRow.experience.desc(), LeaderboardRow.player_id.desc())
+            .offset(max(0, offset)).limit(limit).all())
+
+
+# Shared definitions -> (link table, link column) whose holders must be refreshed
+_SHARED = {
+    GradientTheme: (_setting, 'gradient_theme_id'),
+    AdminCustomRole: (_player_role, 'role_id'),
+}
+
+
+def _after_flush(session, flush_context):
+    """Refresh the rows of every player whose display inputs changed in this flush"""
+    player_ids = set()
+    removed = set()
+    shared = {}
+    for obj in session.new:
+        if isinstance(obj, Player):
+            player_ids.add(obj.id)
+        elif isinstance(obj, (PlayerGradientSetting, PlayerAdminRole)):
+            player_ids.add(obj.player_id)
+    for obj in session.dirty:
+        if isinstance(obj, Player):
+            if inspect(obj).modified:
+                player_ids.add(obj.id)
+        elif isinstance(obj, (PlayerGradientSetting, PlayerAdminRole)):
+            player_ids.add(obj.player_id)
+        elif type(obj) in _SHARED:
+            shared.setdefault(type(obj), set()).add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Player):
+            removed.add(obj.id)
+        elif isinstance(obj, (PlayerGradientSetting, PlayerAdminRole)):
+            player_ids.add(obj.player_id)
+        elif type(obj) in _SHARED:
+            shared.setdefault(type(obj), set()).add(obj.id)
+
+    if not (player_ids or removed or shared):
+        return
+    connection = session.connection()
+    for definition, ids in shared.items():
+        link, column = _SHARED[definition]
+        player_ids.update(connection.execute(
+            select(link.c.player_id).where(link.c[column].in_(ids))
+        ).scalars())
+    if removed:
+        connection.execute(delete(_row).where(_row.c.player_id.in_(removed)))
+    player_ids.discard(None)
+    refresh_rows(connection, player_ids - removed)
+
+
+# Mapped classes written with query.update() / query.delete() -> their player id column,
+# or for shared definitions their own id (the holders are found through _SHARED)
+_BULK_TARGETS = {
+    Player: Player.id,
+    PlayerGradientSetting: PlayerGradientSetting.player_id,
+    PlayerAdminRole: PlayerAdminRole.player_id,
+    GradientTheme: GradientTheme.id,
+    AdminCustomRole: AdminCustomRole.id,
+}
+
+
+def _on_execute(orm_execute_state):
+    """Bulk ORM updates and deletes skip the flush; refresh the matched players after them"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    key = _BULK_TARGETS.get(mapper.class_) if mapper is not None else None
+    if key is None:
+        return None
+    session = orm_execute_state.session
+    whereclause = orm_execute_state.statement.whereclause
+    matched = select(key) if whereclause is None else select(key).where(whereclause)
+    player_ids = set(session.execute(matched).scalars())
+    if mapper.class_ in _SHARED and player_ids:
+        link, column = _SHARED[mapper.class_]
+        player_ids = set(session.execute(
+            select(link.c.player_id).where(link.c[column].in_(player_ids))
+        ).scalars())
+    result = orm_execute_state.invoke_statement()
+    refresh_rows(session.connection(), player_ids)
+    return result
+
+
+event.listen(db.session, 'after_flush', _after_flush)
+event.listen(db.session, 'do_orm_execute', _on_execute)
+
+
+if __name__ == '__main__':
+    import sys
+    from app import app
+
+    if sys.argv[1:] != ['rebuild']:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    with app.app_context():
+        written = refresh_rows()
+        db.session.commit()
+        print(f"Leaderboard rows rebuilt: {written}")
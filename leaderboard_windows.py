@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Time-windowed and seasonal leaderboards.
+
+Rankings by stat gains over the last 24 hours, 7 days, 30 days or the current
+season are materialized into WindowedStat by refresh_windows(): one grouped
+INSERT ... SELECT over the match history facts (MatchParticipation, indexed by
+played_at) per window. Only match results count as gains: admin adjustments
+and pre-history baselines are left out, so an instance that does not ingest
+matches has empty windows (the page says so). The leaderboard page only reads
+the materialized rows through the (window_key, stat, player_id) indexes and
+takes the players' display fields from the leaderboard rows.
+
+Run refresh_windows() on a schedule (every few minutes for 24h is plenty):
+``python leaderboard_windows.py`` or POST /admin/leaderboard_windows/refresh.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, func, literal, or_, String, DateTime
+
+from app import db
+from models import Player, MatchParticipation, WindowedStat, Season
+
+# ?window= values with a rolling length; 'season' means the current season
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+WINDOW_CHOICES = tuple(WINDOWS) + ('season',)
+
+# MatchParticipation.source values that count as gains (not 'adjustment' or 'baseline')
+GAIN_SOURCES = ('match',)
+
+WINDOW_FIELDS = ('kills', 'final_kills', 'deaths', 'beds_broken', 'games_played', 'wins')
+WINDOW_SORTS = ('experience', 'kills', 'final_kills', 'beds_broken', 'wins')
+
+# XP per stat point, as in Player.calculate_auto_experience before performance bonuses
+XP_WEIGHTS = {'kills': 15, 'final_kills': 75, 'beds_broken': 150, 'wins': 300, 'games_played': 40}
+RESOURCE_FIELDS = ('iron_collected', 'gold_collected', 'diamond_collected', 'emerald_collected')
+
+_fact = MatchParticipation.__table__
+_player = Player.__table__
+_windowed = WindowedStat.__table__
+
+
+def season_key(season):
+    return f'season:{season.id}'
+
+
+def _materialize(key, start, end, now):
+    """Replace one window's rows with per-player gains from facts played in [start, end)"""
+    db.session.execute(_windowed.delete().where(_windowed.c.window_key == key))
+
+    sums = {field: func.sum(_fact.c[field]) for field in WINDOW_FIELDS + RESOURCE_FIELDS}
+    experience = sum(weight * sums[field] for field, weight in XP_WEIGHTS.items()) + \
+        sum(sums[field] for field in RESOURCE_FIELDS) // 8
+    query = (select(_fact.c.player_id, literal(key, String), literal(now, DateTime), experience,
+                    *[sums[field] for field in WINDOW_FIELDS])
+             .join(_player, _player.c.id == _fact.c.player_id)
+             .where(_fact.c.played_at >= start, _fact.c.source.in_(GAIN_SOURCES))
+             .group_by(_fact.c.player_id)
+             .having(or_(sums['games_played'] > 0, experience > 0)))
+    if end is not None:
+        query = query.where(_fact.c.played_at < end)
+
+    return db.session.execute(
+        insert(_windowed).from_select(
+            ['player_id', 'window_key', 'computed_at', 'experience', *WINDOW_FIELDS], query)
+    ).rowcount
+
+
+def refresh_windows(now=None):
+    """Rebuild every rolling window and every started active season; commits.
+
+    A season that ended before its last refresh is left as is. Returns rows per window key.
+    """
+    now = now or datetime.utcnow()
+    counts = {}
+    for key, length in WINDOWS.items():
+        counts[key] = _materialize(key, now - length, None, now)
+
+    for season in Season.query.filter(Season.is_active == True, Season.starts_at <= now):
+        key = season_key(season)
+        if season.ends_at and season.ends_at < now:
+            computed = (db.session.query(func.max(WindowedStat.computed_at))
+                        .filter(WindowedStat.window_key == key).scalar())
+            if computed and computed >= season.ends_at:
+                continue
+        counts[key] = _materialize(key, season.starts_at, season.ends_at, now)
+
+    db.session.commit()
+    return counts
+
+
+def resolve_window(window):
+    """Window key for a ?window= value, or None if unknown (or no season is running)"""
+    if window in WINDOWS:
+        return window
+    if window == 'season':
+        season = Season.current()
+        return season_key(season) if season else None
+    return None
+
+
+def window_leaderboard(window, sort_by='experience', limit=50, offset=0):
+    """Player ids and gains of a window's materialized rows, best first (players are read elsewhere)"""
+    key = resolve_window(window)
+    if key is None:
+        return []
+    column = _windowed.c[sort_by if sort_by in WINDOW_SORTS else 'experience']
+    return db.session.execute(
+        select(_windowed.c.player_id, _windowed.c.experience, *[_windowed.c[field] for field in WINDOW_FIELDS])
+        .where(_windowed.c.window_key == key)
+        .order_by(column.desc(), _windowed.c.player_id.desc())
+        .offset(offset).limit(limit)
+    ).all()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        for key, rows in refresh_windows().items():
+            print(f"{key}: {rows} players")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Per-match stat history and the lifetime totals derived from it.
+
+Every change to a player's lifetime counters is recorded as a MatchParticipation
+fact, so Player.kills etc. are always the sum of the player's facts:
+
+* matches pushed through /api/ingest/matches write one 'match' fact per player
+  alongside the set-based counter UPDATE (see ingest.py);
+* any other change made through the ORM (admin edits, /modify, quest rewards)
+  is turned into an 'adjustment' fact by a before_flush hook;
+* players created with non-zero counters, and players that predate the fact
+  table, get a single 'baseline' fact.
+
+rebuild_player_totals() recomputes every player's counters from the facts in
+one streaming grouped pass, rewriting only the rows that drifted.
+
+Usage: python match_history.py rebuild
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select, insert, exists, func, literal, bindparam, or_
+
+from app import db
+from models import Player, MatchParticipation
+
+# Lifetime Player counters maintained from facts
+STAT_FIELDS = (
+    'kills', 'final_kills', 'deaths', 'final_deaths', 'beds_broken', 'games_played', 'wins',
+    'iron_collected', 'gold_collected', 'diamond_collected', 'emerald_collected', 'items_purchased',
+)
+
+REBUILD_CHUNK_SIZE = 2000
+
+_player = Player.__table__
+_fact = MatchParticipation.__table__
+
+
+def _stored_stats(session, player_ids):
+    """Counters as currently stored in the database, for players whose old values were not loaded"""
+    rows = session.execute(
+        select(_player.c.id, *[_player.c[field] for field in STAT_FIELDS])
+        .where(_player.c.id.in_(list(player_ids)))
+    ).all()
+    return {row[0]: dict(zip(STAT_FIELDS, row[1:])) for row in rows}
+
+
+def _before_flush(session, flush_context, instances):
+    """Record ORM-made counter changes as facts before they are written"""
+    now = datetime.utcnow()
+    for obj in list(session.new):
+        if isinstance(obj, Player):
+            values = {field: getattr(obj, field) or 0 for field in STAT_FIELDS}
+            if any(values.values()):
+                session.add(MatchParticipation(player=obj, source='baseline', played_at=now,
+                                               recorded_at=now, **values))
+
+    changes = {}
+    unloaded = set()
+    for obj in session.dirty:
+        if not isinstance(obj, Player) or obj.id is None:
+            continue
+        state = inspect(obj)
+        for field in STAT_FIELDS:
+            history = state.attrs[field].history
+            if history.added:
+                changes.setdefault(obj, {})[field] = history
+                if not history.deleted:
+                    unloaded.add(obj.id)
+    if not changes:
+        return
+
+    stored = _stored_stats(session, unloaded) if unloaded else {}
+    for obj, histories in changes.items():
+        deltas = {}
+        for field, history in histories.items():
+            old = history.deleted[0] if history.deleted else stored.get(obj.id, {}).get(field)
+            delta = (history.added[0] or 0) - (old or 0)
+            if delta:
+                deltas[field] = delta
+        if deltas:
+            session.add(MatchParticipation(player_id=obj.id, source='adjustment', played_at=now,
+                                           recorded_at=now, **deltas))
+
+
+event.listen(db.session, 'before_flush', _before_flush)
+
+
+def record_match_facts(facts, recorded_at=None):
+    """Bulk-insert match facts: dicts with match_id, player_id, game_mode_id, played_at and STAT_FIELDS"""
+    if not facts:
+        return
+    recorded_at = recorded_at or datetime.utcnow()
+    db.session.execute(insert(MatchParticipation), [
+        dict(fact, source='match', recorded_at=recorded_at) for fact in facts
+    ])
+
+
+def seed_baselines():
+    """Give every player with counters but no facts yet (pre-history data) a baseline fact.
+
+    One INSERT ... SELECT; returns the number of players seeded.
+    """
+    now = datetime.utcnow()
+    has_facts = exists().where(_fact.c.player_id == _player.c.id)
+    query = (select(_player.c.id, literal('baseline'), func.coalesce(_player.c.created_at, now), literal(now),
+                    *[_player.c[field] for field in STAT_FIELDS])
+             .where(~has_facts, or_(*[_player.c[field] != 0 for field in STAT_FIELDS])))
+    result = db.session.execute(
+        insert(_fact).from_select(['player_id', 'source', 'played_at', 'recorded_at', *STAT_FIELDS], query)
+    )
+    return result.rowcount
+
+
+def rebuild_player_totals(chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute all players' lifetime counters from their facts.
+
+    Streams per-player fact sums next to the stored counters in player id order
+    and rewrites only players whose counters drifted, one executemany per chunk.
+    Clan aggregates are rebuilt afterwards. Returns (players seeded, players fixed).
+    """
+    from clan_stats import rebuild_clan_stats
+    from leaderboard_rows import refresh_rows
+
+    seeded = seed_baselines()
+    sums = (select(_fact.c.player_id, *[func.sum(_fact.c[field]).label(field) for field in STAT_FIELDS])
+            .group_by(_fact.c.player_id)
+            .subquery())
+    query = (select(_player.c.id,
+                    *[_player.c[field] for field in STAT_FIELDS],
+                    *[func.coalesce(sums.c[field], 0) for field in STAT_FIELDS])
+             .select_from(_player.outerjoin(sums, sums.c.player_id == _player.c.id))
+             .order_by(_player.c.id))
+    statement = (_player.update().where(_player.c.id == bindparam('player_id'))
+                 .values(**{field: bindparam(f'total_{field}') for field in STAT_FIELDS}))
+
+    count = len(STAT_FIELDS)
+    fixed = 0
+    pending = []
+    for row in db.session.execute(query.execution_options(yield_per=chunk_size)):
+        stored, totals = row[1:1 + count], row[1 + count:]
+        if tuple(stored) != tuple(totals):
+            pending.append(dict({f'total_{field}': total for field, total in zip(STAT_FIELDS, totals)},
+                                player_id=row[0]))
+        if len(pending) >= chunk_size:
+            db.session.execute(statement, pending)
+            fixed += len(pending)
+            pending = []
+    if pending:
+        db.session.execute(statement, pending)
+        fixed += len(pending)
+
+    if fixed:
+        rebuild_clan_stats()
+        refresh_rows()
+    db.session.commit()
+    return seeded, fixed
+
+
+if __name__ == '__main__':
+    import sys
+    from app import app
+
+    if sys.argv[1:] != ['rebuild']:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    with app.app_context():
+        seeded, fixed = rebuild_player_totals()
+        Player.clear_statistics_cache()
+        print(f"Baselines seeded: {seeded}, players corrected: {fixed}")
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+The schema version lives in the schema_version table (one row per applied
+migration). upgrade() applies only the pending entries of MIGRATIONS, in
+order, each in its own transaction together with its version row. It runs
+under an exclusive lock - pg_advisory_lock on PostgreSQL, a file lock next to
+the database otherwise - so when several gunicorn workers boot at once one of
+them migrates and the others wait, re-check and find nothing to do. Once the
+database is current, startup costs a single primary-key query plus the
+seed checksum comparison of seeds.seed_all().
+
+Migration 1 adopts databases created by the old drop_all()/create_all() boot
+(and by migrate_db.py): it creates missing tables, columns and indexes from
+schema_baseline.py, a frozen copy of the models, so a fresh database gets the
+same schema as an adopted one before the later migrations run. The following ones backfill the data those new tables and columns
+derive from, absorb migrate_ascend.py, and create the seed_checksum table
+(seeds.seed_all() inserts the default data after the migrations). They run
+frozen SQL on the connection they are given, through lightweight table()
+constructs, with their own copies of the formulas they need (levels, ratios,
+star rating, skins, roles), so later changes to the models and modules never
+change what an old migration does.
+
+Migration 1 cannot add a unique constraint to a table that already exists
+(create_all() skips it and SQLite has no ADD CONSTRAINT), so migration 8
+resolves the duplicates old tournament participant and clan membership rows
+may hold and adds their uniqueness as unique indexes.
+
+A failed migration stops the boot: serving against a half-migrated schema is
+worse than not serving. The version rows alone are not trusted either: when
+model tables are missing at the latest version (a drop_all() leaves
+schema_version behind), the baseline schema is recreated and reseeded.
+
+New schema changes are appended to MIGRATIONS as new functions; never edit or
+reorder applied ones.
+
+Deploys that run `python migrations.py upgrade` as a release step can set
+MIGRATE_ON_STARTUP=0 to skip the startup check entirely.
+
+Usage: python migrations.py upgrade|status
+"""
+
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import (MetaData, Table, Column, Index, Integer, String, Boolean, DateTime, table, column, inspect,
+                        select, insert, update, delete, exists, case, or_, func, literal, text)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from app import app, db
+
+LOCK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'migrations.lock')
+ADVISORY_LOCK_KEY = 4712047  # Arbitrary, shared by every process migrating this database
+
+# Kept out of db.metadata so drop_all(), backups and snapshots never touch it
+_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _column_ddl(column, dialect):
+    """ADD COLUMN clause for a model column; NOT NULL only when a scalar default can fill old rows"""
+    ddl = f'{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        value = literal(default, column.type).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        ddl += f' DEFAULT {value}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+    return ddl
+
+
+def baseline_schema(connection):
+    """Create the tables, columns and indexes of the frozen baseline schema that the database lacks"""
+    from schema_baseline import metadata
+
+    metadata.create_all(bind=connection)
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                connection.execute(text(
+                    f'ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {_column_ddl(column, connection.dialect)}'
+                ))
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+
+# Lightweight tables with the columns the data migrations below read and write as
+# they were when those migrations were added; unlike the models, they never change
+_player = table(
+    'player', column('id'), column('nickname'), column('server_ip'), column('role'),
+    column('experience'), column('kills'), column('final_kills'), column('deaths'), column('final_deaths'),
+    column('beds_broken'), column('games_played'), column('wins'), column('iron_collected'),
+    column('gold_collected'), column('diamond_collected'), column('emerald_collected'),
+    column('items_purchased'), column('render_version'), column('created_at', DateTime),
+    column('last_updated', DateTime), column('custom_avatar_url'), column('skin_type'), column('skin_url'),
+    column('is_premium'), column('custom_role_purchased'), column('custom_role_color'),
+    column('custom_role_gradient'), column('leaderboard_name_color'),
+)
+_match_participation = table(
+    'match_participation', column('player_id'), column('source'), column('played_at', DateTime),
+    column('recorded_at', DateTime), column('kills'), column('final_kills'), column('deaths'),
+    column('final_deaths'), column('beds_broken'), column('games_played'), column('wins'),
+    column('iron_collected'), column('gold_collected'), column('diamond_collected'),
+    column('emerald_collected'), column('items_purchased'),
+)
+_clan = table(
+    'clan', column('id'), column('total_kills'), column('total_final_kills'), column('total_deaths'),
+    column('total_wins'), column('total_games'), column('total_beds_broken'), column('total_experience'),
+    column('member_count'), column('avg_kd'),
+)
+_clan_member = table('clan_member', column('id'), column('clan_id'), column('player_id'), column('is_active'))
+_tournament = table('tournament', column('id'), column('participant_count'))
+_tournament_participant = table('tournament_participant', column('id'), column('tournament_id'), column('player_id'))
+_ascend_data = table(
+    'ascend_data', column('id'), column('player_id'), column('pvp_tier'), column('clutching_tier'),
+    column('block_placement_tier'), column('gamesense_tier'), column('overall_tier'), column('pvp_score'),
+    column('clutching_score'), column('block_placement_score'), column('gamesense_score'),
+    column('comment'), column('evaluator_name'), column('created_at', DateTime), column('updated_at', DateTime),
+)
+_leaderboard_row = table(
+    'leaderboard_row', column('player_id'), column('nickname'), column('server_ip'),
+    column('minecraft_skin_url'), column('experience'), column('level'), column('level_progress'),
+    column('kills'), column('final_kills'), column('deaths'), column('final_deaths'), column('beds_broken'),
+    column('games_played'), column('wins'), column('kd_ratio'), column('win_rate'), column('star_rating'),
+    column('display_role'), column('role_color'), column('role_gradient'), column('nickname_gradient'),
+    column('name_color'), column('render_version'), column('last_updated', DateTime),
+)
+_player_gradient_setting = table(
+    'player_gradient_setting', column('id'), column('player_id'), column('element_type'),
+    column('gradient_theme_id'), column('custom_color1'), column('custom_color2'), column('custom_color3'),
+    column('is_enabled'),
+)
+_gradient_theme = table(
+    'gradient_theme', column('id'), column('color1'), column('color2'), column('color3'),
+    column('gradient_direction'),
+)
+_player_admin_role = table(
+    'player_admin_role', column('id'), column('player_id'), column('role_id'), column('is_active'),
+)
+_admin_custom_role = table(
+    'admin_custom_role', column('id'), column('name'), column('color'), column('has_gradient'),
+    column('gradient_end_color'),
+)
+
+# Player counters that match facts carry
+STAT_FIELDS = (
+    'kills', 'final_kills', 'deaths', 'final_deaths', 'beds_broken', 'games_played', 'wins',
+    'iron_collected', 'gold_collected', 'diamond_collected', 'emerald_collected', 'items_purchased',
+)
+# Player column -> Clan aggregate column
+CLAN_STAT_FIELDS = {
+    'kills': 'total_kills',
+    'final_kills': 'total_final_kills',
+    'deaths': 'total_deaths',
+    'wins': 'total_wins',
+    'games_played': 'total_games',
+    'beds_broken': 'total_beds_broken',
+    'experience': 'total_experience',
+}
+LEADERBOARD_CHUNK_SIZE = 500
+
+
+def _level_start(level):
+    """Experience at which a player reaches the level (Hypixel thresholds, 2500 XP per level past 100)"""
+    if level <= 100:
+        return 10000 * (level - 1) + 1250 * (level - 1) * (level - 2)
+    return _level_start(100) + (level - 100) * 2500
+
+
+def _level(experience):
+    if experience >= _level_start(100):
+        return min(1000, 100 + (experience - _level_start(100)) // 2500)
+    level = 1
+    while level < 100 and experience >= _level_start(level + 1):
+        level += 1
+    return level
+
+
+def _level_progress(experience, level):
+    if level >= 1000:
+        return 100
+    start, end = _level_start(level), _level_start(level + 1)
+    return min(100, max(0, round((experience - start) / (end - start) * 100, 1)))
+
+
+def _kd_ratio(kills, deaths):
+    if deaths == 0:
+        return kills if kills > 0 else 0
+    return round(kills / deaths, 2)
+
+
+def _win_rate(wins, games_played):
+    if games_played == 0:
+        return 0
+    return round(wins / games_played * 100, 1)
+
+
+def _star_rating(level, kd_ratio, win_rate, beds_broken, final_kills, games_played):
+    score = (min(20, level * 0.5) + min(15, kd_ratio * 3) + min(15, win_rate * 0.15)
+             + min(10, beds_broken * 0.1) + min(10, final_kills * 0.05) + min(5, games_played * 0.01))
+    return min(5, max(1, round(score / 13)))
+
+
+def _skin_url(source):
+    if source.custom_avatar_url:
+        return source.custom_avatar_url
+    if source.skin_type == 'custom' and source.skin_url:
+        return source.skin_url
+    if source.skin_type in ('steve', 'alex'):
+        return f'https://mc-heads.net/avatar/{source.skin_type}/128'
+    if source.is_premium and source.nickname:
+        return f'https://mc-heads.net/avatar/{source.nickname}/128'
+    default_skin = 'alex' if int(hashlib.md5(source.nickname.encode()).hexdigest(), 16) % 2 else 'steve'
+    return f'https://mc-heads.net/avatar/{default_skin}/128'
+
+
+def _css_gradient(row):
+    if row.gradient_theme_id and row.color1:
+        colors = ', '.join(c for c in (row.color1, row.color2, row.color3) if c)
+        return f"linear-gradient({row.gradient_direction}, {colors})"
+    if row.custom_color1 and row.custom_color2:
+        colors = ', '.join(c for c in (row.custom_color1, row.custom_color2, row.custom_color3) if c)
+        return f"linear-gradient(45deg, {colors})"
+    return None
+
+
+def _leaderboard_rows(connection, player_ids):
+    """Leaderboard row values for a chunk of players"""
+    setting, theme = _player_gradient_setting, _gradient_theme
+    gradients = {}
+    for row in connection.execute(
+        select(setting.c.player_id, setting.c.element_type, setting.c.gradient_theme_id,
+               setting.c.custom_color1, setting.c.custom_color2, setting.c.custom_color3,
+               theme.c.color1, theme.c.color2, theme.c.color3, theme.c.gradient_direction)
+        .select_from(setting.outerjoin(theme, theme.c.id == setting.c.gradient_theme_id))
+        .where(setting.c.player_id.in_(player_ids), setting.c.is_enabled == True,
+               setting.c.element_type.in_(('nickname', 'role')))
+        .order_by(setting.c.id)
+    ):
+        gradients.setdefault((row.player_id, row.element_type), _css_gradient(row))
+
+    link, role = _player_admin_role, _admin_custom_role
+    roles = {}
+    for row in connection.execute(
+        select(link.c.player_id, role.c.name, role.c.color, role.c.has_gradient, role.c.gradient_end_color)
+        .select_from(link.join(role, role.c.id == link.c.role_id))
+        .where(link.c.player_id.in_(player_ids), link.c.is_active == True)
+        .order_by(link.c.id)
+    ):
+        roles.setdefault(row.player_id, row)
+
+    rows = []
+    for source in connection.execute(select(_player).where(_player.c.id.in_(player_ids))):
+        stats = {field: getattr(source, field) or 0 for field in
+                 ('experience', 'kills', 'final_kills', 'deaths', 'final_deaths', 'beds_broken',
+                  'games_played', 'wins')}
+        level = _level(stats['experience'])
+        kd_ratio = _kd_ratio(stats['kills'], stats['deaths'])
+        win_rate = _win_rate(stats['wins'], stats['games_played'])
+        row = dict(
+            stats, player_id=source.id, nickname=source.nickname, server_ip=source.server_ip,
+            render_version=source.render_version or 0, last_updated=source.last_updated,
+            minecraft_skin_url=_skin_url(source), level=level,
+            level_progress=_level_progress(stats['experience'], level), kd_ratio=kd_ratio, win_rate=win_rate,
+            star_rating=_star_rating(level, kd_ratio, win_rate, stats['beds_broken'], stats['final_kills'],
+                                     stats['games_played']),
+            nickname_gradient=gradients.get((source.id, 'nickname')), name_color=source.leaderboard_name_color,
+        )
+        admin_role = roles.get(source.id)
+        if admin_role:
+            row.update(display_role=admin_role.name, role_color=admin_role.color,
+                       role_gradient=(f"linear-gradient(45deg, {admin_role.color}, {admin_role.gradient_end_color})"
+                                      if admin_role.has_gradient and admin_role.gradient_end_color else None))
+        elif source.custom_role_purchased:
+            row.update(display_role=source.role, role_color=source.custom_role_color,
+                       role_gradient=source.custom_role_gradient)
+        else:
+            row.update(display_role=source.role, role_color=None,
+                       role_gradient=gradients.get((source.id, 'role')))
+        rows.append(row)
+    return rows
+
+
+def match_history_baselines(connection):
+    """Baseline facts for players that predate match_participation"""
+    now = datetime.utcnow()
+    has_facts = exists().where(_match_participation.c.player_id == _player.c.id)
+    query = (select(_player.c.id, literal('baseline'), func.coalesce(_player.c.created_at, now), literal(now),
+                    *[_player.c[field] for field in STAT_FIELDS])
+             .where(~has_facts, or_(*[_player.c[field] != 0 for field in STAT_FIELDS])))
+    connection.execute(insert(_match_participation).from_select(
+        ['player_id', 'source', 'played_at', 'recorded_at', *STAT_FIELDS], query
+    ))
+
+
+def clan_aggregates(connection):
+    """Clan totals, member counts and K/D from the active members"""
+    sums = [func.coalesce(func.sum(_player.c[field]), 0).label(field) for field in CLAN_STAT_FIELDS]
+    totals = {row.clan_id: row for row in connection.execute(
+        select(_clan_member.c.clan_id, func.count().label('members'), *sums)
+        .select_from(_clan_member.join(_player, _player.c.id == _clan_member.c.player_id))
+        .where(_clan_member.c.is_active == True)
+        .group_by(_clan_member.c.clan_id)
+    )}
+    for clan_id in connection.execute(select(_clan.c.id)).scalars().all():
+        row = totals.get(clan_id)
+        values = {total: (getattr(row, field) if row else 0) for field, total in CLAN_STAT_FIELDS.items()}
+        values['member_count'] = row.members if row else 0
+        kills, deaths = values['total_kills'], values['total_deaths']
+        values['avg_kd'] = kills / deaths if deaths else float(kills)
+        connection.execute(update(_clan).where(_clan.c.id == clan_id).values(**values))
+
+
+def tournament_participant_counts(connection):
+    connection.execute(update(_tournament).values(participant_count=(
+        select(func.count()).where(_tournament_participant.c.tournament_id == _tournament.c.id).scalar_subquery()
+    )))
+
+
+# (minimum level, default ASCEND comment) from migrate_ascend.py, highest first
+ASCEND_COMMENTS = (
+    (200, "Legendary player with exceptional skills across all areas. Master of Bedwars with incredible game sense and clutching ability."),
+    (150, "Excellent player with strong fundamentals. Great PVP skills and tactical awareness make them a formidable opponent."),
+    (100, "Skilled player showing good understanding of game mechanics. Solid performance in most aspects of gameplay."),
+    (75, "Competent player with room for improvement. Focus on enhancing PVP skills and strategic thinking."),
+    (50, "Developing player with potential. Work on consistency and game awareness to reach the next level."),
+    (25, "Beginner with some experience. Focus on fundamentals like block placement and basic PVP techniques."),
+)
+ASCEND_DEFAULT_COMMENT = "New player still learning the basics. Practice regularly to improve overall gameplay and understanding."
+
+
+def ascend_defaults(connection):
+    """ASCEND card with the level-based default comment for every player without one"""
+    now = datetime.utcnow()
+    experience = func.coalesce(_player.c.experience, 0)
+    comment = case(*[(experience >= _level_start(level), literal(comment_text))
+                     for level, comment_text in ASCEND_COMMENTS],
+                   else_=literal(ASCEND_DEFAULT_COMMENT))
+    tiers = ('pvp_tier', 'clutching_tier', 'block_placement_tier', 'gamesense_tier', 'overall_tier')
+    scores = ('pvp_score', 'clutching_score', 'block_placement_score', 'gamesense_score')
+    query = (select(_player.c.id, comment, *[literal('D') for _ in tiers], *[literal(25) for _ in scores],
+                    literal('Elite Squad'), literal(now), literal(now))
+             .where(~exists().where(_ascend_data.c.player_id == _player.c.id)))
+    connection.execute(insert(_ascend_data).from_select(
+        ['player_id', 'comment', *tiers, *scores, 'evaluator_name', 'created_at', 'updated_at'], query
+    ))
+
+
+def leaderboard_rows(connection):
+    """Fill the leaderboard read model for every player"""
+    connection.execute(delete(_leaderboard_row))
+    player_ids = connection.execute(select(_player.c.id).order_by(_player.c.id)).scalars().all()
+    for start in range(0, len(player_ids), LEADERBOARD_CHUNK_SIZE):
+        rows = _leaderboard_rows(connection, player_ids[start:start + LEADERBOARD_CHUNK_SIZE])
+        if rows:
+            connection.execute(insert(_leaderboard_row), rows)
+
+
+def default_data(connection):
+    """The seed_checksum table; seeds.seed_all() fills the default data right after the migrations"""
+    Table(
+        'seed_checksum', MetaData(),
+        Column('name', String(64), primary_key=True),
+        Column('checksum', String(64), nullable=False),
+        Column('applied_at', DateTime, nullable=False),
+    ).create(bind=connection, checkfirst=True)
+
+
+def unique_indexes(connection):
+    """One row per tournament participant and one active clan membership per player.
+
+    Tables from the old boot allowed duplicates, so they are resolved first:
+    repeated participants keep their first row, and a player's active
+    memberships all end but the latest. Participant counts and clan aggregates
+    are recomputed when anything changed.
+    """
+    participant, member = _tournament_participant, _clan_member
+    first_rows = select(func.min(participant.c.id)).group_by(participant.c.tournament_id, participant.c.player_id)
+    removed = connection.execute(delete(participant).where(participant.c.id.not_in(first_rows))).rowcount
+    latest_rows = select(func.max(member.c.id)).where(member.c.is_active == True).group_by(member.c.player_id)
+    ended = connection.execute(
+        update(member).where(member.c.is_active == True, member.c.id.not_in(latest_rows)).values(is_active=False)
+    ).rowcount
+    if removed:
+        tournament_participant_counts(connection)
+    if ended:
+        clan_aggregates(connection)
+
+    indexes = MetaData()
+    participants = Table('tournament_participant', indexes, Column('tournament_id', Integer),
+                         Column('player_id', Integer))
+    memberships = Table('clan_member', indexes, Column('player_id', Integer), Column('is_active', Boolean))
+    enforced = [constraint['column_names'] for constraint in
+                inspect(connection).get_unique_constraints('tournament_participant')]
+    if ['tournament_id', 'player_id'] not in enforced:
+        Index('uq_tournament_participant', participants.c.tournament_id, participants.c.player_id,
+              unique=True).create(bind=connection, checkfirst=True)
+    Index('uq_clan_member_active_player', memberships.c.player_id, unique=True,
+          sqlite_where=memberships.c.is_active == True,
+          postgresql_where=memberships.c.is_active == True).create(bind=connection, checkfirst=True)
+
+
+# (version, migration); append only
+MIGRATIONS = (
+    (1, baseline_schema),
+    (2, match_history_baselines),
+    (3, clan_aggregates),
+    (4, tournament_participant_counts),
+    (5, ascend_defaults),
+    (6, leaderboard_rows),
+    (7, default_data),
+    (8, unique_indexes),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version():
+    """Highest applied migration, 0 for a database that has never been migrated"""
+    if not inspect(db.engine).has_table('schema_version'):
+        return 0
+    return db.session.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def missing_tables():
+    """Model tables the database lacks, e.g. after a drop_all() that left schema_version behind"""
+    existing = set(inspect(db.engine).get_table_names())
+    return sorted(name for name in db.metadata.tables if name not in existing)
+
+
+def _forget_seeds():
+    """Drop the recorded seed checksums so seed_all() refills recreated tables"""
+    from seeds import seed_checksum
+    if inspect(db.session.connection()).has_table('seed_checksum'):
+        db.session.execute(delete(seed_checksum))
+
+
+@contextmanager
+def migration_lock():
+    """Exclusive lock across every process migrating this database"""
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as connection:
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+        return
+
+    os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+    with open(LOCK_FILE, 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def upgrade():
+    """Apply the pending migrations, then reseed changed default data; returns the migrations applied"""
+    from seeds import seed_all
+
+    applied = []
+    if current_version() < LATEST_VERSION:
+        with migration_lock():
+            schema_version.create(bind=db.engine, checkfirst=True)
+            version = current_version()
+            for number, migration in MIGRATIONS:
+                if number <= version:
+                    continue
+                app.logger.info(f"Applying migration {number}: {migration.__name__}")
+                try:
+                    migration(db.session.connection())
+                    db.session.execute(insert(schema_version).values(
+                        version=number, name=migration.__name__, applied_at=datetime.utcnow()
+                    ))
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                applied.append(migration.__name__)
+    elif missing_tables():
+        with migration_lock():
+            missing = missing_tables()
+            if missing:
+                app.logger.warning(f"Tables missing at schema version {LATEST_VERSION}: {', '.join(missing)}; "
+                                   f"recreating the baseline schema")
+                try:
+                    baseline_schema(db.session.connection())
+                    _forget_seeds()
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                applied.append(baseline_schema.__name__)
+    seed_all()
+    return applied
+
+
+def upgrade_on_startup():
+    """Startup hook: migrate unless disabled; a failure is logged and stops the boot"""
+    if os.environ.get('MIGRATE_ON_STARTUP', '1') == '0':
+        return
+    with app.app_context():
+        try:
+            upgrade()
+        except Exception as e:
+            app.logger.error(f"Database migration error: {e}")
+            raise
+
+
+if __name__ == '__main__':
+    import sys
+
+    command = sys.argv[1:]
+    if command not in (['upgrade'], ['status']):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    with app.app_context():
+        if command == ['upgrade']:
+            names = upgrade()
+            print(f"Applied: {', '.join(names)}" if names else "Database is up to date")
+        print(f"Schema version: {current_version()} of {LATEST_VERSION}")
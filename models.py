@@ -1,9 +1,34 @@
 from app import db
 from datetime import datetime
 from sqlalchemy import func
+from sqlalchemy.ext.hybrid import hybrid_property
 from functools import lru_cache
+from bisect import bisect_right
 import json
 
+# Hypixel level thresholds: experience needed for levels 1..100
+LEVEL_THRESHOLDS = [
+    0, 10000, 22500, 37500, 55000, 75000, 97500, 122500, 150000, 180000,
+    212500, 247500, 285000, 325000, 367500, 412500, 460000, 510000, 562500, 617500,
+    675000, 735000, 797500, 862500, 930000, 1000000, 1072500, 1147500, 1225000, 1305000,
+    1387500, 1472500, 1560000, 1650000, 1742500, 1837500, 1935000, 2035000, 2137500, 2242500,
+    2350000, 2460000, 2572500, 2687500, 2805000, 2925000, 3047500, 3172500, 3300000, 3430000,
+    3562500, 3697500, 3835000, 3975000, 4117500, 4262500, 4410000, 4560000, 4712500, 4867500,
+    5025000, 5185000, 5347500, 5512500, 5680000, 5850000, 6022500, 6197500, 6375000, 6555000,
+    6737500, 6922500, 7110000, 7300000, 7492500, 7687500, 7885000, 8085000, 8287500, 8492500,
+    8700000, 8910000, 9122500, 9337500, 9555000, 9775000, 9997500, 10222500, 10450000, 10680000,
+    10912500, 11147500, 11385000, 11625000, 11867500, 12112500, 12360000, 12610000, 12862500, 13117500
+]
+
+
+def level_for_experience(experience):
+    """Player level for an experience value (see LEVEL_THRESHOLDS)"""
+    if experience >= LEVEL_THRESHOLDS[-1]:
+        # For levels 100+, each level requires 2500 more XP than the previous
+        return min(1000, 100 + (experience - LEVEL_THRESHOLDS[-1]) // 2500)
+    return max(1, bisect_right(LEVEL_THRESHOLDS, experience))
+
+
 class ASCENDData(db.Model):
     """Model for storing ASCEND performance card data"""
 
@@ -68,6 +93,7 @@ class ASCENDData(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
 class Player(db.Model):
     """Enhanced model for storing detailed player Bedwars statistics"""
 
@@ -163,8 +189,20 @@ class Player(db.Model):
     custom_role_purchased = db.Column(db.Boolean, default=False, nullable=False)
     custom_emoji_slots = db.Column(db.Integer, default=0, nullable=False) # Added for custom emoji slots
 
+    # Bumped when the player's gradients, roles, titles or badges change (see fragment_cache.py)
+    render_version = db.Column(db.Integer, default=0, nullable=False)
+
     # Cursor customization removed for stability
 
+    # Leaderboard / tournament seeding indexes
+    __table_args__ = (
+        db.Index('ix_player_experience', 'experience', 'id'),
+        db.Index('ix_player_kills', 'kills', 'id'),
+        db.Index('ix_player_final_kills', 'final_kills', 'id'),
+        db.Index('ix_player_beds_broken', 'beds_broken', 'id'),
+        db.Index('ix_player_wins', 'wins', 'id'),
+    )
+
     @property
     def active_custom_title(self):
         """Get player's active custom title"""
@@ -364,32 +402,25 @@ class Player(db.Model):
 
         # Check for active admin role styling
         if hasattr(self, 'active_admin_role') and self.active_admin_role:
-            admin_role = self.active_admin_role
-            style_parts = []
-            fallback_color = admin_role.role_color if admin_role.role_color else "#ffc107"
+            admin_role = self.active_admin_role.role
+            fallback_color = admin_role.color if admin_role.color else "#ffc107"
+            emoji_part = f"{admin_role.emoji} " if admin_role.emoji else ""
 
-            if admin_role.role_gradient and admin_role.role_gradient_start and admin_role.role_gradient_end:
-                gradient = f"linear-gradient(45deg, {admin_role.role_gradient_start}, {admin_role.role_gradient_end})"
-                style_parts.extend([
+            if admin_role.has_gradient and admin_role.gradient_end_color:
+                gradient = f"linear-gradient(45deg, {admin_role.color}, {admin_role.gradient_end_color})"
+                style_parts = [
                     f"background: {gradient}",
-                    "background-size: 200% 200%" if admin_role.role_gradient_animated else "background-size: 100% 100%",
+                    "background-size: 100% 100%",
                     "-webkit-background-clip: text",
                     "-webkit-text-fill-color: transparent",
                     "background-clip: text"
-                ])
-                if admin_role.role_gradient_animated:
-                    style_parts.append("animation: gradientShift 3s ease-in-out infinite")
-
+                ]
                 style_attr = f'style="{"; ".join(style_parts)}"'
-                emoji_part = f"{admin_role.role_emoji} " if admin_role.role_emoji else ""
                 return f'<span class="role-display admin-role gradient-role" {style_attr} data-fallback-color="{fallback_color}">{emoji_part}{role_name}</span>'
-            elif admin_role.role_color:
-                style_parts.append(f"color: {admin_role.role_color}")
-                style_attr = f'style="{"; ".join(style_parts)}"'
-                emoji_part = f"{admin_role.role_emoji} " if admin_role.role_emoji else ""
+            elif admin_role.color:
+                style_attr = f'style="color: {admin_role.color}"'
                 return f'<span class="role-display admin-role" {style_attr}>{emoji_part}{role_name}</span>'
             else:
-                emoji_part = f"{admin_role.role_emoji} " if admin_role.role_emoji else ""
                 return f'<span class="role-display admin-role">{emoji_part}{role_name}</span>'
 
         # Check for custom role styling
@@ -557,30 +588,7 @@ class Player(db.Model):
     @property
     def level(self):
         """Calculate player level based on Hypixel experience system"""
-        # Hypixel level thresholds
-        level_thresholds = [
-            0, 10000, 22500, 37500, 55000, 75000, 97500, 122500, 150000, 180000,
-            212500, 247500, 285000, 325000, 367500, 412500, 460000, 510000, 562500, 617500,
-            675000, 735000, 797500, 862500, 930000, 1000000, 1072500, 1147500, 1225000, 1305000,
-            1387500, 1472500, 1560000, 1650000, 1742500, 1837500, 1935000, 2035000, 2137500, 2242500,
-            2350000, 2460000, 2572500, 2687500, 2805000, 2925000, 3047500, 3172500, 3300000, 3430000,
-            3562500, 3697500, 3835000, 3975000, 4117500, 4262500, 4410000, 4560000, 4712500, 4867500,
-            5025000, 5185000, 5347500, 5512500, 5680000, 5850000, 6022500, 6197500, 6375000, 6555000,
-            6737500, 6922500, 7110000, 7300000, 7492500, 7687500, 7885000, 8085000, 8287500, 8492500,
-            8700000, 8910000, 9122500, 9337500, 9555000, 9775000, 9997500, 10222500, 10450000, 10680000,
-            10912500, 11147500, 11385000, 11625000, 11867500, 12112500, 12360000, 12610000, 12862500, 13117500
-        ]
-
-        for level, threshold in enumerate(level_thresholds, 1):
-            if self.experience < threshold:
-                return max(1, level - 1)
-
-        # For levels 100+, each level requires 2500 more XP than the previous
-        if self.experience >= 13117500:
-            additional_levels = (self.experience - 13117500) // 2500
-            return min(1000, 100 + additional_levels)
-
-        return 100
+        return level_for_experience(self.experience)
 
     @property
     def level_progress(self):
@@ -589,23 +597,9 @@ class Player(db.Model):
         if current_level >= 1000:
             return 100
 
-        # Hypixel level thresholds
-        level_thresholds = [
-            0, 10000, 22500, 37500, 55000, 75000, 97500, 122500, 150000, 180000,
-            212500, 247500, 285000, 325000, 367500, 412500, 460000, 510000, 562500, 617500,
-            675000, 735000, 797500, 862500, 930000, 1000000, 1072500, 1147500, 1225000, 1305000,
-            1387500, 1472500, 1560000, 1650000, 1742500, 1837500, 1935000, 2035000, 2137500, 2242500,
-            2350000, 2460000, 2572500, 2687500, 2805000, 2925000, 3047500, 3172500, 3300000, 3430000,
-            3562500, 3697500, 3835000, 3975000, 4117500, 4262500, 4410000, 4560000, 4712500, 4867500,
-            5025000, 5185000, 5347500, 5512500, 5680000, 5850000, 6022500, 6197500, 6375000, 6555000,
-            6737500, 6922500, 7110000, 7300000, 7492500, 7687500, 7885000, 8085000, 8287500, 8492500,
-            8700000, 8910000, 9122500, 9337500, 9555000, 9775000, 9997500, 10222500, 10450000, 10680000,
-            10912500, 11147500, 11385000, 11625000, 11867500, 12112500, 12360000, 12610000, 12862500, 13117500
-        ]
-
         if current_level <= 100:
-            current_threshold = level_thresholds[current_level - 1] if current_level > 0 else 0
-            next_threshold = level_thresholds[current_level] if current_level < len(level_thresholds) else level_thresholds[-1] + 2500
+            current_threshold = LEVEL_THRESHOLDS[current_level - 1] if current_level > 0 else 0
+            next_threshold = LEVEL_THRESHOLDS[current_level] if current_level < len(LEVEL_THRESHOLDS) else LEVEL_THRESHOLDS[-1] + 2500
         else:
             # For levels 100+
             current_threshold = 13117500 + (current_level - 100) * 2500
@@ -907,6 +901,16 @@ class Player(db.Model):
         db.session.commit()
         return True
 
+    @classmethod
+    def spend_coins(cls, player_id, amount):
+        """Atomically deduct coins if the balance covers them; returns True on success"""
+        if amount <= 0:
+            return True
+        spent = cls.query.filter(cls.id == player_id, cls.coins >= amount).update(
+            {cls.coins: cls.coins - amount}, synchronize_session=False
+        )
+        return spent == 1
+
     @classmethod
     def add_player(cls, nickname, kills=0, final_kills=0, deaths=0, final_deaths=0, beds_broken=0,
                    games_played=0, wins=0, experience=0, role='Игрок', server_ip='',
@@ -937,6 +941,70 @@ class Player(db.Model):
         db.session.commit()
         return player
 
+    @classmethod
+    def delete_players(cls, player_ids=None):
+        """Delete players (all of them by default) with the rows that belong to them alone.
+
+        Their match facts, snapshots, window rows and other per-player rows
+        (PLAYER_OWNED_TABLES) go first as bulk statements, so none outlive the
+        player whether or not the database enforces foreign keys. Shared records
+        are never rewritten: a clan led by a deleted player passes to its senior
+        remaining member (officers first), and ValueError is raised before
+        anything changes for players who organized or entered a tournament or
+        lead a clan nobody else is left in. The caller commits.
+        """
+        from clan_stats import rebuild_clan_stats
+
+        tables = db.metadata.tables
+        player, clan, member = cls.__table__, tables['clan'], tables['clan_member']
+        doomed = db.select(player.c.id).correlate(None)
+        if player_ids is not None:
+            doomed = doomed.where(player.c.id.in_(list(player_ids)))
+
+        tournament, participant = tables['tournament'], tables['tournament_participant']
+        if db.session.execute(db.select(
+            db.or_(db.select(tournament.c.id).where(tournament.c.organizer_id.in_(doomed)).exists(),
+                   db.select(participant.c.id).where(participant.c.player_id.in_(doomed)).exists())
+        )).scalar():
+            raise ValueError("Players who organized or entered a tournament cannot be deleted")
+
+        successors = {}
+        for clan_id, in db.session.execute(db.select(clan.c.id).where(clan.c.leader_id.in_(doomed))):
+            successor = db.session.execute(
+                db.select(member.c.player_id)
+                .where(member.c.clan_id == clan_id, member.c.is_active == True, member.c.player_id.not_in(doomed))
+                .order_by((member.c.role == 'officer').desc(), member.c.joined_at, member.c.id)
+                .limit(1)
+            ).scalar()
+            if successor is None:
+                raise ValueError("A clan led by a deleted player has no other member to lead it")
+            successors[clan_id] = successor
+
+        for clan_id, successor in successors.items():
+            db.session.execute(clan.update().where(clan.c.id == clan_id).values(leader_id=successor))
+            db.session.execute(member.update().where(member.c.clan_id == clan_id, member.c.player_id == successor,
+                                                     member.c.is_active == True).values(role='leader'))
+        clan_ids = set(db.session.execute(
+            db.select(member.c.clan_id).where(member.c.player_id.in_(doomed), member.c.is_active == True)
+        ).scalars())
+        ascend = tables['ascend_data']
+        db.session.execute(ascend.update().where(ascend.c.evaluator_id.in_(doomed)).values(evaluator_id=None))
+        for name in PLAYER_OWNED_TABLES:
+            owned = tables[name]
+            db.session.execute(owned.delete().where(owned.c.player_id.in_(doomed)))
+        db.session.execute(player.delete().where(player.c.id.in_(doomed)))
+        if clan_ids:
+            rebuild_clan_stats(db.session.connection(), clan_ids)
+
+
+# Tables whose rows belong to a single player (player_id) and go with it
+PLAYER_OWNED_TABLES = (
+    'match_participation', 'player_stat_snapshot', 'windowed_stat', 'leaderboard_row', 'clan_member',
+    'ascend_data', 'player_quest', 'player_achievement', 'player_badge', 'player_title', 'player_admin_role',
+    'player_gradient_setting', 'player_active_booster', 'player_booster', 'player_purchase', 'shop_purchase',
+    'player_rating', 'player_game_rating', 'player_skill_rating', 'reputation_log',
+)
+
 
 class Quest(db.Model):
     """Quest system for gamification"""
@@ -1039,262 +1107,6 @@ class Quest(db.Model):
 
         db.session.commit()
 
-    @classmethod
-    def create_default_quests(cls):
-        """Create default quests for the game"""
-        # Permanent quests
-        permanent_quests = [
-            {
-                'title': 'Первая кровь',
-                'description': 'Убейте 10 игроков в режиме Bedwars',
-                'type': 'kills',
-                'target_value': 10,
-                'reward_xp': 1000,
-                'reward_coins': 250,
-                'reward_reputation': 10,
-                'reward_title': 'Воин',
-                'icon': 'fas fa-sword',
-                'difficulty': 'easy',
-                'quest_category': 'permanent',
-                'is_repeatable': False
-            },
-            {
-                'title': 'Разрушитель кроватей',
-                'description': 'Сломайте 5 кроватей противников',
-                'type': 'beds_broken',
-                'target_value': 5,
-                'reward_xp': 1500,
-                'reward_coins': 300,
-                'reward_reputation': 15,
-                'reward_title': 'Разрушитель',
-                'icon': 'fas fa-bed',
-                'difficulty': 'easy',
-                'quest_category': 'permanent',
-                'is_repeatable': False
-            },
-        ]
-
-        # Daily quests
-        daily_quests = [
-            {
-                'title': 'Ежедневный воин',
-                'description': 'Убейте 15 игроков сегодня',
-                'type': 'kills',
-                'target_value': 15,
-                'reward_xp': 500,
-                'reward_coins': 100,
-                'reward_reputation': 5,
-                'icon': 'fas fa-sword',
-                'difficulty': 'easy',
-                'quest_category': 'daily'
-            },
-            {
-                'title': 'Ежедневная охота',
-                'description': 'Совершите 5 финальных убийств',
-                'type': 'final_kills',
-                'target_value': 5,
-                'reward_xp': 800,
-                'reward_coins': 150,
-                'reward_reputation': 8,
-                'icon': 'fas fa-crosshairs',
-                'difficulty': 'medium',
-                'quest_category': 'daily'
-            },
-            {
-                'title': 'Ежедневный разрушитель',
-                'description': 'Сломайте 3 кровати',
-                'type': 'beds_broken',
-                'target_value': 3,
-                'reward_xp': 600,
-                'reward_coins': 120,
-                'reward_reputation': 6,
-                'icon': 'fas fa-bed',
-                'difficulty': 'easy',
-                'quest_category': 'daily'
-            },
-            {
-                'title': 'Ежедневный победитель',
-                'description': 'Выиграйте 2 игры',
-                'type': 'wins',
-                'target_value': 2,
-                'reward_xp': 1000,
-                'reward_coins': 200,
-                'reward_reputation': 10,
-                'icon': 'fas fa-trophy',
-                'difficulty': 'medium',
-                'quest_category': 'daily'
-            },
-            {
-                'title': 'Ежедневный майнер',
-                'description': 'Соберите 500 единиц железа',
-                'type': 'iron_collected',
-                'target_value': 500,
-                'reward_xp': 400,
-                'reward_coins': 80,
-                'reward_reputation': 4,
-                'icon': 'fas fa-hammer',
-                'difficulty': 'easy',
-                'quest_category': 'daily'
-            }
-        ]
-
-        # Weekly quests
-        weekly_quests = [
-            {
-                'title': 'Еженедельный воин',
-                'description': 'Убейте 100 игроков за неделю',
-                'type': 'kills',
-                'target_value': 100,
-                'reward_xp': 3000,
-                'reward_coins': 750,
-                'reward_reputation': 30,
-                'icon': 'fas fa-sword',
-                'difficulty': 'hard',
-                'quest_category': 'weekly'
-            },
-            {
-                'title': 'Мастер финальных убийств',
-                'description': 'Совершите 25 финальных убийств',
-                'type': 'final_kills',
-                'target_value': 25,
-                'reward_xp': 4000,
-                'reward_coins': 1000,
-                'reward_reputation': 40,
-                'icon': 'fas fa-skull',
-                'difficulty': 'hard',
-                'quest_category': 'weekly'
-            },
-            {
-                'title': 'Недельный чемпион',
-                'description': 'Выиграйте 15 игр за неделю',
-                'type': 'wins',
-                'target_value': 15,
-                'reward_xp': 5000,
-                'reward_coins': 1250,
-                'reward_reputation': 50,
-                'icon': 'fas fa-crown',
-                'difficulty': 'epic',
-                'quest_category': 'weekly'
-            }
-        ]
-
-        # Monthly quests
-        monthly_quests = [
-            {
-                'title': 'Легенда месяца',
-                'description': 'Убейте 500 игроков за месяц',
-                'type': 'kills',
-                'target_value': 500,
-                'reward_xp': 15000,
-                'reward_coins': 3000,
-                'reward_reputation': 150,
-                'icon': 'fas fa-fire',
-                'difficulty': 'epic',
-                'quest_category': 'monthly'
-            },
-            {
-                'title': 'Разрушитель империй',
-                'description': 'Сломайте 100 кроватей за месяц',
-                'type': 'beds_broken',
-                'target_value': 100,
-                'reward_xp': 12000,
-                'reward_coins': 2500,
-                'reward_reputation': 120,
-                'icon': 'fas fa-meteor',
-                'difficulty': 'epic',
-                'quest_category': 'monthly'
-            },
-            {
-                'title': 'Непобедимый',
-                'description': 'Выиграйте 50 игр за месяц',
-                'type': 'wins',
-                'target_value': 50,
-                'reward_xp': 20000,
-                'reward_coins': 4000,
-                'reward_reputation': 200,
-                'reward_title': 'Непобедимый',
-                'icon': 'fas fa-crown',
-                'difficulty': 'epic',
-                'quest_category': 'monthly'
-            }
-        ]
-
-        # Thematic quests (one-time only)
-        thematic_quests = [
-            {
-                'title': 'Рождественское чудо',
-                'description': 'Выиграйте 25 игр в рождественский сезон',
-                'type': 'wins',
-                'target_value': 25,
-                'reward_xp': 10000,
-                'reward_coins': 2000,
-                'reward_reputation': 100,
-                'reward_role': 'Рождественский герой',
-                'icon': 'fas fa-gifts',
-                'difficulty': 'epic',
-                'quest_category': 'thematic',
-                'is_repeatable': False
-            },
-            {
-                'title': 'Хэллоуинский кошмар',
-                'description': 'Совершите 100 финальных убийств в октябре',
-                'type': 'final_kills',
-                'target_value': 100,
-                'reward_xp': 12000,
-                'reward_coins': 2500,
-                'reward_reputation': 120,
-                'reward_role': 'Призрак Хэллоуина',
-                'icon': 'fas fa-ghost',
-                'difficulty': 'epic',
-                'quest_category': 'thematic',
-                'is_repeatable': False
-            }
-        ]
-
-        # Mythic quests (ultra rare, one-time only)
-        mythic_quests = [
-            {
-                'title': 'Властелин Bedwars',
-                'description': 'Достигните 1000 побед и K/D 5.0',
-                'type': 'wins',
-                'target_value': 1000,
-                'reward_xp': 50000,
-                'reward_coins': 10000,
-                'reward_reputation': 500,
-                'reward_role': 'Властелин Bedwars',
-                'reward_title': 'Властелин',
-                'icon': 'fas fa-dragon',
-                'difficulty': 'mythic',
-                'quest_category': 'mythic',
-                'is_repeatable': False
-            },
-            {
-                'title': 'Божество разрушения',
-                'description': 'Сломайте 2000 кроватей',
-                'type': 'beds_broken',
-                'target_value': 2000,
-                'reward_xp': 75000,
-                'reward_coins': 15000,
-                'reward_reputation': 750,
-                'reward_role': 'Божество разрушения',
-                'reward_title': 'Разрушитель миров',
-                'icon': 'fas fa-meteor',
-                'difficulty': 'mythic',
-                'quest_category': 'mythic',
-                'is_repeatable': False
-            }
-        ]
-
-        all_quests = permanent_quests + daily_quests + weekly_quests + monthly_quests + thematic_quests + mythic_quests
-
-        for quest_data in all_quests:
-            existing = cls.query.filter_by(title=quest_data['title']).first()
-            if not existing:
-                quest = cls(**quest_data)
-                db.session.add(quest)
-
-        db.session.commit()
-
 
 class PlayerQuest(db.Model):
     """Player progress on quests"""
@@ -1573,268 +1385,6 @@ class ShopItem(db.Model):
             app.logger.error(f"Error applying item effect: {e}")
             # Continue execution even if there's an error
 
-    @classmethod
-    def create_default_items(cls):
-        """Create default shop items"""
-        default_items = [
-            # Titles
-            {
-                'name': 'pro_gamer_title',
-                'display_name': 'Про-Геймер',
-                'description': 'Эксклюзивный титул для настоящих профессионалов',
-                'category': 'title',
-                'price_coins': 5000,
-                'price_reputation': 100,
-                'unlock_level': 25,
-                'rarity': 'epic',
-                'icon': 'fas fa-crown',
-                'item_data': '{"title_text": "Про-Геймер", "title_color": "#6f42c1"}'
-            },
-            {
-                'name': 'legend_title',
-                'display_name': 'Легенда',
-                'description': 'Титул для истинных легенд Bedwars',
-                'category': 'title',
-                'price_coins': 15000,
-                'price_reputation': 500,
-                'unlock_level': 50,
-                'rarity': 'legendary',
-                'icon': 'fas fa-dragon',
-                'item_data': '{"title_text": "Легенда", "title_color": "#ff9800", "is_gradient": true, "gradient_colors": "linear-gradient(45deg, #ff9800, #ffc107)"}'
-            },
-            {
-                'name': 'mythic_warrior_title',
-                'display_name': 'Мифический Воин',
-                'description': 'Сверхредкий титул для избранных',
-                'category': 'title',
-                'price_coins': 50000,
-                'price_reputation': 2000,
-                'unlock_level': 75,
-                'rarity': 'mythic',
-                'icon': 'fas fa-bolt',
-                'item_data': '{"title_text": "Мифический Воин", "title_color": "#9400d3", "is_gradient": true, "gradient_colors": "linear-gradient(45deg, #9400d3, #4b0082, #0000ff)"}'
-            },
-
-            # Boosters
-            {
-                'name': 'xp_booster_small',
-                'display_name': 'Малый бустер опыта',
-                'description': 'Получите +1000 опыта мгновенно',
-                'category': 'booster',
-                'price_coins': 1000,
-                'price_reputation': 0,
-                'unlock_level': 1,
-                'rarity': 'common',
-                'item_data': '{"booster_type": "xp", "bonus_amount": 1000}'
-            },
-            {
-                'name': 'xp_booster_large',
-                'display_name': 'Большой бустер опыта',
-                'description': 'Получите +10000 опыта мгновенно',
-                'category': 'booster',
-                'price_coins': 8000,
-                'price_reputation': 0,
-                'unlock_level': 10,
-                'rarity': 'epic',
-                'item_data': '{"booster_type": "xp", "bonus_amount": 10000}'
-            },
-            {
-                'name': 'coin_booster',
-                'display_name': 'Бустер койнов',
-                'description': 'Получите +2500 койнов мгновенно',
-                'category': 'booster',
-                'price_coins': 3000,
-                'price_reputation': 50,
-                'unlock_level': 15,
-                'rarity': 'uncommon',
-                'item_data': '{"booster_type": "coins", "bonus_amount": 2500}'
-            },
-            {
-                'name': 'reputation_booster',
-                'display_name': 'Бустер репутации',
-                'description': 'Получите +200 репутации мгновенно',
-                'category': 'booster',
-                'price_coins': 5000,
-                'price_reputation': 0,
-                'unlock_level': 20,
-                'rarity': 'rare',
-                'item_data': '{"booster_type": "reputation", "bonus_amount": 200}'
-            },
-
-            # Custom Roles
-            {
-                'name': 'basic_custom_role',
-                'display_name': 'Обычная кастомная роль',
-                'description': 'Создайте свою роль со статичным цветом',
-                'category': 'custom_role',
-                'price_coins': 5000,
-                'price_reputation': 0,
-                'unlock_level': 10,
-                'rarity': 'common',
-                'item_data': '{"role_type": "basic", "allows_color": true, "allows_gradient": false, "allows_animation": false, "allows_emoji": false}'
-            },
-            {
-                'name': 'gradient_custom_role',
-                'display_name': 'Особая роль с градиентом',
-                'description': 'Роль с красивым градиентом',
-                'category': 'custom_role',
-                'price_coins': 50000,
-                'price_reputation': 0,
-                'unlock_level': 40,
-                'rarity': 'epic',
-                'item_data': '{"role_type": "gradient", "allows_color": true, "allows_gradient": true, "allows_animation": false, "allows_emoji": false}'
-            },
-            {
-                'name': 'animated_custom_role',
-                'display_name': 'Особая анимированная роль',
-                'description': 'Роль с анимированным градиентом и эмодзи',
-                'category': 'custom_role',
-                'price_coins': 75000,
-                'price_reputation': 0,
-                'unlock_level': 40,
-                'rarity': 'legendary',
-                'item_data': '{"role_type": "animated", "allows_color": true, "allows_gradient": true, "allows_animation": true, "allows_emoji": true}'
-            },
-            {
-                'name': 'premium_animated_custom_role',
-                'display_name': 'Премиум анимированная роль',
-                'description': 'Топовая роль с максимальными возможностями',
-                'category': 'custom_role',
-                'price_coins': 100000,
-                'price_reputation': 0,
-                'unlock_level': 40,
-                'rarity': 'mythic',
-                'item_data': '{"role_type": "premium", "allows_color": true, "allows_gradient": true, "allows_animation": true, "allows_emoji": true}'
-            },
-             {
-                'name': 'emoji_slot_basic',
-                'display_name': 'Слот для эмодзи (базовый)',
-                'description': 'Добавляет 1 слот для кастомного эмодзи к роли',
-                'category': 'emoji_slot',
-                'price_coins': 10000,
-                'price_reputation': 200,
-                'unlock_level': 10,
-                'rarity': 'uncommon',
-                'item_data': '{"emoji_slots": 1}'
-            },
-            {
-                'name': 'emoji_slot_premium',
-                'display_name': 'Слот для эмодзи (премиум)',
-                'description': 'Добавляет 2 слота для кастомного эмодзи к роли',
-                'category': 'emoji_slot',
-                'price_coins': 25000,
-                'price_reputation': 500,
-                'unlock_level': 30,
-                'rarity': 'rare',
-                'item_data': '{"emoji_slots": 2}'
-            },
-            {
-                'name': 'emoji_slot_legendary',
-                'display_name': 'Слот для эмодзи (легендарный)',
-                'description': 'Добавляет 3 слота для кастомного эмодзи к роли',
-                'category': 'emoji_slot',
-                'price_coins': 50000,
-                'price_reputation': 1000,
-                'unlock_level': 50,
-                'rarity': 'legendary',
-                'item_data': '{"emoji_slots": 3}'
-            },
-
-            # Themes
-            {
-                'name': 'neon_theme',
-                'display_name': 'Неоновая тема',
-                'description': 'Яркая неоновая тема оформления',
-                'category': 'theme',
-                'price_coins': 12000,
-                'price_reputation': 300,
-                'unlock_level': 30,
-                'rarity': 'epic',
-                'item_data': '{"theme_colors": {"primary": "#00ffff", "secondary": "#ff00ff"}}'
-            },
-            {
-                'name': 'galaxy_theme',
-                'display_name': 'Галактическая тема',
-                'description': 'Космическая тема с эффектами галактики',
-                'category': 'theme',
-                'price_coins': 25000,
-                'price_reputation': 800,
-                'unlock_level': 60,
-                'rarity': 'legendary',
-                'item_data': '{"theme_colors": {"primary": "#483d8b", "secondary": "#9400d3"}}'
-            },
-
-            # Gradients for customization
-            {
-                'name': 'fire_gradient',
-                'display_name': 'Огненный градиент',
-                'description': 'Яркий огненный градиент для любого элемента',
-                'category': 'gradient',
-                'price_coins': 2500,
-                'price_reputation': 50,
-                'unlock_level': 15,
-                'rarity': 'uncommon',
-                'icon': 'fas fa-fire',
-                'item_data': '{"gradient_css": "linear-gradient(45deg, #ff6b35, #f7931e, #ffaa00)", "is_animated": true}'
-            },
-            {
-                'name': 'ocean_gradient',
-                'display_name': 'Морской градиент',
-                'description': 'Прохладный морской градиент',
-                'category': 'gradient',
-                'price_coins': 2000,
-                'price_reputation': 30,
-                'unlock_level': 10,
-                'rarity': 'common',
-                'icon': 'fas fa-water',
-                'item_data': '{"gradient_css": "linear-gradient(45deg, #1e3c72, #2a5298, #3498db)", "is_animated": false}'
-            },
-            {
-                'name': 'rainbow_gradient',
-                'display_name': 'Радужный градиент',
-                'description': 'Яркий радужный градиент с анимацией',
-                'category': 'gradient',
-                'price_coins': 5000,
-                'price_reputation': 100,
-                'unlock_level': 25,
-                'rarity': 'epic',
-                'icon': 'fas fa-rainbow',
-                'item_data': '{"gradient_css": "linear-gradient(45deg, #ff0000, #ff7f00, #ffff00, #00ff00, #0000ff, #8b00ff)", "is_animated": true}'
-            },
-            {
-                'name': 'galaxy_gradient',
-                'display_name': 'Галактический градиент',
-                'description': 'Космический градиент для избранных',
-                'category': 'gradient',
-                'price_coins': 15000,
-                'price_reputation': 300,
-                'unlock_level': 50,
-                'rarity': 'legendary',
-                'icon': 'fas fa-star',
-                'item_data': '{"gradient_css": "linear-gradient(45deg, #2c3e50, #4a6741, #9b59b6, #e74c3c)", "is_animated": true}'
-            },
-            # Custom Roles
-            {
-                'name': 'gradient_custom_role',
-                'display_name': 'Особая роль с градиентом',
-                'description': 'Роль с красивым градиентом',
-                'category': 'custom_role',
-                'price_coins': 50000,
-                'price_reputation': 0,
-                'unlock_level': 40,
-                'rarity': 'epic',
-                'item_data': '{"role_type": "gradient", "allows_color": true, "allows_gradient": true, "allows_animation": false, "allows_emoji": false}'
-            },
-        ]
-
-        for item_data in default_items:
-            existing = cls.query.filter_by(name=item_data['name']).first()
-            if not existing:
-                item = cls(**item_data)
-                db.session.add(item)
-
-        db.session.commit()
-
 
 class ShopPurchase(db.Model):
     """Shop purchase history"""
@@ -1928,273 +1478,6 @@ class Achievement(db.Model):
 
         return new_achievements
 
-    @classmethod
-    def create_default_achievements(cls):
-        """Create default achievements with enhanced reward system"""
-        default_achievements = [
-            # Common achievements (basic rewards)
-            {
-                'title': 'Новичок',
-                'description': 'Сыграйте первую игру',
-                'icon': 'fas fa-baby',
-                'rarity': 'common',
-                'unlock_condition': '{"games_played": 1}',
-                'reward_xp': 500,
-                'reward_coins': 100,
-                'reward_reputation': 5
-            },
-            {
-                'title': 'Первые шаги',
-                'description': 'Убейте 10 игроков',
-                'icon': 'fas fa-sword',
-                'rarity': 'common',
-                'unlock_condition': '{"kills": 10}',
-                'reward_xp': 750,
-                'reward_coins': 150,
-                'reward_reputation': 8
-            },
-            {
-                'title': 'Разрушитель',
-                'description': 'Сломайте 5 кроватей',
-                'icon': 'fas fa-bed',
-                'rarity': 'common',
-                'unlock_condition': '{"beds_broken": 5}',
-                'reward_xp': 800,
-                'reward_coins': 200,
-                'reward_reputation': 10
-            },
-
-            # Uncommon achievements (moderate rewards)
-            {
-                'title': 'Боец',
-                'description': 'Убейте 50 игроков',
-                'icon': 'fas fa-fist-raised',
-                'rarity': 'uncommon',
-                'unlock_condition': '{"kills": 50}',
-                'reward_xp': 1500,
-                'reward_coins': 300,
-                'reward_reputation': 15
-            },
-            {
-                'title': 'Коллекционер',
-                'description': 'Соберите 1000 единиц ресурсов',
-                'icon': 'fas fa-gem',
-                'rarity': 'uncommon',
-                'unlock_condition': '{"total_resources": 1000}',
-                'reward_xp': 1200,
-                'reward_coins': 250,
-                'reward_reputation': 12
-            },
-            {
-                'title': 'Победитель',
-                'description': 'Выиграйте 10 игр',
-                'icon': 'fas fa-trophy',
-                'rarity': 'uncommon',
-                'unlock_condition': '{"wins": 10}',
-                'reward_xp': 2000,
-                'reward_coins': 400,
-                'reward_reputation': 20
-            },
-
-            # Epic achievements (high rewards) - Made more challenging
-            {
-                'title': 'Неудержимый',
-                'description': 'Убейте 500 игроков с K/D > 2.0',
-                'icon': 'fas fa-fire',
-                'rarity': 'epic',
-                'unlock_condition': '{"kills": 500, "kd_ratio": 2.0}',
-                'reward_xp': 8000,
-                'reward_coins': 1500,
-                'reward_reputation': 75,
-                'is_hidden': True
-            },
-            {
-                'title': 'Мастер ресурсов',
-                'description': 'Соберите 25000 единиц ресурсов и выиграйте 75 игр',
-                'icon': 'fas fa-coins',
-                'rarity': 'epic',
-                'unlock_condition': '{"total_resources": 25000, "wins": 75}',
-                'reward_xp': 10000,
-                'reward_coins': 2000,
-                'reward_reputation': 100,
-                'is_hidden': True
-            },
-            {
-                'title': 'Чемпион арены',
-                'description': 'Выиграйте 150 игр с 75%+ винрейтом',
-                'icon': 'fas fa-crown',
-                'rarity': 'epic',
-                'unlock_condition': '{"wins": 150, "win_rate": 75.0}',
-                'reward_xp': 12000,
-                'reward_coins': 2500,
-                'reward_reputation': 125
-            },
-            {
-                'title': 'Разрушитель империй',
-                'description': 'Сломайте 200 кроватей с 60%+ винрейтом',
-                'icon': 'fas fa-hammer',
-                'rarity': 'epic',
-                'unlock_condition': '{"beds_broken": 200, "win_rate": 60.0}',
-                'reward_xp': 9000,
-                'reward_coins': 1800,
-                'reward_reputation': 90,
-                'is_hidden': True
-            },
-
-            # Legendary achievements (very high rewards) - Significantly more challenging
-            {
-                'title': 'Мастер Bedwars',
-                'description': 'Достигните K/D 4.0+ при 200+ играх',
-                'icon': 'fas fa-star',
-                'rarity': 'legendary',
-                'unlock_condition': '{"kd_ratio": 4.0, "games_played": 200}',
-                'reward_xp': 20000,
-                'reward_coins': 4000,
-                'reward_reputation': 200,
-                'reward_title': 'Мастер'
-            },
-            {
-                'title': 'Великий воин',
-                'description': 'Убейте 1500 игроков с 80%+ винрейтом',
-                'icon': 'fas fa-shield',
-                'rarity': 'legendary',
-                'unlock_condition': '{"kills": 1500, "win_rate": 80.0}',
-                'reward_xp': 25000,
-                'reward_coins': 5000,
-                'reward_reputation': 250,
-                'reward_title': 'Великий воин'
-            },
-            {
-                'title': 'Легенда арены',
-                'description': 'Выиграйте 300 игр с 90%+ винрейтом',
-                'icon': 'fas fa-medal',
-                'rarity': 'legendary',
-                'unlock_condition': '{"wins": 300, "win_rate": 90.0}',
-                'reward_xp': 30000,
-                'reward_coins': 6000,
-                'reward_reputation': 300,
-                'reward_title': 'Легенда арены'
-            },
-            {
-                'title': 'Безжалостный убийца',
-                'description': 'Совершите 750 финальных убийств с K/D > 3.5',
-                'icon': 'fas fa-skull-crossbones',
-                'rarity': 'legendary',
-                'unlock_condition': '{"final_kills": 750, "kd_ratio": 3.5}',
-                'reward_xp': 22000,
-                'reward_coins': 4500,
-                'reward_reputation': 220,
-                'reward_title': 'Безжалостный',
-                'is_hidden': True
-            },
-
-            # Mythic achievements (maximum rewards)
-            {
-                'title': 'Божество PVP',
-                'description': 'Достигните K/D соотношения 5.0 и совершите 1000+ убийств',
-                'icon': 'fas fa-bolt',
-                'rarity': 'mythic',
-                'unlock_condition': '{"kd_ratio": 5.0, "kills": 1000, "experience": 450000}',
-                'reward_xp': 25000,
-                'reward_coins': 5000,
-                'reward_reputation': 250,
-                'reward_title': 'Божество PVP',
-                'is_hidden': True
-            },
-            {
-                'title': 'Разрушитель миров',
-                'description': 'Сломайте 500 кроватей противников',
-                'icon': 'fas fa-meteor',
-                'rarity': 'mythic',
-                'unlock_condition': '{"beds_broken": 500}',
-                'reward_xp': 30000,
-                'reward_coins': 6000,
-                'reward_reputation': 300,
-                'reward_title': 'Разрушитель миров',
-                'is_hidden': True
-            },
-            {
-                'title': 'Легенда сервера',
-                'description': 'Достигните 95% процента побед при 100+ играх',
-                'icon': 'fas fa-dragon',
-                'rarity': 'mythic',
-                'unlock_condition': '{"win_rate": 95.0, "games_played": 100}',
-                'reward_xp': 40000,
-                'reward_coins': 8000,
-                'reward_reputation': 400,
-                'reward_title': 'Легенда сервера',
-                'is_hidden': True
-            },
-            {
-                'title': 'Повелитель ресурсов',
-                'description': 'Соберите 100,000 единиц ресурсов',
-                'icon': 'fas fa-gem',
-                'rarity': 'mythic',
-                'unlock_condition': '{"total_resources": 100000}',
-                'reward_xp': 35000,
-                'reward_coins': 7000,
-                'reward_reputation': 350,
-                'reward_title': 'Повелитель ресурсов',
-                'is_hidden': True
-            },
-            {
-                'title': 'Абсолютный чемпион',
-                'description': 'Выиграйте 1000 игр и достигните 98% побед',
-                'icon': 'fas fa-infinity',
-                'rarity': 'mythic',
-                'unlock_condition': '{"wins": 1000, "win_rate": 98.0}',
-                'reward_xp': 50000,
-                'reward_coins': 10000,
-                'reward_reputation': 500,
-                'reward_title': 'Абсолютный чемпион',
-                'is_hidden': True
-            },
-            {
-                'title': 'Всевидящее око',
-                'description': 'Совершите 2000 финальных убийств',
-                'icon': 'fas fa-eye',
-                'rarity': 'mythic',
-                'unlock_condition': '{"final_kills": 2000}',
-                'reward_xp': 45000,
-                'reward_coins': 9000,
-                'reward_reputation': 450,
-                'reward_title': 'Всевидящее око',
-                'is_hidden': True
-            },
-            {
-                'title': 'Архитектор разрушения',
-                'description': 'Сломайте 1000 кроватей',
-                'icon': 'fas fa-hammer',
-                'rarity': 'mythic',
-                'unlock_condition': '{"beds_broken": 1000}',
-                'reward_xp': 55000,
-                'reward_coins': 11000,
-                'reward_reputation': 550,
-                'reward_title': 'Архитектор разрушения',
-                'is_hidden': True
-            },
-            {
-                'title': 'Неуязвимый',
-                'description': 'Достигните уровня 200 с K/D > 4.0',
-                'icon': 'fas fa-shield-alt',
-                'rarity': 'mythic',
-                'unlock_condition': '{"experience": 1500000, "kd_ratio": 4.0}',
-                'reward_xp': 60000,
-                'reward_coins': 12000,
-                'reward_reputation': 600,
-                'reward_title': 'Неуязвимый',
-                'is_hidden': True
-            }
-        ]
-
-        for achievement_data in default_achievements:
-            existing = cls.query.filter_by(title=achievement_data['title']).first()
-            if not existing:
-                achievement = cls(**achievement_data)
-                db.session.add(achievement)
-
-        db.session.commit()
-
 
 class PlayerAchievement(db.Model):
     """Player earned achievements"""
@@ -2246,57 +1529,14 @@ class AdminCustomRole(db.Model):
     def display_emoji(self):
         """Get emoji display HTML"""
         if self.emoji_url:
-            return f'<img src="{self.emoji_url}" class="emoji" alt="custom emoji">'
+            from emoji_sprites import emoji_html
+            return emoji_html(self.emoji_url) or f'<img src="{self.emoji_url}" class="emoji" alt="custom emoji">'
         elif self.emoji_class:
             return f'<i class="{self.emoji_class}"></i>'
         elif self.emoji:
             return self.emoji
         return ''
 
-    @classmethod
-    def create_default_roles(cls):
-        """Create default admin roles"""
-        default_roles = [
-            {
-                'name': 'VIP',
-                'color': '#ffd700',
-                'emoji_class': 'fas fa-star',
-                'has_gradient': False,
-                'is_visible': True
-            },
-            {
-                'name': 'Premium',
-                'color': '#ff6b35',
-                'emoji_class': 'fas fa-crown',
-                'has_gradient': True,
-                'gradient_end_color': '#f7931e',
-                'is_visible': True
-            },
-            {
-                'name': 'Модератор',
-                'color': '#28a745',
-                'emoji_class': 'fas fa-shield',
-                'has_gradient': False,
-                'is_visible': True
-            },
-            {
-                'name': 'Администратор',
-                'color': '#dc3545',
-                'emoji_class': 'fas fa-hammer',
-                'has_gradient': True,
-                'gradient_end_color': '#c82333',
-                'is_visible': True
-            }
-        ]
-
-        for role_data in default_roles:
-            existing = cls.query.filter_by(name=role_data['name']).first()
-            if not existing:
-                role = cls(**role_data)
-                db.session.add(role)
-
-        db.session.commit()
-
 
 class PlayerAdminRole(db.Model):
     """Players assigned admin custom roles"""
@@ -2367,86 +1607,14 @@ class Badge(db.Model):
     def display_emoji(self):
         """Get emoji display HTML"""
         if self.emoji_url:
-            return f'<img src="{self.emoji_url}" class="emoji" alt="custom emoji">'
+            from emoji_sprites import emoji_html
+            return emoji_html(self.emoji_url) or f'<img src="{self.emoji_url}" class="emoji" alt="custom emoji">'
         elif self.emoji_class:
             return f'<i class="{self.emoji_class}"></i>'
         elif self.emoji:
             return self.emoji
         return ''
 
-    @classmethod
-    def create_default_badges(cls):
-        """Create default badges"""
-        default_badges = [
-            {
-                'name': 'first_steps',
-                'display_name': 'Первые шаги',
-                'description': 'Добро пожаловать в Bedwars!',
-                'icon': 'fas fa-baby',
-                'color': '#ffffff',
-                'background_color': '#28a745',
-                'border_color': '#20c997',
-                'rarity': 'common'
-            },
-            {
-                'name': 'veteran',
-                'display_name': 'Ветеран',
-                'description': 'Опытный игрок сервера',
-                'icon': 'fas fa-shield',
-                'color': '#ffffff',
-                'background_color': '#6f42c1',
-                'border_color': '#8e44ad',
-                'rarity': 'rare'
-            },
-            {
-                'name': 'champion',
-                'display_name': 'Чемпион',
-                'description': 'Элитный игрок',
-                'icon': 'fas fa-crown',
-                'color': '#212529',
-                'has_gradient': True,
-                'gradient_start': '#ffd700',
-                'gradient_end': '#ffaa00',
-                'border_color': '#ffd700',
-                'rarity': 'epic',
-                'is_animated': True
-            },
-            {
-                'name': 'legend',
-                'display_name': 'Легенда',
-                'description': 'Легендарный игрок сервера',
-                'icon': 'fas fa-dragon',
-                'color': '#ffffff',
-                'has_gradient': True,
-                'gradient_start': '#ff6b35',
-                'gradient_end': '#f7931e',
-                'border_color': '#ff6b35',
-                'rarity': 'legendary',
-                'is_animated': True
-            },
-            {
-                'name': 'mythic_warrior',
-                'display_name': 'Мифический воин',
-                'description': 'Достигнул невозможного',
-                'icon': 'fas fa-bolt',
-                'color': '#ffffff',
-                'has_gradient': True,
-                'gradient_start': '#9400d3',
-                'gradient_end': '#4b0082',
-                'border_color': '#9400d3',
-                'rarity': 'mythic',
-                'is_animated': True
-            }
-        ]
-
-        for badge_data in default_badges:
-            existing = cls.query.filter_by(name=badge_data['name']).first()
-            if not existing:
-                badge = cls(**badge_data)
-                db.session.add(badge)
-
-        db.session.commit()
-
 
 class PlayerBadge(db.Model):
     """Badges assigned to players"""
@@ -2537,50 +1705,6 @@ class CustomTitle(db.Model):
     def __repr__(self):
         return f'<CustomTitle {self.name}>'
 
-    @classmethod
-    def create_default_titles(cls):
-        """Create default custom titles"""
-        default_titles = [
-            {
-                'name': 'legend',
-                'display_name': '🏆 Легенда',
-                'color': '#ffd700',
-                'glow_color': '#ffaa00'
-            },
-            {
-                'name': 'champion',
-                'display_name': '👑 Чемпион',
-                'color': '#ff6b35',
-                'glow_color': '#ff4444'
-            },
-            {
-                'name': 'elite',
-                'display_name': '⭐ Элита',
-                'color': '#9b59b6',
-                'glow_color': '#8e44ad'
-            },
-            {
-                'name': 'destroyer',
-                'display_name': '💥 Разрушитель',
-                'color': '#e74c3c',
-                'glow_color': '#c0392b'
-            },
-            {
-                'name': 'master',
-                'display_name': '🎯 Мастер',
-                'color': '#3498db',
-                'glow_color': '#2980b9'
-            }
-        ]
-
-        for title_data in default_titles:
-            existing = cls.query.filter_by(name=title_data['name']).first()
-            if not existing:
-                title = cls(**title_data)
-                db.session.add(title)
-
-        db.session.commit()
-
 
 class PlayerTitle(db.Model):
     """Custom titles assigned to players by admins"""
@@ -2693,237 +1817,6 @@ class GradientTheme(db.Model):
             return f"linear-gradient({self.gradient_direction}, {self.color1}, {self.color2}, {self.color3})"
         return f"linear-gradient({self.gradient_direction}, {self.color1}, {self.color2})"
 
-    @classmethod
-    def create_default_themes(cls):
-        """Create default gradient themes"""
-        default_themes = [
-            # Nickname gradients
-            {
-                'name': 'fire_nickname',
-                'display_name': '🔥 Огненный',
-                'element_type': 'nickname',
-                'color1': '#ff6b35',
-                'color2': '#f7931e',
-                'color3': '#ffaa00',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-            {
-                'name': 'ocean_nickname',
-                'display_name': '🌊 Океанский',
-                'element_type': 'nickname',
-                'color1': '#00d2ff',
-                'color2': '#3a7bd5',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'purple_nickname',
-                'display_name': '🔮 Фиолетовый',
-                'element_type': 'nickname',
-                'color1': '#667eea',
-                'color2': '#764ba2',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'rainbow_nickname',
-                'display_name': '🌈 Радужный',
-                'element_type': 'nickname',
-                'color1': '#ff0000',
-                'color2': '#ffff00',
-                'color3': '#00ff00',
-                'gradient_direction': '90deg',
-                'animation_enabled': True
-            },
-
-            # Stats gradients
-            {
-                'name': 'gold_stats',
-                'display_name': '🥇 Золотая статистика',
-                'element_type': 'stats',
-                'color1': '#ffd700',
-                'color2': '#ffed4e',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'emerald_stats',
-                'display_name': '💎 Изумрудная статистика',
-                'element_type': 'stats',
-                'color1': '#50c878',
-                'color2': '#00ff7f',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'blood_stats',
-                'display_name': '🩸 Кровавая статистика',
-                'element_type': 'stats',
-                'color1': '#dc143c',
-                'color2': '#ff1744',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-
-            # Individual stat gradients
-            {
-                'name': 'fire_kills',
-                'display_name': '🔥 Огненные киллы',
-                'element_type': 'kills',
-                'color1': '#ff6b35',
-                'color2': '#f7931e',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-            {
-                'name': 'ice_deaths',
-                'display_name': '❄️ Ледяные смерти',
-                'element_type': 'deaths',
-                'color1': '#74b9ff',
-                'color2': '#0984e3',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'golden_wins',
-                'display_name': '🏆 Золотые победы',
-                'element_type': 'wins',
-                'color1': '#ffd700',
-                'color2': '#ffaa00',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-            {
-                'name': 'diamond_beds',
-                'display_name': '💎 Алмазные кровати',
-                'element_type': 'beds',
-                'color1': '#74b9ff',
-                'color2': '#0984e3',
-                'color3': '#6c5ce7',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-
-            # Title gradients
-            {
-                'name': 'legendary_title',
-                'display_name': '👑 Легендарный титул',
-                'element_type': 'title',
-                'color1': '#ffd700',
-                'color2': '#ff6b35',
-                'color3': '#8e44ad',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-            {
-                'name': 'crystal_title',
-                'display_name': '💎 Кристальный титул',
-                'element_type': 'title',
-                'color1': '#74b9ff',
-                'color2': '#0984e3',
-                'color3': '#6c5ce7',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-
-            # Status gradients (level 20+)
-            {
-                'name': 'sunset_status',
-                'display_name': '🌅 Закатный статус',
-                'element_type': 'status',
-                'color1': '#ff6b35',
-                'color2': '#f7931e',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'ocean_status',
-                'display_name': '🌊 Океанский статус',
-                'element_type': 'status',
-                'color1': '#00d2ff',
-                'color2': '#3a7bd5',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'mystic_status',
-                'display_name': '🔮 Мистический статус',
-                'element_type': 'status',
-                'color1': '#667eea',
-                'color2': '#764ba2',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-
-            # Bio gradients (level 20+)
-            {
-                'name': 'elegant_bio',
-                'display_name': '✨ Элегантное био',
-                'element_type': 'bio',
-                'color1': '#ffd700',
-                'color2': '#ffed4e',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'royal_bio',
-                'display_name': '👑 Королевское био',
-                'element_type': 'bio',
-                'color1': '#8e44ad',
-                'color2': '#3498db',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'cosmic_bio',
-                'display_name': '🌌 Космическое био',
-                'element_type': 'bio',
-                'color1': '#667eea',
-                'color2': '#764ba2',
-                'color3': '#f093fb',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-
-            # Role gradients
-            {
-                'name': 'admin_role',
-                'display_name': '👑 Администраторская роль',
-                'element_type': 'role',
-                'color1': '#ff6b35',
-                'color2': '#f7931e',
-                'gradient_direction': '45deg',
-                'animation_enabled': True
-            },
-            {
-                'name': 'vip_role',
-                'display_name': '💎 VIP роль',
-                'element_type': 'role',
-                'color1': '#8e44ad',
-                'color2': '#3498db',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            },
-            {
-                'name': 'pro_role',
-                'display_name': '⭐ Профессиональная роль',
-                'element_type': 'role',
-                'color1': '#28a745',
-                'color2': '#20c997',
-                'gradient_direction': '45deg',
-                'animation_enabled': False
-            }
-        ]
-
-        for theme_data in default_themes:
-            existing = cls.query.filter_by(name=theme_data['name']).first()
-            if not existing:
-                theme = cls(**theme_data)
-                db.session.add(theme)
-
-        db.session.commit()
-
 
 class PlayerGradientSetting(db.Model):
     """Player's gradient settings"""
@@ -2990,142 +1883,6 @@ class SiteTheme(db.Model):
             '--accent-color': self.accent_color
         }
 
-    @classmethod
-    def create_default_themes(cls):
-        """Create default site themes"""
-        default_themes = [
-            {
-                'name': 'default_dark',
-                'display_name': 'Классическая тёмная',
-                'description': 'Элегантная тёмная тема с золотыми акцентами',
-                'primary_color': '#ffc107',
-                'secondary_color': '#6c757d',
-                'background_color': '#0d1117',
-                'card_background': '#161b22',
-                'text_color': '#f0f6fc',
-                'accent_color': '#28a745',
-                'is_default': True
-            },
-            {
-                'name': 'cyber_matrix',
-                'display_name': 'Киберматрица',
-                'description': 'Футуристическая тема в стиле "Матрицы"',
-                'primary_color': '#00ff41',
-                'secondary_color': '#008f11',
-                'background_color': '#000000',
-                'card_background': '#001100',
-                'text_color': '#00ff41',
-                'accent_color': '#39ff14'
-            },
-            {
-                'name': 'royal_purple',
-                'display_name': 'Королевский пурпур',
-                'description': 'Роскошная тёмно-фиолетовая тема',
-                'primary_color': '#9146ff',
-                'secondary_color': '#772ce8',
-                'background_color': '#0e0420',
-                'card_background': '#1f0a3e',
-                'text_color': '#ffffff',
-                'accent_color': '#bf94ff'
-            },
-            {
-                'name': 'ocean_depths',
-                'display_name': 'Морские глубины',
-                'description': 'Глубокая синяя тема океана',
-                'primary_color': '#00b4d8',
-                'secondary_color': '#0077b6',
-                'background_color': '#03045e',
-                'card_background': '#023e8a',
-                'text_color': '#caf0f8',
-                'accent_color': '#90e0ef'
-            },
-            {
-                'name': 'volcano_fire',
-                'display_name': 'Огонь вулкана',
-                'description': 'Страстная красно-оранжевая тема',
-                'primary_color': '#ff4500',
-                'secondary_color': '#dc2626',
-                'background_color': '#1a0000',
-                'card_background': '#330000',
-                'text_color': '#fef2f2',
-                'accent_color': '#fb923c'
-            },
-            {
-                'name': 'midnight_blue',
-                'display_name': 'Полуночный синий',
-                'description': 'Элегантная тёмно-синяя тема',
-                'primary_color': '#60a5fa',
-                'secondary_color': '#3b82f6',
-                'background_color': '#0f172a',
-                'card_background': '#1e293b',
-                'text_color': '#f1f5f9',
-                'accent_color': '#38bdf8'
-            },
-            {
-                'name': 'emerald_forest',
-                'display_name': 'Изумрудный лес',
-                'description': 'Природная зелёная тема',
-                'primary_color': '#10b981',
-                'secondary_color': '#059669',
-                'background_color': '#064e3b',
-                'card_background': '#065f46',
-                'text_color': '#ecfdf5',
-                'accent_color': '#34d399'
-            },
-            {
-                'name': 'sunset_orange',
-                'display_name': 'Закатный оранжевый',
-                'description': 'Тёплая оранжево-красная тема',
-                'primary_color': '#f97316',
-                'secondary_color': '#ea580c',
-                'background_color': '#431407',
-                'card_background': '#7c2d12',
-                'text_color': '#fff7ed',
-                'accent_color': '#fb923c'
-            },
-            {
-                'name': 'pink_neon',
-                'display_name': 'Неоновый розовый',
-                'description': 'Яркая розово-фиолетовая тема',
-                'primary_color': '#ec4899',
-                'secondary_color': '#db2777',
-                'background_color': '#500724',
-                'card_background': '#831843',
-                'text_color': '#fdf2f8',
-                'accent_color': '#f472b6'
-            },
-            {
-                'name': 'golden_luxury',
-                'display_name': 'Золотая роскошь',
-                'description': 'Роскошная золотисто-чёрная тема',
-                'primary_color': '#fbbf24',
-                'secondary_color': '#f59e0b',
-                'background_color': '#1c1917',
-                'card_background': '#292524',
-                'text_color': '#fef3c7',
-                'accent_color': '#fcd34d'
-            },
-            {
-                'name': 'ice_crystal',
-                'display_name': 'Ледяной кристалл',
-                'description': 'Холодная голубо-белая тема',
-                'primary_color': '#0ea5e9',
-                'secondary_color': '#0284c7',
-                'background_color': '#0c4a6e',
-                'card_background': '#075985',
-                'text_color': '#e0f2fe',
-                'accent_color': '#38bdf8'
-            }
-        ]
-
-        for theme_data in default_themes:
-            existing = cls.query.filter_by(name=theme_data['name']).first()
-            if not existing:
-                theme = cls(**theme_data)
-                db.session.add(theme)
-
-        db.session.commit()
-
 
 class CursorTheme(db.Model):
     """Cursor themes for customization"""
@@ -3148,84 +1905,6 @@ class CursorTheme(db.Model):
     def __repr__(self):
         return f'<CursorTheme {self.name}>'
 
-    @classmethod
-    def create_default_cursors(cls):
-        """Create default cursor themes"""
-        default_cursors = [
-            {
-                'name': 'classic',
-                'display_name': '🎯 Классический',
-                'description': 'Стандартный игровой курсор',
-                'color1': '#ffc107',
-                'color2': '#ffaa00',
-                'animation': 'glow',
-                'price_coins': 0
-            },
-            {
-                'name': 'fire',
-                'display_name': '🔥 Огненный',
-                'description': 'Пылающий курсор для настоящих воинов',
-                'color1': '#ff6b35',
-                'color2': '#f7931e',
-                'animation': 'pulse',
-                'price_coins': 50,
-                'unlock_level': 5
-            },
-            {
-                'name': 'ice',
-                'display_name': '❄️ Ледяной',
-                'description': 'Холодный как лед курсор',
-                'color1': '#74b9ff',
-                'color2': '#0984e3',
-                'animation': 'glow',
-                'price_coins': 75,
-                'unlock_level': 10
-            },
-            {
-                'name': 'lightning',
-                'display_name': '⚡ Молния',
-                'description': 'Быстрый как молния курсор',
-                'color1': '#fdcb6e',
-                'color2': '#e17055',
-                'animation': 'pulse',
-                'shape': 'diamond',
-                'price_coins': 100,
-                'unlock_level': 15,
-                'is_premium': True
-            },
-            {
-                'name': 'rainbow',
-                'display_name': '🌈 Радужный',
-                'description': 'Переливающийся всеми цветами курсор',
-                'color1': '#ff0000',
-                'color2': '#00ff00',
-                'animation': 'rainbow',
-                'price_coins': 200,
-                'unlock_level': 25,
-                'is_premium': True
-            },
-            {
-                'name': 'galaxy',
-                'display_name': '🌌 Галактический',
-                'description': 'Космический курсор для покорителей вселенной',
-                'color1': '#6c5ce7',
-                'color2': '#a29bfe',
-                'animation': 'rotate',
-                'shape': 'star',
-                'price_coins': 500,
-                'unlock_level': 50,
-                'is_premium': True
-            }
-        ]
-
-        for cursor_data in default_cursors:
-            existing = cls.query.filter_by(name=cursor_data['name']).first()
-            if not existing:
-                cursor = cls(**cursor_data)
-                db.session.add(cursor)
-
-        db.session.commit()
-
     @classmethod
     def create_default_items(cls):
         """Create default shop items"""
@@ -3341,6 +2020,20 @@ class Clan(db.Model):
     max_members = db.Column(db.Integer, default=50, nullable=False)
     experience = db.Column(db.Integer, default=0, nullable=False)
     rating = db.Column(db.Integer, default=1000, nullable=False)
+    rating_rd = db.Column(db.Float, default=350.0, nullable=False)  # Glicko-2 rating deviation (rating_engine.py)
+    rating_volatility = db.Column(db.Float, default=0.06, nullable=False)
+    rating_period = db.Column(db.Integer, nullable=True)  # Last rating period the clan played in
+    member_count = db.Column(db.Integer, default=0, nullable=False)  # Maintained by join/leave/create routes
+
+    # Aggregates of active members' lifetime stats, maintained incrementally by clan_stats.py
+    total_kills = db.Column(db.Integer, default=0, nullable=False)
+    total_final_kills = db.Column(db.Integer, default=0, nullable=False)
+    total_deaths = db.Column(db.Integer, default=0, nullable=False)
+    total_wins = db.Column(db.Integer, default=0, nullable=False)
+    total_games = db.Column(db.Integer, default=0, nullable=False)
+    total_beds_broken = db.Column(db.Integer, default=0, nullable=False)
+    total_experience = db.Column(db.Integer, default=0, nullable=False)
+    avg_kd = db.Column(db.Float, default=0.0, nullable=False)
     leader_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
@@ -3349,25 +2042,108 @@ class Clan(db.Model):
     leader = db.relationship('Player', foreign_keys=[leader_id], backref='led_clans')
     members = db.relationship('ClanMember', backref='clan', lazy=True, cascade='all, delete-orphan')
 
+    # Listing indexes: every /clans sort is a range scan over (is_active, key, id)
+    __table_args__ = (
+        db.Index('ix_clan_active_rating', 'is_active', 'rating', 'id'),
+        db.Index('ix_clan_active_experience', 'is_active', 'experience', 'id'),
+        db.Index('ix_clan_active_members', 'is_active', 'member_count', 'id'),
+        db.Index('ix_clan_active_created', 'is_active', 'created_at', 'id'),
+        db.Index('ix_clan_active_total_kills', 'is_active', 'total_kills', 'id'),
+        db.Index('ix_clan_active_total_wins', 'is_active', 'total_wins', 'id'),
+        db.Index('ix_clan_active_total_beds', 'is_active', 'total_beds_broken', 'id'),
+        db.Index('ix_clan_active_total_experience', 'is_active', 'total_experience', 'id'),
+        db.Index('ix_clan_active_avg_kd', 'is_active', 'avg_kd', 'id'),
+    )
+
+    # Sort keys accepted by get_clans_page(); level orders by experience since it is monotonic in it
+    LIST_SORTS = {
+        'rating': 'rating',
+        'level': 'experience',
+        'members': 'member_count',
+        'created': 'created_at',
+        'total_kills': 'total_kills',
+        'total_wins': 'total_wins',
+        'total_beds': 'total_beds_broken',
+        'total_experience': 'total_experience',
+        'avg_kd': 'avg_kd',
+    }
+
     def __repr__(self):
         return f'<Clan {self.name} [{self.tag}]>'
 
-    @property
+    @hybrid_property
     def level(self):
         """Calculate clan level based on experience"""
         # Simple level calculation: level = experience // 10000 + 1
         return min(100, max(1, self.experience // 10000 + 1))
 
-    @property
-    def member_count(self):
-        """Get current member count"""
-        return ClanMember.query.filter_by(clan_id=self.id, is_active=True).count()
+    @level.expression
+    def level(cls):
+        """SQL form of level, served by the experience index"""
+        return db.case((cls.experience >= 990000, 100), (cls.experience < 10000, 1),
+                       else_=cls.experience // 10000 + 1)
 
     @property
     def can_join(self):
         """Check if clan can accept new members"""
         return self.clan_type == 'open' and self.member_count < self.max_members
 
+    @classmethod
+    def reserve_slot(cls, clan_id):
+        """Atomically claim a member slot; returns False if the clan is full or closed.
+
+        The capacity check and the increment are one conditional UPDATE, so
+        concurrent joins can never push member_count past max_members.
+        """
+        reserved = cls.query.filter(
+            cls.id == clan_id,
+            cls.is_active == True,
+            cls.clan_type == 'open',
+            cls.member_count < cls.max_members
+        ).update({cls.member_count: cls.member_count + 1}, synchronize_session=False)
+        return reserved == 1
+
+    @classmethod
+    def adjust_member_count(cls, clan_id, delta):
+        """Atomically add delta to the stored member counter"""
+        cls.query.filter_by(id=clan_id).update(
+            {cls.member_count: cls.member_count + delta},
+            synchronize_session=False
+        )
+
+    def to_stats_dict(self):
+        """Convert clan and its aggregate stats to dictionary for API responses"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'tag': self.tag,
+            'level': self.level,
+            'rating': self.rating,
+            'experience': self.experience,
+            'member_count': self.member_count,
+            'total_kills': self.total_kills,
+            'total_final_kills': self.total_final_kills,
+            'total_deaths': self.total_deaths,
+            'total_wins': self.total_wins,
+            'total_games': self.total_games,
+            'total_beds_broken': self.total_beds_broken,
+            'total_experience': self.total_experience,
+            'avg_kd': round(self.avg_kd, 2),
+            'win_rate': round((self.total_wins / self.total_games) * 100, 1) if self.total_games else 0
+        }
+
+    @classmethod
+    def get_clans_page(cls, sort_by='rating', cursor=None, limit=30):
+        """Get one page of active clans using keyset pagination.
+
+        Returns (clans, next_cursor); pass next_cursor back to fetch the following page.
+        """
+        from pagination import keyset_page
+
+        column = getattr(cls, cls.LIST_SORTS.get(sort_by, 'rating'))
+        return keyset_page(cls.query.filter_by(is_active=True), column, cls.id,
+                           cursor=cursor, limit=limit)
+
     def get_members_by_role(self, role):
         """Get clan members by role"""
         return ClanMember.query.filter_by(clan_id=self.id, role=role, is_active=True).all()
@@ -3403,6 +2179,14 @@ class ClanMember(db.Model):
     # Relationships
     player = db.relationship('Player', backref='clan_memberships')
 
+    __table_args__ = (
+        db.Index('ix_clan_member_player_active', 'player_id', 'is_active'),
+        db.Index('ix_clan_member_clan_active', 'clan_id', 'is_active'),
+        # A player can hold at most one active membership
+        db.Index('uq_clan_member_active_player', 'player_id', unique=True,
+                 sqlite_where=is_active == True, postgresql_where=is_active == True),
+    )
+
     def __repr__(self):
         return f'<ClanMember {self.player_id}:{self.clan_id}>'
 
@@ -3429,7 +2213,11 @@ class Tournament(db.Model):
     entry_fee = db.Column(db.Integer, default=0, nullable=False)
     prize_pool = db.Column(db.Integer, default=0, nullable=False)
     max_participants = db.Column(db.Integer, default=100, nullable=False)
+    participant_count = db.Column(db.Integer, default=0, nullable=False)  # Claimed through reserve_slot()
     status = db.Column(db.String(20), default='upcoming', nullable=False)  # upcoming, active, completed
+    format = db.Column(db.String(30), default='single_elimination', nullable=False)  # single_elimination, double_elimination, swiss
+    seed_by = db.Column(db.String(20), default='experience', nullable=False)  # experience, kd_ratio, rating
+    swiss_rounds = db.Column(db.SmallInteger, nullable=True)
     organizer_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
@@ -3437,15 +2225,12 @@ class Tournament(db.Model):
     # Relationships
     organizer = db.relationship('Player', backref='organized_tournaments')
     participants = db.relationship('TournamentParticipant', backref='tournament', lazy=True, cascade='all, delete-orphan')
+    matches = db.relationship('TournamentMatch', backref='tournament', lazy=True, cascade='all, delete-orphan',
+                              order_by='(TournamentMatch.bracket.desc(), TournamentMatch.round, TournamentMatch.slot)')
 
     def __repr__(self):
         return f'<Tournament {self.name}>'
 
-    @property
-    def participant_count(self):
-        """Get current participant count"""
-        return TournamentParticipant.query.filter_by(tournament_id=self.id, is_active=True).count()
-
     @property
     def can_join(self):
         """Check if tournament can accept new participants"""
@@ -3453,6 +2238,18 @@ class Tournament(db.Model):
                 self.participant_count < self.max_participants and
                 datetime.utcnow() < self.start_date)
 
+    @classmethod
+    def reserve_slot(cls, tournament_id):
+        """Atomically claim a participant slot; returns False if registration is full or closed"""
+        reserved = cls.query.filter(
+            cls.id == tournament_id,
+            cls.is_active == True,
+            cls.status == 'upcoming',
+            cls.start_date > datetime.utcnow(),
+            cls.participant_count < cls.max_participants
+        ).update({cls.participant_count: cls.participant_count + 1}, synchronize_session=False)
+        return reserved == 1
+
     @property
     def status_display(self):
         """Get display name for status"""
@@ -3473,6 +2270,34 @@ class Tournament(db.Model):
         }
         return type_names.get(self.tournament_type, '👤 Одиночный')
 
+    @property
+    def format_display(self):
+        """Get display name for bracket format"""
+        format_names = {
+            'single_elimination': '🏆 Олимпийская система',
+            'double_elimination': '🔁 Двойное выбывание',
+            'swiss': '♟️ Швейцарская система'
+        }
+        return format_names.get(self.format, '🏆 Олимпийская система')
+
+    def complete_tournament(self, winners_data):
+        """Store placements, pay out prizes and close the tournament"""
+        participants = {p.id: p for p in self.participants}
+        for entry in winners_data:
+            participant = participants.get(entry['participant_id'])
+            if not participant:
+                continue
+            participant.placement = entry['placement']
+            participant.prize_won = entry.get('prize_amount', 0)
+            if participant.prize_won:
+                Player.query.filter_by(id=participant.player_id).update(
+                    {Player.coins: Player.coins + participant.prize_won}, synchronize_session=False)
+
+        self.status = 'completed'
+        self.end_date = datetime.utcnow()
+        db.session.commit()
+        return True
+
     @classmethod
     def get_by_status(cls, status):
         """Get tournaments by status"""
@@ -3503,6 +2328,8 @@ class TournamentParticipant(db.Model):
     clan_id = db.Column(db.Integer, db.ForeignKey('clan.id'), nullable=True)  # For clan tournaments
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     placement = db.Column(db.Integer, nullable=True)  # Final placement (1st, 2nd, etc.)
+    seed = db.Column(db.Integer, nullable=True)  # Bracket seed, assigned when the tournament starts
+    team = db.Column(db.SmallInteger, nullable=True)  # Team number from the team balancer (team tournaments)
     prize_won = db.Column(db.Integer, default=0, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
 
@@ -3510,5 +2337,484 @@ class TournamentParticipant(db.Model):
     player = db.relationship('Player', backref='tournament_participations')
     clan = db.relationship('Clan', backref='tournament_participations')
 
+    __table_args__ = (
+        db.UniqueConstraint('tournament_id', 'player_id', name='uq_tournament_participant'),
+    )
+
+    def __repr__(self):
+        return f'<TournamentParticipant {self.player_id}:{self.tournament_id}>'
+
+
+class TournamentMatch(db.Model):
+    """Single bracket match; W/L/F = winners/losers bracket/grand final, S = Swiss round"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False)
+    bracket = db.Column(db.String(1), default='W', nullable=False)
+    round = db.Column(db.SmallInteger, nullable=False)
+    slot = db.Column(db.SmallInteger, nullable=False)
+    player1_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True)
+    player2_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True)
+    winner_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True)
+    score1 = db.Column(db.SmallInteger, nullable=True)
+    score2 = db.Column(db.SmallInteger, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    rating_period = db.Column(db.Integer, nullable=True)  # Set once the result has been fed to rating_engine
+
+    # Relationships
+    player1 = db.relationship('Player', foreign_keys=[player1_id])
+    player2 = db.relationship('Player', foreign_keys=[player2_id])
+    winner = db.relationship('Player', foreign_keys=[winner_id])
+
+    __table_args__ = (
+        db.UniqueConstraint('tournament_id', 'bracket', 'round', 'slot', name='uq_tournament_match_slot'),
+    )
+
+    def __repr__(self):
+        return f'<TournamentMatch {self.tournament_id}:{self.bracket}{self.round}.{self.slot}>'
+
+    @property
+    def is_playable(self):
+        """Both players known and no result yet"""
+        return bool(self.player1_id and self.player2_id and not self.winner_id)
+
+
+
+class PlayerRating(db.Model):
+    """Match-based Glicko-2 rating of a player, updated per rating period by rating_engine.py"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, unique=True)
+    rating = db.Column(db.Float, default=1500.0, nullable=False)
+    rd = db.Column(db.Float, default=350.0, nullable=False)  # Rating deviation
+    volatility = db.Column(db.Float, default=0.06, nullable=False)
+    matches_rated = db.Column(db.Integer, default=0, nullable=False)
+    last_period = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    player = db.relationship('Player', backref=db.backref('match_rating', uselist=False))
+
+    __table_args__ = (
+        db.Index('ix_player_rating_rating', 'rating', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<PlayerRating {self.player_id}: {self.rating:.0f}±{self.rd:.0f}>'
+
+    @classmethod
+    def get_leaderboard_page(cls, cursor=None, limit=50):
+        """Rating leaderboard page served from the (rating, id) index, players joined in;
+        returns (ratings, next_cursor)"""
+        from pagination import keyset_page
+
+        return keyset_page(cls.query.options(db.joinedload(cls.player)), cls.rating, cls.id,
+                           cursor=cursor, limit=limit)
+
+
+class RatingHistory(db.Model):
+    """Rating after each rating period, for players and clans"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(10), nullable=False)  # player, clan
+    entity_id = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.Integer, nullable=False)
+    rating = db.Column(db.Float, nullable=False)
+    rd = db.Column(db.Float, nullable=False)
+    volatility = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_rating_history_entity', 'entity_type', 'entity_id', 'period'),
+        db.Index('ix_rating_history_period', 'period'),
+    )
+
+    def __repr__(self):
+        return f'<RatingHistory {self.entity_type}:{self.entity_id} #{self.period}>'
+
+
+class GameMode(db.Model):
+    """Bedwars game mode for per-mode player ratings (ASCEND card)"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    display_name = db.Column(db.String(100), nullable=False)
+    icon = db.Column(db.String(20), default='🎮', nullable=False)
+    color = db.Column(db.String(7), default='#3498db', nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    sort_order = db.Column(db.Integer, default=0, nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    ratings = db.relationship('PlayerGameRating', backref='game_mode', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<GameMode {self.name}>'
+
+
+class PlayerGameRating(db.Model):
+    """Player tier ratings (F..S+) for one game mode, auto-calculated from stats or set by admins"""
+
+    TIERS = ['F', 'D', 'C', 'B', 'A', 'S', 'S+']
+
+    # Minimum stat value for D, C, B, A, S and S+ in each rating category
+    AUTO_THRESHOLDS = {
+        'kd_rating': ('mode_kd_ratio', (0.5, 1.0, 1.5, 2.5, 4.0, 6.0)),
+        'kills_rating': ('mode_kills', (100, 500, 1500, 5000, 15000, 40000)),
+        'objective_rating': ('mode_objectives', (25, 100, 400, 1500, 5000, 15000)),
+        'efficiency_rating': ('mode_win_rate', (10, 20, 35, 50, 65, 80)),
+    }
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    game_mode_id = db.Column(db.Integer, db.ForeignKey('game_mode.id'), nullable=False)
+
+    # Tier ratings
+    kd_rating = db.Column(db.String(3), default='F', nullable=False)
+    kills_rating = db.Column(db.String(3), default='F', nullable=False)
+    objective_rating = db.Column(db.String(3), default='F', nullable=False)
+    efficiency_rating = db.Column(db.String(3), default='F', nullable=False)
+    overall_rating = db.Column(db.String(3), default='F', nullable=False)
+    overall_score = db.Column(db.Integer, default=0, nullable=False)  # Sum of the four tier values, 0-24
+
+    # Mode statistics snapshot the tiers were calculated from
+    mode_kills = db.Column(db.Integer, default=0, nullable=False)
+    mode_deaths = db.Column(db.Integer, default=0, nullable=False)
+    mode_objectives = db.Column(db.Integer, default=0, nullable=False)
+    mode_games = db.Column(db.Integer, default=0, nullable=False)
+    mode_wins = db.Column(db.Integer, default=0, nullable=False)
+    mode_experience = db.Column(db.Integer, default=0, nullable=False)
+    mode_kd_ratio = db.Column(db.Float, default=0.0, nullable=False)
+    mode_win_rate = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Evaluation info; 'auto' ratings are refreshed by recalculate_mode, admin ones are kept
+    admin_notes = db.Column(db.Text, nullable=True)
+    last_evaluated_by = db.Column(db.String(100), nullable=True)
+    last_evaluated_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    player = db.relationship('Player', backref=db.backref('game_ratings', lazy=True, cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'game_mode_id', name='uq_player_game_rating'),
+        db.Index('ix_player_game_rating_leaderboard', 'game_mode_id', 'overall_score', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<PlayerGameRating {self.player_id}:{self.game_mode_id} {self.overall_rating}>'
+
+    @classmethod
+    def tier_for(cls, value, thresholds):
+        """Tier reached by a stat value"""
+        tier = 0
+        for index, minimum in enumerate(thresholds, 1):
+            if value >= minimum:
+                tier = index
+        return cls.TIERS[tier]
+
+    @classmethod
+    def overall_for_score(cls, score):
+        """Overall tier for a sum of four tier values (average rounded half up)"""
+        return cls.TIERS[min(len(cls.TIERS) - 1, (score + 2) // 4)]
+
+    def update_overall_rating(self):
+        """Recompute overall_score and overall_rating from the four category tiers"""
+        tier_values = {tier: index for index, tier in enumerate(self.TIERS)}
+        self.overall_score = sum(tier_values.get(getattr(self, field), 0) for field in self.AUTO_THRESHOLDS)
+        self.overall_rating = self.overall_for_score(self.overall_score)
+
+    def calculate_auto_ratings(self):
+        """Set category tiers from the mode statistics"""
+        for field, (stat, thresholds) in self.AUTO_THRESHOLDS.items():
+            setattr(self, field, self.tier_for(getattr(self, stat) or 0, thresholds))
+        self.update_overall_rating()
+        self.last_evaluated_by = 'auto'
+        self.last_evaluated_at = datetime.utcnow()
+
+    @classmethod
+    def _tier_value_sql(cls, column, thresholds):
+        """SQL CASE giving the tier index (0-6) reached by a column"""
+        return db.case(*[(column >= minimum, index)
+                         for index, minimum in reversed(list(enumerate(thresholds, 1)))], else_=0)
+
+    @classmethod
+    def recalculate_mode(cls, game_mode_id):
+        """Recompute every player's rating for a mode in two set-based statements.
+
+        Missing rows are created with INSERT ... SELECT, then one UPDATE ... FROM
+        player syncs the mode stats and recomputes the tiers in SQL. Ratings set
+        by an admin keep their tiers. Returns the number of rows updated.
+        """
+        table = cls.__table__
+        player = Player.__table__
+        now = datetime.utcnow()
+
+        existing = db.select(table.c.id).where(table.c.player_id == player.c.id,
+                                                table.c.game_mode_id == game_mode_id)
+        db.session.execute(table.insert().from_select(
+            ['player_id', 'game_mode_id', 'created_at', 'updated_at'],
+            db.select(player.c.id, db.literal(game_mode_id), db.literal(now), db.literal(now))
+            .where(~existing.exists())
+        ))
+
+        kd_ratio = db.case((player.c.deaths > 0, db.func.round(db.cast(player.c.kills, db.Float) / player.c.deaths, 2)),
+                           else_=db.cast(player.c.kills, db.Float))
+        win_rate = db.case((player.c.games_played > 0,
+                            db.func.round(db.cast(player.c.wins, db.Float) * 100 / player.c.games_played, 1)),
+                           else_=0.0)
+        stats = {
+            'mode_kd_ratio': kd_ratio,
+            'mode_kills': player.c.kills,
+            'mode_objectives': player.c.beds_broken,
+            'mode_win_rate': win_rate,
+        }
+        tier_values = {field: cls._tier_value_sql(stats[stat], thresholds)
+                       for field, (stat, thresholds) in cls.AUTO_THRESHOLDS.items()}
+        score = sum(tier_values.values())
+        is_auto = db.or_(table.c.last_evaluated_by.is_(None), table.c.last_evaluated_by == 'auto')
+
+        def tier_name(value):
+            return db.case(*[(value == index, tier) for index, tier in enumerate(cls.TIERS)], else_='F')
+
+        values = dict(stats,
+                      mode_deaths=player.c.deaths,
+                      mode_games=player.c.games_played,
+                      mode_wins=player.c.wins,
+                      mode_experience=player.c.experience,
+                      updated_at=now)
+        for field, value in tier_values.items():
+            values[field] = db.case((is_auto, tier_name(value)), else_=table.c[field])
+        values['overall_score'] = db.case((is_auto, score), else_=table.c.overall_score)
+        values['overall_rating'] = db.case((is_auto, tier_name((score + 2) // 4)),
+                                           else_=table.c.overall_rating)
+        values['last_evaluated_by'] = db.case((is_auto, 'auto'), else_=table.c.last_evaluated_by)
+        values['last_evaluated_at'] = db.case((is_auto, now), else_=table.c.last_evaluated_at)
+
+        result = db.session.execute(
+            table.update()
+            .where(table.c.player_id == player.c.id, table.c.game_mode_id == game_mode_id)
+            .values(**values)
+        )
+        return result.rowcount
+
+    @classmethod
+    def get_leaderboard_page(cls, game_mode_id, cursor=None, limit=50):
+        """Per-mode leaderboard page from the (game_mode_id, overall_score, id) index, players joined in"""
+        from pagination import keyset_page
+
+        return keyset_page(cls.query.options(db.joinedload(cls.player)).filter_by(game_mode_id=game_mode_id),
+                           cls.overall_score, cls.id, cursor=cursor, limit=limit)
+
+
+class IngestedMatch(db.Model):
+    """Match id already applied through /api/ingest/matches, kept to make re-sends idempotent"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.String(100), nullable=False, unique=True)
+    server_name = db.Column(db.String(100), nullable=True)
+    player_count = db.Column(db.Integer, default=0, nullable=False)
+    played_at = db.Column(db.DateTime, nullable=True)
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<IngestedMatch {self.match_id}>'
+
+
+class MatchParticipation(db.Model):
+    """One player's stat deltas from one match (or an admin adjustment / pre-history baseline).
+
+    Player's lifetime counters are the running sum of these rows; see match_history.py.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.String(100), nullable=True)  # IngestedMatch.match_id, None for adjustments
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='CASCADE'), nullable=False)
+    game_mode_id = db.Column(db.Integer, db.ForeignKey('game_mode.id'), nullable=True)
+    source = db.Column(db.String(10), default='match', nullable=False)  # match, adjustment, baseline
+    played_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    kills = db.Column(db.Integer, default=0, nullable=False)
+    final_kills = db.Column(db.Integer, default=0, nullable=False)
+    deaths = db.Column(db.Integer, default=0, nullable=False)
+    final_deaths = db.Column(db.Integer, default=0, nullable=False)
+    beds_broken = db.Column(db.Integer, default=0, nullable=False)
+    games_played = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    iron_collected = db.Column(db.Integer, default=0, nullable=False)
+    gold_collected = db.Column(db.Integer, default=0, nullable=False)
+    diamond_collected = db.Column(db.Integer, default=0, nullable=False)
+    emerald_collected = db.Column(db.Integer, default=0, nullable=False)
+    items_purchased = db.Column(db.Integer, default=0, nullable=False)
+
+    # Relationships
+    player = db.relationship('Player', backref=db.backref('match_facts', lazy='dynamic',
+                                                          cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('ix_match_participation_played_at', 'played_at'),
+        db.Index('ix_match_participation_player', 'player_id', 'played_at'),
+        db.Index('ix_match_participation_match', 'match_id'),
+    )
+
+    def __repr__(self):
+        return f'<MatchParticipation {self.match_id or self.source}:{self.player_id}>'
+
+
+class PlayerStatSnapshot(db.Model):
+    """A player's totals at the end of a day; older rows are thinned to weekly and monthly points"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='CASCADE'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    resolution = db.Column(db.String(5), default='day', nullable=False)  # day, week, month
+    experience = db.Column(db.Integer, default=0, nullable=False)
+    kills = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    beds_broken = db.Column(db.Integer, default=0, nullable=False)
+    coins = db.Column(db.Integer, default=0, nullable=False)
+    reputation = db.Column(db.Integer, default=0, nullable=False)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    player = db.relationship('Player', backref=db.backref('stat_snapshots', lazy='dynamic',
+                                                          cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'day', name='uq_player_stat_snapshot_day'),
+        db.Index('ix_player_stat_snapshot_taken_at', 'taken_at'),
+        db.Index('ix_player_stat_snapshot_resolution', 'resolution', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<PlayerStatSnapshot {self.player_id}@{self.day}>'
+
+
+class Season(db.Model):
+    """Named ranked season; its gains leaderboard is materialized like the rolling windows"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    display_name = db.Column(db.String(100), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False)
+    ends_at = db.Column(db.DateTime, nullable=True)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Season {self.name}>'
+
+    @classmethod
+    def current(cls):
+        """Active season that has started most recently"""
+        now = datetime.utcnow()
+        return (cls.query.filter(cls.is_active == True, cls.starts_at <= now)
+                .order_by(cls.starts_at.desc()).first())
+
+
+class WindowedStat(db.Model):
+    """A player's stat gains within one leaderboard window (24h, 7d, 30d or a season).
+
+    Rebuilt from match history facts by leaderboard_windows.py; never computed per request.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    window_key = db.Column(db.String(20), nullable=False)  # 24h, 7d, 30d, season:<id>
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='CASCADE'), nullable=False)
+    experience = db.Column(db.Integer, default=0, nullable=False)  # XP earned from the window's stats
+    kills = db.Column(db.Integer, default=0, nullable=False)
+    final_kills = db.Column(db.Integer, default=0, nullable=False)
+    deaths = db.Column(db.Integer, default=0, nullable=False)
+    beds_broken = db.Column(db.Integer, default=0, nullable=False)
+    games_played = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    player = db.relationship('Player', backref=db.backref('windowed_stats', lazy='dynamic',
+                                                          cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.UniqueConstraint('window_key', 'player_id', name='uq_windowed_stat_player'),
+        db.Index('ix_windowed_stat_experience', 'window_key', 'experience', 'player_id'),
+        db.Index('ix_windowed_stat_kills', 'window_key', 'kills', 'player_id'),
+        db.Index('ix_windowed_stat_final_kills', 'window_key', 'final_kills', 'player_id'),
+        db.Index('ix_windowed_stat_beds_broken', 'window_key', 'beds_broken', 'player_id'),
+        db.Index('ix_windowed_stat_wins', 'window_key', 'wins', 'player_id'),
+    )
+
+    def __repr__(self):
+        return f'<WindowedStat {self.window_key}:{self.player_id}>'
+
+
+class DataVersion(db.Model):
+    """Single-row global counter bumped by every transaction that changes data (see data_version.py)"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<DataVersion {self.version}>'
+
+
+class LeaderboardRow(db.Model):
+    """Denormalized display copy of a player for the main leaderboard.
+
+    Maintained by leaderboard_rows.py on every write to the player or its roles
+    and gradients; the leaderboard page and API read only this table. Attribute
+    names match the Player properties they copy, so templates accept either.
+    """
+
+    __tablename__ = 'leaderboard_row'
+
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='CASCADE'), primary_key=True)
+    nickname = db.Column(db.String(100), nullable=False)
+    server_ip = db.Column(db.String(100), nullable=True)
+    minecraft_skin_url = db.Column(db.String(255), nullable=True)
+
+    # Raw stats and the values derived from them
+    experience = db.Column(db.Integer, default=0, nullable=False)
+    level = db.Column(db.Integer, default=1, nullable=False)
+    level_progress = db.Column(db.Float, default=0, nullable=False)
+    kills = db.Column(db.Integer, default=0, nullable=False)
+    final_kills = db.Column(db.Integer, default=0, nullable=False)
+    deaths = db.Column(db.Integer, default=0, nullable=False)
+    final_deaths = db.Column(db.Integer, default=0, nullable=False)
+    beds_broken = db.Column(db.Integer, default=0, nullable=False)
+    games_played = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    kd_ratio = db.Column(db.Float, default=0, nullable=False)
+    win_rate = db.Column(db.Float, default=0, nullable=False)
+    star_rating = db.Column(db.Integer, default=1, nullable=False)
+
+    # Resolved role and styling
+    display_role = db.Column(db.String(100), nullable=False)
+    role_color = db.Column(db.String(7), nullable=True)
+    role_gradient = db.Column(db.Text, nullable=True)
+    nickname_gradient = db.Column(db.Text, nullable=True)
+    name_color = db.Column(db.String(7), nullable=True)
+
+    # Copies of the player's fragment cache version (see fragment_cache.py)
+    render_version = db.Column(db.Integer, default=0, nullable=False)
+    last_updated = db.Column(db.DateTime, nullable=True)
+
+    id = db.synonym('player_id')
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_row_experience', 'experience', 'player_id'),
+        db.Index('ix_leaderboard_row_level', 'level', 'player_id'),
+        db.Index('ix_leaderboard_row_kills', 'kills', 'player_id'),
+        db.Index('ix_leaderboard_row_final_kills', 'final_kills', 'player_id'),
+        db.Index('ix_leaderboard_row_beds_broken', 'beds_broken', 'player_id'),
+        db.Index('ix_leaderboard_row_wins', 'wins', 'player_id'),
+        db.Index('ix_leaderboard_row_kd_ratio', 'kd_ratio', 'player_id'),
+        db.Index('ix_leaderboard_row_win_rate', 'win_rate', 'player_id'),
+        db.Index('ix_leaderboard_row_nickname', 'nickname'),
+        {'info': {'derived': True}},
+    )
+
     def __repr__(self):
-        return f'<TournamentParticipant {self.player_id}:{self.tournament_id}>'
\ No newline at end of file
+        return f'<LeaderboardRow {self.nickname}>'
@@ -0,0 +1,156 @@
+"""
+Full-page cache for the public HTML views.
+
+Rendered pages are stored in a small SQLite file (instance/page_cache.db by
+default, PAGE_CACHE_PATH to override) so every gunicorn worker on the host
+shares one copy. Entries are keyed by endpoint, normalized query arguments,
+language and site theme, and are only valid for the data version they were
+rendered at (see data_version.py), so any write invalidates every page at once.
+
+The per-visitor parts of base.html (the navbar user panel and the
+window.currentPlayer script) are rendered from partial templates between
+<!--fragment:name--> markers. They are cut out before a page is stored and
+re-rendered for each visitor on the way out, so anonymous visitors and
+logged-in players share the same cached page. Admins, requests with pending
+flash messages and views whose body depends on the player bypass the cache.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import request, session, make_response, render_template
+
+import data_version
+from app import app, instance_dir
+
+FRAGMENTS = ('_user_panel.html', '_player_script.html')
+MAX_ENTRIES = 2000
+
+_local = threading.local()
+
+
+def _store_path():
+    return os.environ.get('PAGE_CACHE_PATH') or os.path.join(instance_dir, 'page_cache.db')
+
+
+def _connection():
+    """Per-thread connection, reopened after a fork"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(_store_path(), timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS page ('
+            'key TEXT PRIMARY KEY, version TEXT NOT NULL, body BLOB NOT NULL, created_at REAL NOT NULL)'
+        )
+        _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _version_tag():
+    version, updated_at = data_version.current()
+    return f"{version}:{updated_at.isoformat() if updated_at else ''}"
+
+
+def page_key():
+    """Cache key for the current request"""
+    args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)) if value != '')
+    theme = session.get('current_theme') or {}
+    raw = f"{request.endpoint}?{args}|{session.get('language', 'ru')}|{theme.get('id', '')}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def get(key, version):
+    row = _connection().execute('SELECT body FROM page WHERE key = ? AND version = ?', (key, version)).fetchone()
+    return row[0].decode('utf-8') if row else None
+
+
+def put(key, version, body):
+    conn = _connection()
+    conn.execute('INSERT OR REPLACE INTO page (key, version, body, created_at) VALUES (?, ?, ?, ?)',
+                 (key, version, body.encode('utf-8'), time.time()))
+    # Entries from older versions can never be served again
+    conn.execute('DELETE FROM page WHERE version != ?', (version,))
+    conn.execute('DELETE FROM page WHERE key IN (SELECT key FROM page ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                 (MAX_ENTRIES,))
+
+
+def clear():
+    _connection().execute('DELETE FROM page')
+
+
+def _markers(name):
+    return f'<!--fragment:{name}-->', f'<!--/fragment:{name}-->'
+
+
+def strip_fragments(html):
+    """Empty every fragment so the page no longer depends on the visitor"""
+    for name in FRAGMENTS:
+        start, end = _markers(name)
+        head, found, rest = html.partition(start)
+        if found:
+            _, _, tail = rest.partition(end)
+            html = head + start + end + tail
+    return html
+
+
+def fill_fragments(html):
+    """Render the visitor's fragments into a stripped page"""
+    for name in FRAGMENTS:
+        start, end = _markers(name)
+        html = html.replace(start + end, start + render_template(name) + end, 1)
+    return html
+
+
+def _bypass(anonymous_only):
+    if app.config.get('PAGE_CACHE_DISABLED') or request.method != 'GET':
+        return True
+    if session.get('is_admin') or session.get('_flashes'):
+        return True
+    return anonymous_only and bool(session.get('player_nickname'))
+
+
+def cached_page(anonymous_only=False, prepare=None):
+    """Decorator for public HTML views.
+
+    anonymous_only: the page body itself depends on the logged-in player, so
+    only anonymous visitors are served from the cache.
+    prepare: called before the lookup, for session setup the view would do.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if prepare:
+                prepare()
+            if _bypass(anonymous_only):
+                return view(*args, **kwargs)
+
+            key, version = page_key(), _version_tag()
+            try:
+                body = get(key, version)
+            except sqlite3.Error as e:
+                app.logger.error(f"Page cache read failed: {e}")
+                return view(*args, **kwargs)
+
+            status = 'HIT'
+            if body is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.mimetype != 'text/html':
+                    return response
+                body = strip_fragments(response.get_data(as_text=True))
+                try:
+                    put(key, version, body)
+                except sqlite3.Error as e:
+                    app.logger.error(f"Page cache write failed: {e}")
+                status = 'MISS'
+
+            response = make_response(fill_fragments(body))
+            response.headers['X-Page-Cache'] = status
+            return response
+        return wrapper
+    return decorator
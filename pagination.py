@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination helpers shared by list views
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from app import db
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode the last row's sort key into an opaque URL-safe cursor"""
+    if isinstance(sort_value, datetime):
+        sort_value = {'dt': sort_value.isoformat()}
+    raw = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, returns None if invalid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(sort_value, dict) and 'dt' in sort_value:
+            sort_value = datetime.fromisoformat(sort_value['dt'])
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, limit=30):
+    """Return (rows, next_cursor) for a query ordered by (sort_column DESC, id DESC).
+
+    The WHERE clause is a row-value comparison on the same columns as the
+    ORDER BY, so each page is a single index range scan regardless of depth.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        last_value, last_id = position
+        query = query.filter(db.or_(
+            sort_column < last_value,
+            db.and_(sort_column == last_value, id_column < last_id)
+        ))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
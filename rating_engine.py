@@ -0,0 +1,249 @@
+"""
+Glicko-2 rating engine for players and clans.
+
+Match results are rated in batches: every result handed to one rate_results()
+call belongs to the same rating period, and the Glicko-2 update for everyone
+who played in it is one vectorized NumPy pass (the volatility root-finding
+included). Players who sit out periods are not touched; their deviation is
+widened for the skipped periods the next time they play. Each period's outcome
+is appended to RatingHistory.
+
+Clan ratings use the same update: a player match between members of two
+different clans also counts as a result between those clans.
+"""
+
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, update
+
+from app import db
+from models import Clan, ClanMember, PlayerRating, RatingHistory, TournamentMatch
+
+SCALE = 173.7178  # Glicko-2 internal scale factor
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOLATILITY = 0.06
+TAU = 0.5  # Constrains volatility change per period
+MAX_RD = 350.0
+EPSILON = 1e-6
+
+
+def _g(phi):
+    """Glicko-2 g() weight that discounts games against uncertain opponents"""
+    return 1.0 / np.sqrt(1.0 + 3.0 * phi * phi / np.pi ** 2)
+
+
+def glicko2_period(rating, rd, volatility, first, second, score, tau=TAU):
+    """Rate one period for all entities at once.
+
+    rating/rd/volatility are arrays over the active entities; first/second are
+    index arrays into them, one entry per game, and score is the first
+    entity's result (1 win, 0.5 draw, 0 loss). Returns new (rating, rd, volatility).
+    """
+    mu = (np.asarray(rating, dtype=float) - DEFAULT_RATING) / SCALE
+    phi = np.asarray(rd, dtype=float) / SCALE
+    sigma = np.asarray(volatility, dtype=float)
+    first, second = np.asarray(first), np.asarray(second)
+    score = np.asarray(score, dtype=float)
+
+    # Every game counts for both sides; opponents are rated at their pre-period values
+    players = np.concatenate([first, second])
+    opponents = np.concatenate([second, first])
+    scores = np.concatenate([score, 1.0 - score])
+
+    g = _g(phi[opponents])
+    expected = 1.0 / (1.0 + np.exp(-g * (mu[players] - mu[opponents])))
+    inv_v = np.zeros_like(mu)
+    improvement = np.zeros_like(mu)
+    np.add.at(inv_v, players, g * g * expected * (1.0 - expected))
+    np.add.at(improvement, players, g * (scores - expected))
+
+    played = inv_v > 0
+    v = np.divide(1.0, inv_v, out=np.full_like(mu, np.inf), where=played)
+    delta = np.where(played, v * improvement, 0.0)
+
+    new_sigma = np.where(played, _volatility(delta, phi, v, sigma, tau), sigma)
+    phi_star = np.sqrt(phi * phi + new_sigma * new_sigma)
+    new_phi = np.where(played, 1.0 / np.sqrt(1.0 / (phi_star * phi_star) + inv_v), phi_star)
+    new_mu = mu + new_phi * new_phi * improvement
+
+    return (new_mu * SCALE + DEFAULT_RATING,
+            np.minimum(new_phi * SCALE, MAX_RD),
+            new_sigma)
+
+
+def _volatility(delta, phi, v, sigma, tau):
+    """Vectorized Illinois iteration from step 5 of the Glicko-2 paper"""
+    a = np.log(sigma * sigma)
+    delta2, phi2 = delta * delta, phi * phi
+    v = np.where(np.isfinite(v), v, 0.0)
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta2 - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    upper = a.copy()
+    lower = np.log(np.maximum(delta2 - phi2 - v, 1e-300))
+    needs_k = delta2 <= phi2 + v
+    if needs_k.any():
+        k = np.ones_like(a)
+        lower = np.where(needs_k, a - tau, lower)
+        searching = needs_k & (f(lower) < 0)
+        while searching.any():
+            k += searching
+            lower = np.where(searching, a - k * tau, lower)
+            searching &= f(lower) < 0
+
+    A, B = upper, lower
+    fA, fB = f(A), f(B)
+    active = np.abs(B - A) > EPSILON
+    for _ in range(100):
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = fC * fB <= 0
+        A = np.where(active & swap, B, A)
+        fA = np.where(active & swap, fB, np.where(active, fA / 2.0, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active &= np.abs(B - A) > EPSILON
+    return np.exp(A / 2.0)
+
+
+def _widen_rd(rd, volatility, skipped):
+    """Grow the deviation for periods an entity did not play in"""
+    phi = rd / SCALE
+    widened = np.sqrt(phi * phi + skipped * volatility * volatility) * SCALE
+    return np.minimum(widened, MAX_RD)
+
+
+def next_period():
+    """Number of the rating period that has not been rated yet"""
+    return (db.session.query(db.func.max(RatingHistory.period)).scalar() or 0) + 1
+
+
+def _index_results(results):
+    """Map result entity ids to dense indexes; returns (ids, first, second, score)"""
+    ids = sorted({entity for a, b, _ in results for entity in (a, b)})
+    position = {entity: index for index, entity in enumerate(ids)}
+    first = np.fromiter((position[a] for a, _, _ in results), dtype=np.intp, count=len(results))
+    second = np.fromiter((position[b] for _, b, _ in results), dtype=np.intp, count=len(results))
+    score = np.fromiter((s for _, _, s in results), dtype=float, count=len(results))
+    return ids, first, second, score
+
+
+def _history_rows(entity_type, ids, period, rating, rd, volatility):
+    """RatingHistory insert parameters for one period"""
+    now = datetime.utcnow()
+    return [{'entity_type': entity_type, 'entity_id': entity_id, 'period': period,
+             'rating': float(r), 'rd': float(d), 'volatility': float(s), 'created_at': now}
+            for entity_id, r, d, s in zip(ids, rating, rd, volatility)]
+
+
+def _load_player_ratings(player_ids):
+    """Current rating rows keyed by player id"""
+    return {row.player_id: row for row in
+            db.session.query(PlayerRating.id, PlayerRating.player_id, PlayerRating.rating, PlayerRating.rd,
+                             PlayerRating.volatility, PlayerRating.matches_rated, PlayerRating.last_period)
+            .filter(PlayerRating.player_id.in_(player_ids))}
+
+
+def _rate_players(results, period):
+    """Glicko-2 update of every player in the period's results"""
+    ids, first, second, score = _index_results(results)
+    existing = _load_player_ratings(ids)
+    missing = [player_id for player_id in ids if player_id not in existing]
+    if missing:
+        db.session.execute(insert(PlayerRating), [
+            {'player_id': player_id, 'rating': DEFAULT_RATING, 'rd': DEFAULT_RD,
+             'volatility': DEFAULT_VOLATILITY, 'matches_rated': 0}
+            for player_id in missing
+        ])
+        existing.update(_load_player_ratings(missing))
+
+    rows = [existing[player_id] for player_id in ids]
+    volatility = np.array([row.volatility for row in rows])
+    skipped = np.array([period - row.last_period - 1 if row.last_period else 0 for row in rows])
+    rd = _widen_rd(np.array([row.rd for row in rows]), volatility, np.maximum(skipped, 0))
+    rating, rd, volatility = glicko2_period([row.rating for row in rows], rd, volatility, first, second, score)
+    games = np.bincount(np.concatenate([first, second]), minlength=len(ids))
+
+    db.session.execute(update(PlayerRating), [
+        {'id': row.id, 'rating': float(r), 'rd': float(d), 'volatility': float(v),
+         'matches_rated': row.matches_rated + int(n), 'last_period': period}
+        for row, r, d, v, n in zip(rows, rating, rd, volatility, games)
+    ])
+    db.session.execute(insert(RatingHistory), _history_rows('player', ids, period, rating, rd, volatility))
+    return len(ids)
+
+
+def _clan_results(results):
+    """Turn player results into clan-vs-clan results for members of two different clans"""
+    player_ids = {player for a, b, _ in results for player in (a, b)}
+    clan_of = dict(db.session.query(ClanMember.player_id, ClanMember.clan_id)
+                   .filter(ClanMember.player_id.in_(player_ids), ClanMember.is_active == True))
+    return [(clan_of[a], clan_of[b], s) for a, b, s in results
+            if a in clan_of and b in clan_of and clan_of[a] != clan_of[b]]
+
+
+def _rate_clans(results, period):
+    """Glicko-2 update of Clan.rating for clans that met in the period"""
+    if not results:
+        return 0
+    ids, first, second, score = _index_results(results)
+    rows = {row.id: row for row in
+            db.session.query(Clan.id, Clan.rating, Clan.rating_rd, Clan.rating_volatility, Clan.rating_period)
+            .filter(Clan.id.in_(ids))}
+    rows = [rows[clan_id] for clan_id in ids]
+
+    volatility = np.array([row.rating_volatility for row in rows])
+    skipped = np.array([period - row.rating_period - 1 if row.rating_period else 0 for row in rows])
+    rd = _widen_rd(np.array([row.rating_rd for row in rows]), volatility, np.maximum(skipped, 0))
+    rating, rd, volatility = glicko2_period([row.rating for row in rows], rd, volatility, first, second, score)
+
+    db.session.execute(update(Clan), [
+        {'id': row.id, 'rating': int(round(r)), 'rating_rd': float(d),
+         'rating_volatility': float(v), 'rating_period': period}
+        for row, r, d, v in zip(rows, rating, rd, volatility)
+    ])
+    db.session.execute(insert(RatingHistory), _history_rows('clan', ids, period, rating, rd, volatility))
+    return len(ids)
+
+
+def rate_results(results, period=None):
+    """Rate one period of player match results.
+
+    results is an iterable of (player_a_id, player_b_id, score_a) with score_a
+    1 for a win, 0.5 for a draw and 0 for a loss. Returns (period, players
+    rated, clans rated). The caller commits.
+    """
+    results = [(a, b, float(s)) for a, b, s in results if a and b and a != b]
+    if not results:
+        return None, 0, 0
+    period = period or next_period()
+    players = _rate_players(results, period)
+    clans = _rate_clans(_clan_results(results), period)
+    return period, players, clans
+
+
+def rate_pending_matches(tournament_id=None):
+    """Rate every finished tournament match that has not been rated yet as one period"""
+    query = (db.session.query(TournamentMatch.id, TournamentMatch.player1_id,
+                              TournamentMatch.player2_id, TournamentMatch.winner_id)
+             .filter(TournamentMatch.rating_period.is_(None),
+                     TournamentMatch.winner_id.isnot(None),
+                     TournamentMatch.player1_id.isnot(None),
+                     TournamentMatch.player2_id.isnot(None)))
+    if tournament_id is not None:
+        query = query.filter(TournamentMatch.tournament_id == tournament_id)
+    matches = query.all()
+
+    period, players, clans = rate_results(
+        (m.player1_id, m.player2_id, 1.0 if m.winner_id == m.player1_id else 0.0) for m in matches
+    )
+    if period:
+        TournamentMatch.query.filter(TournamentMatch.id.in_([m.id for m in matches])).update(
+            {TournamentMatch.rating_period: period}, synchronize_session=False)
+    return period, players, clans
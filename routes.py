@@ -1,14 +1,14 @@
-from flask import render_template, request, redirect, url_for, flash, session, jsonify, make_response
+from flask import render_template, request, redirect, url_for, flash, session, jsonify, make_response, Response, stream_with_context, send_file, abort
 from app import app, db
-from models import Player, Quest, PlayerQuest, Achievement, PlayerAchievement, CustomTitle, PlayerTitle, GradientTheme, PlayerGradientSetting, SiteTheme, ShopItem, ShopPurchase, Clan, ClanMember, Tournament, TournamentParticipant, PlayerActiveBooster, AdminCustomRole, PlayerAdminRole, Badge, PlayerBadge, ReputationLog, ASCENDData
+from models import Player, Quest, PlayerQuest, Achievement, PlayerAchievement, CustomTitle, PlayerTitle, GradientTheme, PlayerGradientSetting, SiteTheme, ShopItem, ShopPurchase, Clan, ClanMember, Tournament, TournamentParticipant, TournamentMatch, PlayerActiveBooster, AdminCustomRole, PlayerAdminRole, Badge, PlayerBadge, ReputationLog, ASCENDData
 import os
 import csv
 import io
 from datetime import datetime, date
-
-# Import routes first
-import routes
-import api_routes
+from sqlalchemy.exc import IntegrityError
+import tournament_engine
+from http_cache import conditional
+from page_cache import cached_page
 
 # Admin password
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
@@ -27,24 +27,8 @@ def inject_current_player():
 
     return dict(current_player=current_player, current_language=session.get('language', 'ru'))
 
-@app.route('/')
-def index():
-    """Display the enhanced leaderboard"""
-    sort_by = request.args.get('sort', 'experience')
-    search = request.args.get('search', '').strip()
-    page = max(1, int(request.args.get('page', 1)))
-    limit = min(int(request.args.get('limit', 50)), 50)  # Max 50 records
-    offset = (page - 1) * limit
-
-    if search:
-        players = Player.search_players(search, limit=limit, offset=offset)
-    else:
-        players = Player.get_leaderboard(sort_by=sort_by, limit=limit, offset=offset)
-
-    is_admin = session.get('is_admin', False)
-    stats = Player.get_statistics()
-
-    # Initialize theme in session if not set
+def ensure_session_theme():
+    """Initialize the session theme from the logged-in player's selection"""
     if 'current_theme' not in session:
         player_nickname = session.get('player_nickname')
         if player_nickname:
@@ -63,9 +47,44 @@ def index():
                     'accent_color': theme.accent_color
                 }
 
+@app.route('/')
+@cached_page(prepare=ensure_session_theme)
+def index():
+    """Display the enhanced leaderboard"""
+    sort_by = request.args.get('sort', 'experience')
+    search = request.args.get('search', '').strip()
+    page = max(1, int(request.args.get('page', 1)))
+    limit = min(int(request.args.get('limit', 50)), 50)  # Max 50 records
+    offset = (page - 1) * limit
+
+    window = request.args.get('window', '')
+    window_stats = {}
+
+    if search:
+        from leaderboard_rows import search as search_rows
+        players = search_rows(search, limit=limit, offset=offset)
+    elif window:
+        # Gains over a time window / season, read from the materialized table
+        from leaderboard_windows import window_leaderboard, WINDOW_CHOICES
+        from leaderboard_rows import rows_for
+        if window not in WINDOW_CHOICES:
+            abort(400)
+        rows = window_leaderboard(window, sort_by=sort_by, limit=limit, offset=offset)
+        players = rows_for([row.player_id for row in rows])
+        window_stats = {row.player_id: row for row in rows}
+    else:
+        # Denormalized rows: one indexed query, no role / gradient lookups per row
+        from leaderboard_rows import leaderboard
+        players = leaderboard(sort_by=sort_by, limit=limit, offset=offset)
+
+    is_admin = session.get('is_admin', False)
+    stats = Player.get_statistics()
+
     return render_template('index.html',
                          players=players,
                          current_sort=sort_by,
+                         current_window=window,
+                         window_stats=window_stats,
                          search_query=search,
                          is_admin=is_admin,
                          stats=stats,
@@ -220,6 +239,7 @@ def api_compare_players(player1_id, player2_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/statistics')
+@cached_page()
 def statistics():
     """Display detailed statistics page"""
     stats = Player.get_statistics()
@@ -277,32 +297,6 @@ def logout():
 def themes():
     """Theme selection page"""
     try:
-        # Initialize default themes if none exist
-        try:
-            if SiteTheme.query.count() == 0:
-                SiteTheme.create_default_themes()
-        except Exception as e:
-            app.logger.error(f"Error checking/creating themes: {e}")
-            # Create minimal default theme
-            try:
-                db.create_all()
-                default_theme = SiteTheme(
-                    name='default_dark',
-                    display_name='Классическая тёмная',
-                    description='Элегантная тёмная тема с золотыми акцентами',
-                    primary_color='#ffc107',
-                    secondary_color='#6c757d',
-                    background_color='#0d1117',
-                    card_background='#161b22',
-                    text_color='#f0f6fc',
-                    accent_color='#28a745',
-                    is_default=True
-                )
-                db.session.add(default_theme)
-                db.session.commit()
-            except Exception as create_error:
-                app.logger.error(f"Failed to create default theme: {create_error}")
-
         try:
             themes = SiteTheme.query.filter_by(is_active=True).all()
         except Exception as e:
@@ -662,13 +656,16 @@ def delete_player(player_id):
     try:
         player = Player.query.get_or_404(player_id)
         nickname = player.nickname
-        db.session.delete(player)
+        Player.delete_players([player.id])
         db.session.commit()
 
         # Очистка кэша статистики
         Player.clear_statistics_cache()
 
         flash(f'Игрок {nickname} удален из таблицы лидеров!', 'success')
+    except ValueError:
+        db.session.rollback()
+        flash('Нельзя удалить организатора или участника турнира, а также лидера клана без других участников!', 'error')
     except Exception as e:
         app.logger.error(f"Error deleting player: {e}")
         flash('Произошла ошибка при удалении игрока!', 'error')
@@ -683,13 +680,16 @@ def clear_leaderboard():
         return redirect(url_for('index'))
 
     try:
-        Player.query.delete()
+        Player.delete_players()
         db.session.commit()
 
         # Очистка кэша статистики
         Player.clear_statistics_cache()
 
         flash('Таблица лидеров очищена!', 'success')
+    except ValueError:
+        db.session.rollback()
+        flash('Сначала удалите турниры и кланы игроков!', 'error')
     except Exception as e:
         app.logger.error(f"Error clearing leaderboard: {e}")
         flash('Произошла ошибка при очистке таблицы!', 'error')
@@ -698,41 +698,31 @@ def clear_leaderboard():
 
 @app.route('/export')
 def export_leaderboard():
-    """Export leaderboard data as CSV"""
-    try:
-        players = Player.query.order_by(Player.experience.desc()).all()
+    """Export leaderboard data as a streamed CSV.
 
-        output = io.StringIO()
-        writer = csv.writer(output)
+    Optional query parameters: sort (experience, kills, final_kills, beds_broken,
+    wins), server_ip, min_games and gzip=1 for a compressed download.
+    """
+    try:
+        from exports import leaderboard_query, leaderboard_csv, gzip_stream
 
-        # Header
-        writer.writerow([
-            'Ник', 'Уровень', 'Опыт', 'Киллы', 'Финальные киллы', 'Смерти',
-            'K/D', 'FK/D', 'Кровати', 'Игры', 'Победы', 'Процент побед',
-            'Роль', 'Сервер', 'Железо', 'Золото', 'Алмазы', 'Изумруды',
-            'Покупки', 'Дата создания', 'Последнее обновление'
-        ])
+        query = leaderboard_query(
+            sort_by=request.args.get('sort', 'experience'),
+            server_ip=request.args.get('server_ip', '').strip() or None,
+            min_games=request.args.get('min_games', type=int)
+        )
+        filename = f'bedwars_leaderboard_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
 
-        # Data
-        for player in players:
-            writer.writerow([
-                player.nickname, player.level, player.experience,
-                player.kills, player.final_kills, player.deaths,
-                player.kd_ratio, player.fkd_ratio, player.beds_broken,
-                player.games_played, player.wins, player.win_rate,
-                player.role, player.server_ip, player.iron_collected,
-                player.gold_collected, player.diamond_collected,
-                player.emerald_collected, player.items_purchased,
-                player.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                player.last_updated.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-
-        output.seek(0)
-
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=bedwars_leaderboard_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        if request.args.get('gzip') == '1':
+            body = gzip_stream(leaderboard_csv(query))
+            mimetype = 'application/gzip'
+            filename += '.gz'
+        else:
+            body = (chunk.encode('utf-8') for chunk in leaderboard_csv(query))
+            mimetype = 'text/csv'
 
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
     except Exception as e:
@@ -742,133 +732,35 @@ def export_leaderboard():
 
 @app.route('/admin/export-db')
 def export_database():
-    """Export full database as JSON (admin only)"""
+    """Stream a full NDJSON database backup (admin only).
+
+    Optional query parameters: gzip=1 to compress, resume_table and resume_id
+    to continue an interrupted backup after the last row received.
+    """
     if not session.get('is_admin', False):
         flash('Доступ запрещен!', 'error')
         return redirect(url_for('login'))
 
     try:
-        import json
-
-        # Export all data
-        data = {
-            'players': [],
-            'quests': [],
-            'achievements': [],
-            'custom_titles': [],
-            'gradient_themes': [],
-            'player_quests': [],
-            'player_achievements': [],
-            'player_titles': [],
-            'player_gradient_settings': [],
-            'shop_items': [],
-            'shop_purchases': []
-        }
-
-        # Export players
-        for player in Player.query.all():
-            player_data = {
-                'nickname': player.nickname,
-                'kills': player.kills,
-                'final_kills': player.final_kills,
-                'deaths': player.deaths,
-                'beds_broken': player.beds_broken,
-                'games_played': player.games_played,
-                'wins': player.wins,
-                'experience': player.experience,
-                'role': player.role,
-                'server_ip': player.server_ip,
-                'iron_collected': player.iron_collected,
-                'gold_collected': player.gold_collected,
-                'diamond_collected': player.diamond_collected,
-                'emerald_collected': player.emerald_collected,
-                'items_purchased': player.items_purchased,
-                'skin_url': player.skin_url,
-                'skin_type': player.skin_type,
-                'is_premium': player.is_premium,
-                'real_name': player.real_name,
-                'bio': player.bio,
-                'discord_tag': player.discord_tag,
-                'youtube_channel': player.youtube_channel,
-                'twitch_channel': player.twitch_channel,
-                'favorite_server': player.favorite_server,
-                'favorite_map': player.favorite_map,
-                'preferred_gamemode': player.preferred_gamemode,
-                'profile_banner_color': player.profile_banner_color,
-                'profile_is_public': player.profile_is_public,
-                'custom_status': player.custom_status,
-                'location': player.location,
-                'birthday': player.birthday.isoformat() if player.birthday else None,
-                'custom_avatar_url': player.custom_avatar_url,
-                'custom_banner_url': player.custom_banner_url,
-                'banner_is_animated': player.banner_is_animated,
-                'social_networks': player.social_networks,
-                'stats_section_color': player.stats_section_color,
-                'info_section_color': player.info_section_color,
-                'social_section_color': player.social_section_color,
-                'prefs_section_color': player.prefs_section_color,
-                'password_hash': player.password_hash,
-                'has_password': player.has_password,
-                'leaderboard_name_color': player.leaderboard_name_color,
-                'leaderboard_stats_color': player.leaderboard_stats_color,
-                'leaderboard_use_gradient': player.leaderboard_use_gradient,
-                'leaderboard_gradient_start': player.leaderboard_gradient_start,
-                'leaderboard_gradient_end': player.leaderboard_gradient_end,
-                'leaderboard_gradient_animated': player.leaderboard_gradient_animated,
-                'created_at': player.created_at.isoformat(),
-                'last_updated': player.last_updated.isoformat()
-            }
-            data['players'].append(player_data)
-
-        # Export other tables (simplified)
-        for quest in Quest.query.all():
-            data['quests'].append({
-                'title': quest.title,
-                'description': quest.description,
-                'type': quest.type,
-                'target_value': quest.target_value,
-                'reward_xp': quest.reward_xp,
-                'reward_title': quest.reward_title,
-                'icon': quest.icon,
-                'difficulty': quest.difficulty,
-                'is_active': quest.is_active
-            })
-
-        for achievement in Achievement.query.all():
-            data['achievements'].append({
-                'title': achievement.title,
-                'description': achievement.description,
-                'icon': achievement.icon,
-                'rarity': achievement.rarity,
-                'unlock_condition': achievement.unlock_condition,
-                'reward_xp': achievement.reward_xp,
-                'reward_title': achievement.reward_title,
-                'is_hidden': achievement.is_hidden
-            })
-
-        for shop_item in ShopItem.query.all():
-            data['shop_items'].append({
-                'name': shop_item.name,
-                'display_name': shop_item.display_name,
-                'description': shop_item.description,
-                'category': shop_item.category,
-                'price_coins': shop_item.price_coins,
-                'price_reputation': shop_item.price_reputation,
-                'unlock_level': shop_item.unlock_level,
-                'rarity': shop_item.rarity,
-                'icon': shop_item.icon,
-                'item_data': shop_item.item_data,
-                'is_limited_time': shop_item.is_limited_time,
-                'is_active': shop_item.is_active
-            })
+        from backup import backup_stream
+        from exports import gzip_stream
 
-        # Create JSON file
-        json_output = json.dumps(data, ensure_ascii=False, indent=2, default=str)
+        lines = backup_stream(
+            resume_table=request.args.get('resume_table') or None,
+            resume_id=request.args.get('resume_id', type=int)
+        )
+        filename = f'bedwars_database_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.ndjson'
 
-        response = make_response(json_output)
-        response.headers['Content-Type'] = 'application/json'
-        response.headers['Content-Disposition'] = f'attachment; filename=bedwars_database_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+        if request.args.get('gzip') == '1':
+            body = gzip_stream(lines)
+            mimetype = 'application/gzip'
+            filename += '.gz'
+        else:
+            body = (chunk.encode('utf-8') for chunk in lines)
+            mimetype = 'application/x-ndjson'
 
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
     except Exception as e:
@@ -885,8 +777,7 @@ def import_database():
 
     if request.method == 'POST':
         try:
-            import json
-            from datetime import datetime, date
+            from backup import read_backup, BackupImporter
 
             if 'database_file' not in request.files:
                 flash('Файл не выбран!', 'error')
@@ -897,132 +788,25 @@ def import_database():
                 flash('Файл не выбран!', 'error')
                 return redirect(url_for('import_database'))
 
-            if not file.filename.endswith('.json'):
-                flash('Неверный формат файла! Требуется JSON.', 'error')
+            if not file.filename.endswith(('.ndjson', '.ndjson.gz', '.json', '.json.gz')):
+                flash('Неверный формат файла! Требуется NDJSON или JSON.', 'error')
                 return redirect(url_for('import_database'))
 
-            # Read and parse JSON
-            content = file.read().decode('utf-8')
-            data = json.loads(content)
-
-            # Clear existing data (optional - ask user)
-            clear_existing = request.form.get('clear_existing') == 'on'
-            if clear_existing:
-                # Clear all tables
-                ShopPurchase.query.delete()
-                ShopItem.query.delete()
-                PlayerGradientSetting.query.delete()
-                PlayerTitle.query.delete()
-                PlayerAchievement.query.delete()
-                PlayerQuest.query.delete()
-                GradientTheme.query.delete()
-                CustomTitle.query.delete()
-                Achievement.query.delete()
-                Quest.query.delete()
-                Player.query.delete()
-                db.session.commit()
+            def log_progress(table, counts):
+                app.logger.info(f"Import {table}: {counts['inserted']} inserted, {counts['skipped']} skipped")
 
-            # Import players
-            for player_data in data.get('players', []):
-                existing = Player.query.filter_by(nickname=player_data['nickname']).first()
-                if not existing:
-                    player = Player(
-                        nickname=player_data['nickname'],
-                        kills=player_data.get('kills', 0),
-                        final_kills=player_data.get('final_kills', 0),
-                        deaths=player_data.get('deaths', 0),
-                        beds_broken=player_data.get('beds_broken', 0),
-                        games_played=player_data.get('games_played', 0),
-                        wins=player_data.get('wins', 0),
-                        experience=player_data.get('experience', 0),
-                        role=player_data.get('role', 'Игрок'),
-                        server_ip=player_data.get('server_ip', ''),
-                        iron_collected=player_data.get('iron_collected', 0),
-                        gold_collected=player_data.get('gold_collected', 0),
-                        diamond_collected=player_data.get('diamond_collected', 0),
-                        emerald_collected=player_data.get('emerald_collected', 0),
-                        items_purchased=player_data.get('items_purchased', 0),
-                        skin_url=player_data.get('skin_url'),
-                        skin_type=player_data.get('skin_type', 'auto'),
-                        is_premium=player_data.get('is_premium', False),
-                        real_name=player_data.get('real_name'),
-                        bio=player_data.get('bio'),
-                        discord_tag=player_data.get('discord_tag'),
-                        youtube_channel=player_data.get('youtube_channel'),
-                        twitch_channel=player_data.get('twitch_channel'),
-                        favorite_server=player_data.get('favorite_server'),
-                        favorite_map=player_data.get('favorite_map'),
-                        preferred_gamemode=player_data.get('preferred_gamemode'),
-                        profile_banner_color=player_data.get('profile_banner_color', '#3498db'),
-                        profile_is_public=player_data.get('profile_is_public', True),
-                        custom_status=player_data.get('custom_status'),
-                        location=player_data.get('location'),
-                        custom_avatar_url=player_data.get('custom_avatar_url'),
-                        custom_banner_url=player_data.get('custom_banner_url'),
-                        banner_is_animated=player_data.get('banner_is_animated', False),
-                        social_networks=player_data.get('social_networks'),
-                        stats_section_color=player_data.get('stats_section_color', '#343a40'),
-                        info_section_color=player_data.get('info_section_color', '#343a40'),
-                        social_section_color=player_data.get('social_section_color', '#343a40'),
-                        prefs_section_color=player_data.get('prefs_section_color', '#343a40'),
-                        password_hash=player_data.get('password_hash'),
-                        has_password=player_data.get('has_password', False),
-                        leaderboard_name_color=player_data.get('leaderboard_name_color', '#ffffff'),
-                        leaderboard_stats_color=player_data.get('leaderboard_stats_color', '#ffffff'),
-                        leaderboard_use_gradient=player_data.get('leaderboard_use_gradient', False),
-                        leaderboard_gradient_start=player_data.get('leaderboard_gradient_start', '#ff6b35'),
-                        leaderboard_gradient_end=player_data.get('leaderboard_gradient_end', '#f7931e'),
-                        leaderboard_gradient_animated=player_data.get('leaderboard_gradient_animated', False)
-                    )
-
-                    # Handle birthday
-                    if player_data.get('birthday'):
-                        try:
-                            player.birthday = datetime.fromisoformat(player_data['birthday']).date()
-                        except:
-                            pass
-
-                    # Handle timestamps
-                    if player_data.get('created_at'):
-                        try:
-                            player.created_at = datetime.fromisoformat(player_data['created_at'])
-                        except:
-                            pass
-
-                    if player_data.get('last_updated'):
-                        try:
-                            player.last_updated = datetime.fromisoformat(player_data['last_updated'])
-                        except:
-                            pass
-
-                    db.session.add(player)
-
-            # Import quests
-            for quest_data in data.get('quests', []):
-                existing = Quest.query.filter_by(title=quest_data['title']).first()
-                if not existing:
-                    quest = Quest(**quest_data)
-                    db.session.add(quest)
-
-            # Import achievements
-            for achievement_data in data.get('achievements', []):
-                existing = Achievement.query.filter_by(title=achievement_data['title']).first()
-                if not existing:
-                    achievement = Achievement(**achievement_data)
-                    db.session.add(achievement)
-
-            # Import shop items
-            for item_data in data.get('shop_items', []):
-                existing = ShopItem.query.filter_by(name=item_data['name']).first()
-                if not existing:
-                    shop_item = ShopItem(**item_data)
-                    db.session.add(shop_item)
+            importer = BackupImporter(db.session, progress=log_progress)
+            if request.form.get('clear_existing') == 'on':
+                importer.clear_all()
 
+            # The upload is parsed line by line and committed in chunks
+            stats = importer.run(read_backup(file.stream))
 
-            db.session.commit()
             # Очистка кэша статистики
             Player.clear_statistics_cache()
-            flash('База данных успешно импортирована!', 'success')
+            inserted = sum(counts['inserted'] for counts in stats.values())
+            skipped = sum(counts['skipped'] for counts in stats.values())
+            flash(f'База данных успешно импортирована! Добавлено записей: {inserted}, пропущено: {skipped}', 'success')
 
         except Exception as e:
             db.session.rollback()
@@ -1033,6 +817,58 @@ def import_database():
 
     return render_template('admin_import_db.html')
 
+@app.route('/admin/snapshot')
+def admin_snapshot():
+    """Download a binary snapshot of the whole instance (admin only).
+
+    columnar=1 forces the engine-independent columnar format on SQLite.
+    """
+    if not session.get('is_admin', False):
+        flash('Доступ запрещен!', 'error')
+        return redirect(url_for('login'))
+
+    try:
+        import tempfile
+        from snapshot import create_snapshot
+
+        snapshot_file = tempfile.TemporaryFile()
+        create_snapshot(snapshot_file, columnar=True if request.args.get('columnar') == '1' else None)
+        snapshot_file.seek(0)
+        filename = f'bedwars_snapshot_{datetime.now().strftime("%Y%m%d_%H%M%S")}.bwsnap'
+        return send_file(snapshot_file, mimetype='application/octet-stream',
+                         as_attachment=True, download_name=filename)
+
+    except Exception as e:
+        app.logger.error(f"Error creating snapshot: {e}")
+        flash('Произошла ошибка при создании снимка базы данных!', 'error')
+        return redirect(url_for('admin'))
+
+@app.route('/admin/snapshot/restore', methods=['POST'])
+def admin_restore_snapshot():
+    """Replace all data with an uploaded binary snapshot (admin only)"""
+    if not session.get('is_admin', False):
+        flash('Доступ запрещен!', 'error')
+        return redirect(url_for('login'))
+
+    file = request.files.get('snapshot_file')
+    if not file or file.filename == '':
+        flash('Файл не выбран!', 'error')
+        return redirect(url_for('import_database'))
+
+    try:
+        from snapshot import restore_snapshot
+
+        restored = restore_snapshot(file.stream)
+        Player.clear_statistics_cache()
+        flash(f'Снимок базы данных восстановлен! Записей: {sum(restored.values())}', 'success')
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error restoring snapshot: {e}")
+        flash(f'Ошибка при восстановлении снимка: {e}', 'error')
+
+    return redirect(url_for('admin'))
+
 @app.route('/api/quest-progress')
 def api_quest_progress():
     """API endpoint for quest progress updates"""
@@ -1074,6 +910,7 @@ def api_quest_progress():
         return jsonify({'success': False, 'error': 'Internal error'}), 500
 
 @app.route('/api/player/<int:player_id>/ascend-data')
+@conditional()
 def api_player_ascend_data(player_id):
     """Get ASCEND data for a player"""
     try:
@@ -1095,6 +932,28 @@ def api_player_ascend_data(player_id):
         app.logger.error(f"Error getting ASCEND data: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/player/<int:player_id>/history')
+@conditional()
+def api_player_history(player_id):
+    """Progress chart series for a player: ?metric=experience|kills|...&range=7d|30d|90d|1y|all"""
+    from stat_snapshots import player_history, SNAPSHOT_FIELDS, HISTORY_RANGES
+
+    metric = request.args.get('metric', 'experience')
+    range_key = request.args.get('range', '30d')
+    if metric not in SNAPSHOT_FIELDS or range_key not in HISTORY_RANGES:
+        return jsonify({'success': False, 'error': 'Unknown metric or range'}), 400
+
+    try:
+        return jsonify({
+            'success': True,
+            'metric': metric,
+            'range': range_key,
+            'points': player_history(player_id, metric, range_key)
+        })
+    except Exception as e:
+        app.logger.error(f"Error getting player history: {e}")
+        return jsonify({'success': False, 'error': 'Internal error'}), 500
+
 @app.route('/api/ascend/update', methods=['POST'])
 def api_update_ascend():
     """Update ASCEND data for a player"""
@@ -1148,6 +1007,7 @@ def api_update_ascend():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/player/<int:player_id>/gradients')
+@conditional()
 def api_player_gradients(player_id):
     """Get player's active gradients"""
     try:
@@ -1317,6 +1177,7 @@ def api_remove_gradient():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/stats')
+@conditional()
 def api_stats():
     """API endpoint for statistics data (for charts)"""
     try:
@@ -1378,6 +1239,7 @@ def api_stats():
         return jsonify({'error': 'Failed to load statistics'}), 500
 
 @app.route('/api/player/<int:player_id>/rating/<int:mode_id>')
+@conditional()
 def get_player_rating(player_id, mode_id):
     """Get player rating for specific game mode"""
     try:
@@ -1510,6 +1372,53 @@ def auto_calculate_rating(player_id, mode_id):
         app.logger.error(f"Error auto-calculating rating: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/leaderboard/mode/<int:mode_id>')
+def api_mode_leaderboard(mode_id):
+    """API endpoint for the per-mode rating leaderboard, keyset paginated"""
+    try:
+        from models import PlayerGameRating, GameMode
+
+        mode = GameMode.query.get_or_404(mode_id)
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        ratings, next_cursor = PlayerGameRating.get_leaderboard_page(mode_id, request.args.get('cursor'), limit)
+
+        return jsonify({
+            'mode': {'id': mode.id, 'name': mode.name, 'display_name': mode.display_name},
+            'players': [{
+                'player_id': rating.player_id,
+                'nickname': rating.player.nickname,
+                'overall_rating': rating.overall_rating,
+                'overall_score': rating.overall_score,
+                'kd_rating': rating.kd_rating,
+                'kills_rating': rating.kills_rating,
+                'objective_rating': rating.objective_rating,
+                'efficiency_rating': rating.efficiency_rating
+            } for rating in ratings],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        app.logger.error(f"Error getting mode leaderboard: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/game_modes/recalculate', methods=['POST'])
+@app.route('/admin/game_modes/<int:mode_id>/recalculate', methods=['POST'])
+def admin_recalculate_mode_ratings(mode_id=None):
+    """Recompute all players' auto ratings for one or every game mode (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from models import PlayerGameRating, GameMode
+
+        modes = [GameMode.query.get_or_404(mode_id)] if mode_id else GameMode.query.filter_by(is_active=True).all()
+        updated = {mode.name: PlayerGameRating.recalculate_mode(mode.id) for mode in modes}
+        db.session.commit()
+        return jsonify({'success': True, 'updated': updated})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error recalculating mode ratings: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/update-player-rating/<int:player_id>', methods=['POST'])
 def update_player_rating(player_id):
     """Update player rating (admin only)"""
@@ -1544,25 +1453,7 @@ def update_player_rating(player_id):
         rating.last_evaluated_by = 'admin'
         rating.last_evaluated_at = datetime.utcnow()
 
-        # Calculate overall rating
-        ratings = [rating.kd_rating, rating.kills_rating, rating.objective_rating, rating.efficiency_rating]
-        tier_values = {'F': 0, 'D': 1, 'C': 2, 'B': 3, 'A': 4, 'S': 5, 'S+': 6}
-        avg_value = sum(tier_values.get(r, 0) for r in ratings) / len(ratings)
-
-        if avg_value >= 5.5:
-            rating.overall_rating = 'S+'
-        elif avg_value >= 4.5:
-            rating.overall_rating = 'S'
-        elif avg_value >= 3.5:
-            rating.overall_rating = 'A'
-        elif avg_value >= 2.5:
-            rating.overall_rating = 'B'
-        elif avg_value >= 1.5:
-            rating.overall_rating = 'C'
-        elif avg_value >= 0.5:
-            rating.overall_rating = 'D'
-        else:
-            rating.overall_rating = 'F'
+        rating.update_overall_rating()
 
         db.session.commit()
         flash('Рейтинги игрока успешно обновлены!', 'success')
@@ -1585,10 +1476,6 @@ def quests():
     if player_nickname:
         current_player = Player.query.filter_by(nickname=player_nickname).first()
 
-    # Initialize default quests if none exist
-    if Quest.query.count() == 0:
-        Quest.create_default_quests()
-
     # Refresh timed quests
     Quest.refresh_timed_quests()
 
@@ -1661,10 +1548,6 @@ def achievements():
     if player_nickname:
         current_player = Player.query.filter_by(nickname=player_nickname).first()
 
-    # Initialize default achievements if none exist
-    if Achievement.query.count() == 0:
-        Achievement.create_default_achievements()
-
     all_achievements = Achievement.query.all()
 
     # Get player achievements if logged in
@@ -1828,8 +1711,9 @@ def init_demo():
         return redirect(url_for('login'))
 
     try:
-        # Force recreate achievements to ensure mythic ones exist
-        Achievement.create_default_achievements()
+        # Restore every default item, including ones deleted since the last seed
+        from seeds import seed_all
+        seed_all(force=True)
 
         # Create demo players if they don't exist
         demo_players = [
@@ -1888,18 +1772,6 @@ def init_demo():
             if not existing:
                 Player.add_player(**player_data)
 
-        # Initialize quests and achievements
-        Quest.create_default_quests()
-        Achievement.create_default_achievements()
-        CustomTitle.create_default_titles()
-        GradientTheme.create_default_themes()
-        ShopItem.create_default_items() # Initialize default shop items
-
-        # Initialize game modes for ASCEND system
-        from models import GameMode
-        if GameMode.query.count() == 0:
-            GameMode.create_default_modes()
-
         # Update quest progress for all players
         players = Player.query.all()
         for player in players:
@@ -2156,10 +2028,6 @@ def shop():
     if player_nickname:
         current_player = Player.query.filter_by(nickname=player_nickname).first()
 
-    # Initialize default shop items if none exist
-    if ShopItem.query.count() == 0:
-        ShopItem.create_default_items()
-
     # Get all active shop items grouped by category
     categories = {
         'title': ShopItem.query.filter_by(category='title', is_active=True).all(),
@@ -2594,10 +2462,6 @@ def admin_gradients():
         flash('Доступ запрещен!', 'error')
         return redirect(url_for('login'))
 
-    # Initialize default themes if none exist
-    if GradientTheme.query.count() == 0:
-        GradientTheme.create_default_themes()
-
     themes = GradientTheme.query.all()
     players = Player.query.all()
 
@@ -2803,8 +2667,6 @@ def public_profile_by_nickname(nickname):
 
     # Get game modes for ASCEND card
     from models import GameMode
-    if GameMode.query.count() == 0:
-        GameMode.create_default_modes()
     game_modes_query = GameMode.query.filter_by(is_active=True).all()
     game_modes = [
         {
@@ -3409,10 +3271,6 @@ def admin_themes():
         flash('Доступ запрещен!', 'error')
         return redirect(url_for('login'))
 
-    # Initialize default themes if none exist
-    if SiteTheme.query.count() == 0:
-        SiteTheme.create_default_themes()
-
     themes = SiteTheme.query.all()
 
     return render_template('admin_themes.html',
@@ -3501,10 +3359,6 @@ def admin_badges():
         flash('Доступ запрещен!', 'error')
         return redirect(url_for('login'))
 
-    # Initialize default badges if none exist
-    if Badge.query.count() == 0:
-        Badge.create_default_badges()
-
     badges = Badge.query.order_by(Badge.name).all()
     players = Player.query.order_by(Player.nickname).all()
 
@@ -3704,10 +3558,6 @@ def admin_roles():
         flash('Доступ запрещен!', 'error')
         return redirect(url_for('login'))
 
-    # Initialize default roles if none exist
-    if AdminCustomRole.query.count() == 0:
-        AdminCustomRole.create_default_roles()
-
     custom_roles = AdminCustomRole.query.filter_by(is_active=True).all()
     players = Player.query.order_by(Player.nickname).all()
     players_with_roles = PlayerAdminRole.query.filter_by(is_active=True).all()
@@ -3763,6 +3613,9 @@ def admin_create_custom_role():
                 emoji_file.save(file_path)
                 emoji_url = f'/static/emojis/{filename}'
 
+                from emoji_sprites import build_sprites
+                build_sprites()
+
         role = AdminCustomRole(
             name=name,
             color=color,
@@ -3911,6 +3764,7 @@ def admin_give_coins():
 
 # Clan system routes
 @app.route('/clans')
+@cached_page(anonymous_only=True)
 def clans():
     """Display clans page"""
     current_player = None
@@ -3921,20 +3775,15 @@ def clans():
     # Get filter parameters
     sort_by = request.args.get('sort', 'rating')
     search = request.args.get('search', '').strip()
+    cursor = request.args.get('cursor')
+    next_cursor = None
 
     if search:
         clans = Clan.search_clans(search)
     else:
-        if sort_by == 'rating':
-            clans = Clan.query.filter_by(is_active=True).order_by(Clan.rating.desc()).all()
-        elif sort_by == 'level':
-            clans = sorted(Clan.query.filter_by(is_active=True).all(), key=lambda c: c.level, reverse=True)
-        elif sort_by == 'members':
-            clans = sorted(Clan.query.filter_by(is_active=True).all(), key=lambda c: c.member_count, reverse=True)
-        elif sort_by == 'created':
-            clans = Clan.query.filter_by(is_active=True).order_by(Clan.created_at.desc()).all()
-        else:
-            clans = Clan.query.filter_by(is_active=True).order_by(Clan.rating.desc()).all()
+        if sort_by not in Clan.LIST_SORTS:
+            sort_by = 'rating'
+        clans, next_cursor = Clan.get_clans_page(sort_by=sort_by, cursor=cursor)
 
     # Get player's clan if logged in
     player_clan = None
@@ -3949,6 +3798,7 @@ def clans():
                          player_clan=player_clan,
                          current_sort=sort_by,
                          search_query=search,
+                         next_cursor=next_cursor,
                          is_admin=session.get('is_admin', False))
 
 @app.route('/clan/<int:clan_id>')
@@ -3984,6 +3834,181 @@ def clan_detail(clan_id):
                          player_role=player_role,
                          is_admin=session.get('is_admin', False))
 
+@app.route('/api/clans/compare/<int:clan1_id>/<int:clan2_id>')
+def api_compare_clans(clan1_id, clan2_id):
+    """API endpoint for clan-vs-clan comparison from stored aggregates"""
+    try:
+        clan1 = Clan.query.get_or_404(clan1_id)
+        clan2 = Clan.query.get_or_404(clan2_id)
+
+        return jsonify({
+            'clan1': clan1.to_stats_dict(),
+            'clan2': clan2.to_stats_dict()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/ratings/leaderboard')
+def api_rating_leaderboard():
+    """API endpoint for the Glicko-2 player rating leaderboard, keyset paginated"""
+    try:
+        from models import PlayerRating
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        ratings, next_cursor = PlayerRating.get_leaderboard_page(request.args.get('cursor'), limit)
+
+        return jsonify({
+            'players': [{
+                'player_id': rating.player_id,
+                'nickname': rating.player.nickname,
+                'rating': round(rating.rating),
+                'rd': round(rating.rd),
+                'matches_rated': rating.matches_rated
+            } for rating in ratings],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/ratings/run_period', methods=['POST'])
+def admin_run_rating_period():
+    """Rate all unrated tournament matches as one Glicko-2 period (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from rating_engine import rate_pending_matches
+        period, players, clans = rate_pending_matches()
+        db.session.commit()
+        return jsonify({'success': True, 'period': period, 'players': players, 'clans': clans})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error running rating period: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/ingest/matches', methods=['POST'])
+def api_ingest_matches():
+    """Apply a batch of match results pushed by a game server.
+
+    Authenticated with a server token (Authorization: Bearer <token> or
+    X-Server-Token). Body: {"matches": [{"match_id", "played_at", "players":
+    [{"nickname", "win", "kills", "deaths", ...}]}]}. Re-sent match ids are ignored.
+    """
+    from ingest import authenticate, ingest_matches
+
+    token = request.headers.get('X-Server-Token') or \
+        request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    valid, server_name = authenticate(token)
+    if not valid:
+        return jsonify({'success': False, 'error': 'Invalid server token'}), 401
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'error': 'JSON body required'}), 400
+
+    try:
+        result = ingest_matches(payload.get('matches'), server_name)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except IntegrityError:
+        # Another request ingested one of these match ids concurrently
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Conflicting batch, retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error ingesting matches: {e}")
+        return jsonify({'success': False, 'error': 'Failed to ingest matches'}), 500
+
+    if result['accepted']:
+        Player.clear_statistics_cache()
+    return jsonify(dict(result, success=True))
+
+@app.route('/admin/rebuild_clan_stats', methods=['POST'])
+def admin_rebuild_clan_stats():
+    """Recompute clan aggregates from member stats (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from clan_stats import rebuild_clan_stats
+        rebuilt = rebuild_clan_stats()
+        db.session.commit()
+        return jsonify({'success': True, 'clans': rebuilt})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error rebuilding clan stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/rebuild_player_totals', methods=['POST'])
+def admin_rebuild_player_totals():
+    """Recompute player lifetime counters from match history facts (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from match_history import rebuild_player_totals
+        seeded, fixed = rebuild_player_totals()
+        Player.clear_statistics_cache()
+        return jsonify({'success': True, 'seeded': seeded, 'fixed': fixed})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error rebuilding player totals: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/stat_snapshots/run', methods=['POST'])
+def admin_run_stat_snapshots():
+    """Run the daily stat snapshot job now (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from stat_snapshots import run_snapshot_job
+        written, removed = run_snapshot_job()
+        return jsonify({'success': True, 'written': written, 'removed': removed})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error taking stat snapshots: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/leaderboard_windows/refresh', methods=['POST'])
+def admin_refresh_leaderboard_windows():
+    """Rebuild the windowed and seasonal leaderboards now (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from leaderboard_windows import refresh_windows
+        return jsonify({'success': True, 'windows': refresh_windows()})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error refreshing leaderboard windows: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/seasons', methods=['POST'])
+def admin_create_season():
+    """Create a season: JSON {name, display_name, starts_at, ends_at} (admin only)"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    try:
+        from models import Season
+        data = request.get_json() or {}
+        season = Season(
+            name=data['name'],
+            display_name=data.get('display_name') or data['name'],
+            starts_at=datetime.fromisoformat(data['starts_at']),
+            ends_at=datetime.fromisoformat(data['ends_at']) if data.get('ends_at') else None
+        )
+        db.session.add(season)
+        db.session.commit()
+        return jsonify({'success': True, 'season_id': season.id})
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid season data: {e}'}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Season already exists'}), 409
+
 @app.route('/create_clan', methods=['GET', 'POST'])
 def create_clan():
     """Create new clan"""
@@ -4051,6 +4076,7 @@ def create_clan():
                 description=description,
                 clan_type=clan_type,
                 max_members=max_members,
+                member_count=1,
                 leader_id=current_player.id
             )
             db.session.add(clan)
@@ -4089,18 +4115,13 @@ def join_clan(clan_id):
     clan = Clan.query.get_or_404(clan_id)
 
     try:
-        # Check if player is already in a clan
-        existing_membership = ClanMember.query.filter_by(player_id=current_player.id, is_active=True).first()
-        if existing_membership:
-            flash('Вы уже состоите в клане!', 'error')
-            return redirect(url_for('clan_detail', clan_id=clan_id))
-
-        # Check if clan can accept new members
-        if not clan.can_join:
+        # Claim a slot; the capacity check is part of the UPDATE itself
+        if not Clan.reserve_slot(clan_id):
+            db.session.rollback()
             flash('Клан не принимает новых участников!', 'error')
             return redirect(url_for('clan_detail', clan_id=clan_id))
 
-        # Join clan
+        # Join clan in the same transaction; the unique index rejects a second active membership
         clan_member = ClanMember(
             clan_id=clan_id,
             player_id=current_player.id,
@@ -4111,7 +4132,11 @@ def join_clan(clan_id):
 
         flash(f'Вы успешно вступили в клан "{clan.name}"!', 'success')
 
+    except IntegrityError:
+        db.session.rollback()
+        flash('Вы уже состоите в клане!', 'error')
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error joining clan: {e}")
         flash('Ошибка при вступлении в клан!', 'error')
 
@@ -4146,6 +4171,7 @@ def leave_clan(clan_id):
 
         # Leave clan
         membership.is_active = False
+        Clan.adjust_member_count(clan_id, -1)
         db.session.commit()
 
         flash(f'Вы покинули клан "{clan.name}"!', 'success')
@@ -4159,6 +4185,7 @@ def leave_clan(clan_id):
 
 # Tournament system routes
 @app.route('/tournaments')
+@cached_page(anonymous_only=True)
 def tournaments():
     """Display tournaments page"""
     current_player = None
@@ -4194,7 +4221,9 @@ def tournament_detail(tournament_id):
         current_player = Player.query.filter_by(nickname=player_nickname).first()
 
     # Get tournament participants
-    participants = TournamentParticipant.query.filter_by(tournament_id=tournament_id, is_active=True).all()
+    participants = TournamentParticipant.query.filter_by(tournament_id=tournament_id, is_active=True)\
+        .order_by(TournamentParticipant.team, TournamentParticipant.id).all()
+    has_teams = any(participant.team for participant in participants)
 
     # Check if current player is participant
     is_participant = False
@@ -4205,9 +4234,16 @@ def tournament_detail(tournament_id):
             is_active=True
         ).first() is not None
 
+    # Bracket grouped by (bracket, round) for display
+    bracket_rounds = {}
+    for match in tournament.matches:
+        bracket_rounds.setdefault((match.bracket, match.round), []).append(match)
+
     return render_template('tournament_detail.html',
                          tournament=tournament,
                          participants=participants,
+                         bracket_rounds=bracket_rounds,
+                         has_teams=has_teams,
                          current_player=current_player,
                          is_participant=is_participant,
                          is_admin=session.get('is_admin', False))
@@ -4333,45 +4369,130 @@ def join_tournament(tournament_id):
     tournament = Tournament.query.get_or_404(tournament_id)
 
     try:
-        # Check if player is already participating
-        existing_participation = TournamentParticipant.query.filter_by(
-            tournament_id=tournament_id,
-            player_id=current_player.id,
-            is_active=True
-        ).first()
-        if existing_participation:
-            flash('Вы уже участвуете в этом турнире!', 'error')
-            return redirect(url_for('tournament_detail', tournament_id=tournament_id))
-
-        # Check if tournament can accept new participants
-        if not tournament.can_join:
+        # Claim a slot; the capacity check is part of the UPDATE itself
+        if not Tournament.reserve_slot(tournament_id):
+            db.session.rollback()
             flash('Турнир не принимает новых участников!', 'error')
             return redirect(url_for('tournament_detail', tournament_id=tournament_id))
 
-        # Check entry fee
-        if tournament.entry_fee > current_player.coins:
+        # Deduct entry fee only if the balance covers it
+        if not Player.spend_coins(current_player.id, tournament.entry_fee):
+            db.session.rollback()
             flash('Недостаточно койнов для участия!', 'error')
             return redirect(url_for('tournament_detail', tournament_id=tournament_id))
 
-        # Join tournament
+        # Join tournament; uq_tournament_participant rejects duplicate registrations
         participant = TournamentParticipant(
             tournament_id=tournament_id,
             player_id=current_player.id
         )
         db.session.add(participant)
-
-        # Deduct entry fee
-        current_player.coins -= tournament.entry_fee
         db.session.commit()
 
         flash(f'Вы успешно зарегистрировались в турнире "{tournament.name}"!', 'success')
 
+    except IntegrityError:
+        db.session.rollback()
+        flash('Вы уже участвуете в этом турнире!', 'error')
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error joining tournament: {e}")
         flash('Ошибка при регистрации в турнире!', 'error')
 
     return redirect(url_for('tournament_detail', tournament_id=tournament_id))
 
+@app.route('/admin/tournament/<int:tournament_id>/start', methods=['POST'])
+def admin_start_tournament(tournament_id):
+    """Seed participants and generate the bracket (admin only)"""
+    if not session.get('is_admin', False):
+        flash('Доступ запрещен!', 'error')
+        return redirect(url_for('tournaments'))
+
+    tournament = Tournament.query.get_or_404(tournament_id)
+    if tournament.status != 'upcoming':
+        flash('Турнир уже начат или завершён!', 'error')
+        return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
+    try:
+        swiss_rounds = request.form.get('swiss_rounds', type=int)
+        if swiss_rounds:
+            tournament.swiss_rounds = swiss_rounds
+        tournament_engine.start_tournament(
+            tournament,
+            request.form.get('format', 'single_elimination'),
+            request.form.get('seed_by', 'experience')
+        )
+        db.session.commit()
+        flash('Сетка турнира сформирована!', 'success')
+    except ValueError:
+        db.session.rollback()
+        flash('Недостаточно участников или неверные параметры турнира!', 'error')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error starting tournament: {e}")
+        flash('Ошибка при запуске турнира!', 'error')
+
+    return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
+@app.route('/admin/tournament/<int:tournament_id>/balance_teams', methods=['POST'])
+def admin_balance_teams(tournament_id):
+    """Split participants into skill-balanced teams (admin only)"""
+    if not session.get('is_admin', False):
+        flash('Доступ запрещен!', 'error')
+        return redirect(url_for('tournaments'))
+
+    tournament = Tournament.query.get_or_404(tournament_id)
+    if tournament.tournament_type == 'singles':
+        flash('Деление на команды доступно только для командных турниров!', 'error')
+        return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
+    try:
+        from team_balancer import assign_teams
+        teams = assign_teams(tournament, request.form.get('team_count', 2, type=int))
+        if teams:
+            db.session.commit()
+            flash(f'Участники распределены по {len(teams)} командам!', 'success')
+        else:
+            flash('Недостаточно участников для такого числа команд!', 'error')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error balancing teams: {e}")
+        flash('Ошибка при распределении команд!', 'error')
+
+    return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
+@app.route('/admin/tournament/<int:tournament_id>/match/<int:match_id>', methods=['POST'])
+def admin_record_match(tournament_id, match_id):
+    """Record a bracket match result (admin only)"""
+    if not session.get('is_admin', False):
+        flash('Доступ запрещен!', 'error')
+        return redirect(url_for('tournaments'))
+
+    tournament = Tournament.query.get_or_404(tournament_id)
+    match = TournamentMatch.query.filter_by(id=match_id, tournament_id=tournament_id).first_or_404()
+    if tournament.status != 'active':
+        flash('Турнир не активен!', 'error')
+        return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
+    try:
+        tournament_engine.record_result(
+            tournament, match,
+            request.form.get('winner_id', type=int),
+            request.form.get('score1', type=int),
+            request.form.get('score2', type=int)
+        )
+        db.session.commit()
+        flash('Результат матча сохранён!', 'success')
+    except ValueError:
+        db.session.rollback()
+        flash('Победитель должен быть одним из участников матча!', 'error')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error recording match result: {e}")
+        flash('Ошибка при сохранении результата!', 'error')
+
+    return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
 @app.route('/admin/complete_tournament/<int:tournament_id>', methods=['POST'])
 def admin_complete_tournament(tournament_id):
     """Complete tournament and distribute prizes (admin only)"""
@@ -4386,28 +4507,23 @@ def admin_complete_tournament(tournament_id):
             flash('Турнир не активен!', 'error')
             return redirect(url_for('tournament_detail', tournament_id=tournament_id))
 
-        # Get winners data from form
-        winners_data = []
-        participants = TournamentParticipant.query.filter_by(tournament_id=tournament_id, is_active=True).all()
-
-        # Simple distribution: 1st place gets 50%, 2nd gets 30%, 3rd gets 20%
-        if participants:
-            total_prize = tournament.prize_pool
-            if len(participants) >= 3:
-                winners_data = [
-                    {'participant_id': participants[0].id, 'placement': 1, 'prize_amount': int(total_prize * 0.5)},
-                    {'participant_id': participants[1].id, 'placement': 2, 'prize_amount': int(total_prize * 0.3)},
-                    {'participant_id': participants[2].id, 'placement': 3, 'prize_amount': int(total_prize * 0.2)}
-                ]
-            elif len(participants) == 2:
-                winners_data = [
-                    {'participant_id': participants[0].id, 'placement': 1, 'prize_amount': int(total_prize * 0.7)},
-                    {'participant_id': participants[1].id, 'placement': 2, 'prize_amount': int(total_prize * 0.3)}
-                ]
-            elif len(participants) == 1:
-                winners_data = [
-                    {'participant_id': participants[0].id, 'placement': 1, 'prize_amount': total_prize}
-                ]
+        # Placements come from the bracket; tied places share their prize shares
+        placements = tournament_engine.final_placements(tournament)
+        if placements is None:
+            flash('Сетка турнира ещё не завершена!', 'error')
+            return redirect(url_for('tournament_detail', tournament_id=tournament_id))
+
+        prizes = tournament_engine.prize_split(tournament.prize_pool, placements)
+        participant_ids = dict(db.session.query(TournamentParticipant.player_id, TournamentParticipant.id)
+                               .filter_by(tournament_id=tournament_id, is_active=True))
+        winners_data = [
+            {'participant_id': participant_ids[player_id], 'placement': place, 'prize_amount': prizes.get(player_id, 0)}
+            for player_id, place in placements.items() if player_id in participant_ids
+        ]
+
+        # The tournament's matches form one rating period
+        from rating_engine import rate_pending_matches
+        rate_pending_matches(tournament_id)
 
         if tournament.complete_tournament(winners_data):
             db.session.commit()
@@ -4418,6 +4534,7 @@ def admin_complete_tournament(tournament_id):
             flash('Ошибка при завершении турнира!', 'error')
 
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error completing tournament: {e}")
         flash('Ошибка при завершении турнира!', 'error')
 
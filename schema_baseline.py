@@ -0,0 +1,687 @@
+"""
+The schema migration 1 creates: a frozen copy of the models' tables, columns,
+constraints and indexes as they stood when the migrations were introduced.
+
+Never edit it. Later schema changes are new migrations in migrations.py, so a
+fresh database gets this schema first and then every change in order, like an
+old one does. The partial unique index on active clan memberships is left to
+migration 8, which first resolves duplicate memberships in old databases.
+"""
+
+from sqlalchemy import (MetaData, Table, Column, ForeignKey, Index, UniqueConstraint, Integer, SmallInteger,
+                        Float, String, Text, Boolean, Date, DateTime)
+
+metadata = MetaData()
+
+Table(
+    'achievement', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('icon', String(50), default='fas fa-medal'),
+    Column('rarity', String(20), default='common'),
+    Column('unlock_condition', Text, nullable=False),
+    Column('reward_xp', Integer, default=0),
+    Column('reward_coins', Integer, default=0),
+    Column('reward_reputation', Integer, default=0),
+    Column('reward_title', String(100)),
+    Column('is_hidden', Boolean, default=False),
+    Column('created_at', DateTime),
+)
+Table(
+    'admin_custom_role', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('color', String(7), default='#ffd700'),
+    Column('emoji', String(10)),
+    Column('emoji_url', String(256)),
+    Column('emoji_class', String(64)),
+    Column('has_gradient', Boolean, default=False),
+    Column('gradient_end_color', String(7)),
+    Column('is_visible', Boolean, default=True),
+    Column('created_at', DateTime),
+    Column('created_by', String(100), default='admin'),
+    Column('is_active', Boolean, default=True),
+    UniqueConstraint('name'),
+)
+Table(
+    'badge', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('description', Text),
+    Column('icon', String(50), default='fas fa-medal'),
+    Column('emoji', String(10)),
+    Column('emoji_url', String(256)),
+    Column('emoji_class', String(64)),
+    Column('color', String(7), default='#ffd700'),
+    Column('background_color', String(7), default='#343a40'),
+    Column('border_color', String(7), default='#ffd700'),
+    Column('has_gradient', Boolean, default=False),
+    Column('gradient_start', String(7)),
+    Column('gradient_end', String(7)),
+    Column('rarity', String(20), nullable=False, default='common'),
+    Column('is_animated', Boolean, default=False),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime),
+    Column('created_by', String(100), default='admin'),
+    UniqueConstraint('name'),
+)
+Table(
+    'cursor_theme', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('description', Text),
+    Column('color1', String(7), default='#ffc107'),
+    Column('color2', String(7), default='#ffaa00'),
+    Column('animation', String(50), default='glow'),
+    Column('size', String(10), default='normal'),
+    Column('shape', String(20), default='circle'),
+    Column('is_premium', Boolean, default=False),
+    Column('price_coins', Integer, default=0),
+    Column('unlock_level', Integer, default=1),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime),
+    UniqueConstraint('name'),
+)
+Table(
+    'custom_title', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('color', String(7), default='#ffd700'),
+    Column('glow_color', String(7), default='#ffd700'),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime),
+    Column('created_by', String(100), default='admin'),
+    UniqueConstraint('name'),
+)
+Table(
+    'data_version', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False, default=0),
+    Column('updated_at', DateTime, nullable=False),
+)
+Table(
+    'game_mode', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('icon', String(20), nullable=False, default='🎮'),
+    Column('color', String(7), nullable=False, default='#3498db'),
+    Column('description', Text),
+    Column('sort_order', Integer, nullable=False, default=0),
+    Column('is_active', Boolean, nullable=False, default=True),
+    Column('created_at', DateTime),
+    UniqueConstraint('name'),
+)
+Table(
+    'gradient_theme', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('element_type', String(50), nullable=False),
+    Column('color1', String(7), nullable=False),
+    Column('color2', String(7), nullable=False),
+    Column('color3', String(7)),
+    Column('gradient_direction', String(20), default='45deg'),
+    Column('animation_enabled', Boolean, default=False),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime),
+    UniqueConstraint('name'),
+)
+Table(
+    'ingested_match', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('match_id', String(100), nullable=False),
+    Column('server_name', String(100)),
+    Column('player_count', Integer, nullable=False, default=0),
+    Column('played_at', DateTime),
+    Column('ingested_at', DateTime, nullable=False),
+    UniqueConstraint('match_id'),
+)
+Table(
+    'quest', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('type', String(50), nullable=False),
+    Column('target_value', Integer, nullable=False),
+    Column('reward_xp', Integer, default=0),
+    Column('reward_coins', Integer, default=0),
+    Column('reward_reputation', Integer, default=0),
+    Column('reward_title', String(100)),
+    Column('reward_role', String(100)),
+    Column('icon', String(50), default='fas fa-trophy'),
+    Column('difficulty', String(20), nullable=False, default='medium'),
+    Column('quest_category', String(20), nullable=False, default='permanent'),
+    Column('is_active', Boolean, default=True),
+    Column('is_repeatable', Boolean, default=True),
+    Column('expires_at', DateTime),
+    Column('created_at', DateTime),
+    Column('last_refresh', DateTime),
+)
+Table(
+    'rating_history', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('entity_type', String(10), nullable=False),
+    Column('entity_id', Integer, nullable=False),
+    Column('period', Integer, nullable=False),
+    Column('rating', Float, nullable=False),
+    Column('rd', Float, nullable=False),
+    Column('volatility', Float, nullable=False),
+    Column('created_at', DateTime),
+    Index('ix_rating_history_entity', 'entity_type', 'entity_id', 'period'),
+    Index('ix_rating_history_period', 'period'),
+)
+Table(
+    'season', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('starts_at', DateTime, nullable=False),
+    Column('ends_at', DateTime),
+    Column('is_active', Boolean, nullable=False, default=True),
+    Column('created_at', DateTime),
+    UniqueConstraint('name'),
+)
+Table(
+    'shop_category', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('description', Text),
+    Column('icon', String(50), default='fas fa-shopping-bag'),
+    Column('sort_order', Integer, default=0),
+    Column('is_active', Boolean, default=True),
+    UniqueConstraint('name'),
+)
+Table(
+    'shop_item', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('display_name', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('category', String(50), nullable=False),
+    Column('price_coins', Integer, nullable=False, default=0),
+    Column('price_reputation', Integer, nullable=False, default=0),
+    Column('unlock_level', Integer, nullable=False, default=1),
+    Column('rarity', String(20), nullable=False, default='common'),
+    Column('icon', String(50), nullable=False, default='fas fa-star'),
+    Column('image_url', String(500)),
+    Column('item_data', Text),
+    Column('is_limited_time', Boolean, nullable=False, default=False),
+    Column('is_active', Boolean, nullable=False, default=True),
+    Column('created_at', DateTime),
+    UniqueConstraint('name'),
+)
+Table(
+    'site_theme', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False),
+    Column('display_name', String(100), nullable=False),
+    Column('description', Text),
+    Column('primary_color', String(7), default='#ffc107'),
+    Column('secondary_color', String(7), default='#6c757d'),
+    Column('background_color', String(7), default='#1a1a1a'),
+    Column('card_background', String(7), default='#2d2d2d'),
+    Column('text_color', String(7), default='#ffffff'),
+    Column('accent_color', String(7), default='#ffaa00'),
+    Column('is_active', Boolean, default=True),
+    Column('is_default', Boolean, default=False),
+    Column('created_at', DateTime),
+    UniqueConstraint('name'),
+)
+Table(
+    'player', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('nickname', String(100), nullable=False),
+    Column('kills', Integer, nullable=False, default=0),
+    Column('final_kills', Integer, nullable=False, default=0),
+    Column('deaths', Integer, nullable=False, default=0),
+    Column('final_deaths', Integer, nullable=False, default=0),
+    Column('beds_broken', Integer, nullable=False, default=0),
+    Column('games_played', Integer, nullable=False, default=0),
+    Column('wins', Integer, nullable=False, default=0),
+    Column('experience', Integer, nullable=False, default=0),
+    Column('role', String(50), nullable=False, default='Игрок'),
+    Column('server_ip', String(100), default=''),
+    Column('created_at', DateTime),
+    Column('last_updated', DateTime),
+    Column('iron_collected', Integer, nullable=False, default=0),
+    Column('gold_collected', Integer, nullable=False, default=0),
+    Column('diamond_collected', Integer, nullable=False, default=0),
+    Column('emerald_collected', Integer, nullable=False, default=0),
+    Column('items_purchased', Integer, nullable=False, default=0),
+    Column('skin_url', String(255)),
+    Column('skin_type', String(10), nullable=False, default='auto'),
+    Column('is_premium', Boolean, nullable=False, default=False),
+    Column('real_name', String(100)),
+    Column('bio', Text),
+    Column('discord_tag', String(50)),
+    Column('youtube_channel', String(100)),
+    Column('twitch_channel', String(100)),
+    Column('favorite_server', String(100)),
+    Column('favorite_map', String(100)),
+    Column('preferred_gamemode', String(50)),
+    Column('profile_banner_color', String(7), default='#3498db'),
+    Column('profile_is_public', Boolean, nullable=False, default=True),
+    Column('custom_status', String(100)),
+    Column('location', String(100)),
+    Column('birthday', Date),
+    Column('custom_avatar_url', String(255)),
+    Column('custom_banner_url', String(255)),
+    Column('banner_is_animated', Boolean, nullable=False, default=False),
+    Column('social_networks', Text),
+    Column('stats_section_color', String(7), default='#343a40'),
+    Column('info_section_color', String(7), default='#343a40'),
+    Column('social_section_color', String(7), default='#343a40'),
+    Column('prefs_section_color', String(7), default='#343a40'),
+    Column('password_hash', String(255)),
+    Column('has_password', Boolean, nullable=False, default=False),
+    Column('selected_theme_id', Integer, ForeignKey('site_theme.id')),
+    Column('leaderboard_name_color', String(7), default='#ffffff'),
+    Column('leaderboard_stats_color', String(7), default='#ffffff'),
+    Column('leaderboard_use_gradient', Boolean, nullable=False, default=False),
+    Column('leaderboard_gradient_start', String(7), default='#ff6b35'),
+    Column('leaderboard_gradient_end', String(7), default='#f7931e'),
+    Column('leaderboard_gradient_animated', Boolean, nullable=False, default=False),
+    Column('inventory_data', Text),
+    Column('coins', Integer, nullable=False, default=0),
+    Column('reputation', Integer, nullable=False, default=0),
+    Column('custom_role', String(100)),
+    Column('custom_role_color', String(7)),
+    Column('custom_role_gradient', Text),
+    Column('custom_role_emoji', String(10)),
+    Column('custom_role_animated', Boolean, nullable=False, default=False),
+    Column('custom_role_purchased', Boolean, nullable=False, default=False),
+    Column('custom_emoji_slots', Integer, nullable=False, default=0),
+    Column('render_version', Integer, nullable=False, default=0),
+    UniqueConstraint('nickname'),
+    Index('ix_player_beds_broken', 'beds_broken', 'id'),
+    Index('ix_player_experience', 'experience', 'id'),
+    Index('ix_player_final_kills', 'final_kills', 'id'),
+    Index('ix_player_kills', 'kills', 'id'),
+    Index('ix_player_wins', 'wins', 'id'),
+)
+Table(
+    'ascend_data', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('pvp_tier', String(3), nullable=False, default='D'),
+    Column('clutching_tier', String(3), nullable=False, default='D'),
+    Column('block_placement_tier', String(3), nullable=False, default='D'),
+    Column('gamesense_tier', String(3), nullable=False, default='D'),
+    Column('overall_tier', String(3), nullable=False, default='D'),
+    Column('pvp_score', Integer, nullable=False, default=25),
+    Column('clutching_score', Integer, nullable=False, default=25),
+    Column('block_placement_score', Integer, nullable=False, default=25),
+    Column('gamesense_score', Integer, nullable=False, default=25),
+    Column('comment', Text),
+    Column('evaluator_id', Integer, ForeignKey('player.id')),
+    Column('evaluator_name', String(100), nullable=False, default='Elite Squad'),
+    Column('previous_tier', String(3)),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+Table(
+    'clan', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('tag', String(10), nullable=False),
+    Column('description', Text),
+    Column('clan_type', String(20), nullable=False, default='open'),
+    Column('max_members', Integer, nullable=False, default=50),
+    Column('experience', Integer, nullable=False, default=0),
+    Column('rating', Integer, nullable=False, default=1000),
+    Column('rating_rd', Float, nullable=False, default=350.0),
+    Column('rating_volatility', Float, nullable=False, default=0.06),
+    Column('rating_period', Integer),
+    Column('member_count', Integer, nullable=False, default=0),
+    Column('total_kills', Integer, nullable=False, default=0),
+    Column('total_final_kills', Integer, nullable=False, default=0),
+    Column('total_deaths', Integer, nullable=False, default=0),
+    Column('total_wins', Integer, nullable=False, default=0),
+    Column('total_games', Integer, nullable=False, default=0),
+    Column('total_beds_broken', Integer, nullable=False, default=0),
+    Column('total_experience', Integer, nullable=False, default=0),
+    Column('avg_kd', Float, nullable=False, default=0.0),
+    Column('leader_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('created_at', DateTime),
+    Column('is_active', Boolean, nullable=False, default=True),
+    UniqueConstraint('name'),
+    UniqueConstraint('tag'),
+    Index('ix_clan_active_avg_kd', 'is_active', 'avg_kd', 'id'),
+    Index('ix_clan_active_created', 'is_active', 'created_at', 'id'),
+    Index('ix_clan_active_experience', 'is_active', 'experience', 'id'),
+    Index('ix_clan_active_members', 'is_active', 'member_count', 'id'),
+    Index('ix_clan_active_rating', 'is_active', 'rating', 'id'),
+    Index('ix_clan_active_total_beds', 'is_active', 'total_beds_broken', 'id'),
+    Index('ix_clan_active_total_experience', 'is_active', 'total_experience', 'id'),
+    Index('ix_clan_active_total_kills', 'is_active', 'total_kills', 'id'),
+    Index('ix_clan_active_total_wins', 'is_active', 'total_wins', 'id'),
+)
+Table(
+    'leaderboard_row', metadata,
+    Column('player_id', Integer, ForeignKey('player.id', ondelete='CASCADE'), primary_key=True),
+    Column('nickname', String(100), nullable=False),
+    Column('server_ip', String(100)),
+    Column('minecraft_skin_url', String(255)),
+    Column('experience', Integer, nullable=False, default=0),
+    Column('level', Integer, nullable=False, default=1),
+    Column('level_progress', Float, nullable=False, default=0),
+    Column('kills', Integer, nullable=False, default=0),
+    Column('final_kills', Integer, nullable=False, default=0),
+    Column('deaths', Integer, nullable=False, default=0),
+    Column('final_deaths', Integer, nullable=False, default=0),
+    Column('beds_broken', Integer, nullable=False, default=0),
+    Column('games_played', Integer, nullable=False, default=0),
+    Column('wins', Integer, nullable=False, default=0),
+    Column('kd_ratio', Float, nullable=False, default=0),
+    Column('win_rate', Float, nullable=False, default=0),
+    Column('star_rating', Integer, nullable=False, default=1),
+    Column('display_role', String(100), nullable=False),
+    Column('role_color', String(7)),
+    Column('role_gradient', Text),
+    Column('nickname_gradient', Text),
+    Column('name_color', String(7)),
+    Column('render_version', Integer, nullable=False, default=0),
+    Column('last_updated', DateTime),
+    Index('ix_leaderboard_row_beds_broken', 'beds_broken', 'player_id'),
+    Index('ix_leaderboard_row_experience', 'experience', 'player_id'),
+    Index('ix_leaderboard_row_final_kills', 'final_kills', 'player_id'),
+    Index('ix_leaderboard_row_kd_ratio', 'kd_ratio', 'player_id'),
+    Index('ix_leaderboard_row_kills', 'kills', 'player_id'),
+    Index('ix_leaderboard_row_level', 'level', 'player_id'),
+    Index('ix_leaderboard_row_nickname', 'nickname'),
+    Index('ix_leaderboard_row_win_rate', 'win_rate', 'player_id'),
+    Index('ix_leaderboard_row_wins', 'wins', 'player_id'),
+)
+Table(
+    'match_participation', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('match_id', String(100)),
+    Column('player_id', Integer, ForeignKey('player.id', ondelete='CASCADE'), nullable=False),
+    Column('game_mode_id', Integer, ForeignKey('game_mode.id')),
+    Column('source', String(10), nullable=False, default='match'),
+    Column('played_at', DateTime, nullable=False),
+    Column('recorded_at', DateTime, nullable=False),
+    Column('kills', Integer, nullable=False, default=0),
+    Column('final_kills', Integer, nullable=False, default=0),
+    Column('deaths', Integer, nullable=False, default=0),
+    Column('final_deaths', Integer, nullable=False, default=0),
+    Column('beds_broken', Integer, nullable=False, default=0),
+    Column('games_played', Integer, nullable=False, default=0),
+    Column('wins', Integer, nullable=False, default=0),
+    Column('iron_collected', Integer, nullable=False, default=0),
+    Column('gold_collected', Integer, nullable=False, default=0),
+    Column('diamond_collected', Integer, nullable=False, default=0),
+    Column('emerald_collected', Integer, nullable=False, default=0),
+    Column('items_purchased', Integer, nullable=False, default=0),
+    Index('ix_match_participation_match', 'match_id'),
+    Index('ix_match_participation_played_at', 'played_at'),
+    Index('ix_match_participation_player', 'player_id', 'played_at'),
+)
+Table(
+    'player_achievement', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('achievement_id', Integer, ForeignKey('achievement.id'), nullable=False),
+    Column('earned_at', DateTime),
+)
+Table(
+    'player_active_booster', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('booster_type', String(50), nullable=False),
+    Column('multiplier', Float, nullable=False, default=1.0),
+    Column('started_at', DateTime, nullable=False),
+    Column('expires_at', DateTime, nullable=False),
+    Column('is_active', Boolean, default=True),
+)
+Table(
+    'player_admin_role', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('role_id', Integer, ForeignKey('admin_custom_role.id'), nullable=False),
+    Column('assigned_at', DateTime),
+    Column('assigned_by', String(100), default='admin'),
+    Column('is_active', Boolean, default=True),
+)
+Table(
+    'player_badge', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('badge_id', Integer, ForeignKey('badge.id'), nullable=False),
+    Column('assigned_at', DateTime),
+    Column('assigned_by', String(100), default='admin'),
+    Column('is_visible', Boolean, default=True),
+)
+Table(
+    'player_booster', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('booster_type', String(20), nullable=False),
+    Column('multiplier', Float, default=1.5),
+    Column('duration_minutes', Integer, nullable=False),
+    Column('activated_at', DateTime),
+    Column('expires_at', DateTime, nullable=False),
+    Column('is_active', Boolean, default=True),
+    Column('given_by_admin', String(100)),
+)
+Table(
+    'player_game_rating', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('game_mode_id', Integer, ForeignKey('game_mode.id'), nullable=False),
+    Column('kd_rating', String(3), nullable=False, default='F'),
+    Column('kills_rating', String(3), nullable=False, default='F'),
+    Column('objective_rating', String(3), nullable=False, default='F'),
+    Column('efficiency_rating', String(3), nullable=False, default='F'),
+    Column('overall_rating', String(3), nullable=False, default='F'),
+    Column('overall_score', Integer, nullable=False, default=0),
+    Column('mode_kills', Integer, nullable=False, default=0),
+    Column('mode_deaths', Integer, nullable=False, default=0),
+    Column('mode_objectives', Integer, nullable=False, default=0),
+    Column('mode_games', Integer, nullable=False, default=0),
+    Column('mode_wins', Integer, nullable=False, default=0),
+    Column('mode_experience', Integer, nullable=False, default=0),
+    Column('mode_kd_ratio', Float, nullable=False, default=0.0),
+    Column('mode_win_rate', Float, nullable=False, default=0.0),
+    Column('admin_notes', Text),
+    Column('last_evaluated_by', String(100)),
+    Column('last_evaluated_at', DateTime),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    UniqueConstraint('player_id', 'game_mode_id', name='uq_player_game_rating'),
+    Index('ix_player_game_rating_leaderboard', 'game_mode_id', 'overall_score', 'id'),
+)
+Table(
+    'player_gradient_setting', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('element_type', String(50), nullable=False),
+    Column('gradient_theme_id', Integer, ForeignKey('gradient_theme.id')),
+    Column('custom_color1', String(7)),
+    Column('custom_color2', String(7)),
+    Column('custom_color3', String(7)),
+    Column('is_enabled', Boolean, default=True),
+    Column('assigned_by', String(100), default='admin'),
+    Column('assigned_at', DateTime),
+)
+Table(
+    'player_purchase', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('item_id', Integer, ForeignKey('shop_item.id'), nullable=False),
+    Column('purchase_price_coins', Integer, nullable=False),
+    Column('purchase_price_reputation', Integer, default=0),
+    Column('purchased_at', DateTime),
+    Column('is_active', Boolean, default=True),
+)
+Table(
+    'player_quest', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('quest_id', Integer, ForeignKey('quest.id'), nullable=False),
+    Column('current_progress', Integer, default=0),
+    Column('baseline_value', Integer, default=0),
+    Column('is_completed', Boolean, default=False),
+    Column('is_accepted', Boolean, default=False),
+    Column('completed_at', DateTime),
+    Column('started_at', DateTime),
+    Column('accepted_at', DateTime),
+)
+Table(
+    'player_rating', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('rating', Float, nullable=False, default=1500.0),
+    Column('rd', Float, nullable=False, default=350.0),
+    Column('volatility', Float, nullable=False, default=0.06),
+    Column('matches_rated', Integer, nullable=False, default=0),
+    Column('last_period', Integer),
+    Column('updated_at', DateTime),
+    UniqueConstraint('player_id'),
+    Index('ix_player_rating_rating', 'rating', 'id'),
+)
+Table(
+    'player_skill_rating', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('pvp_skill', Integer, default=50),
+    Column('strategy_skill', Integer, default=50),
+    Column('teamwork_skill', Integer, default=50),
+    Column('overall_skill', Integer, default=50),
+    Column('admin_notes', Text),
+    Column('last_updated_by', String(100)),
+    Column('last_updated_at', DateTime),
+    Column('created_at', DateTime),
+)
+Table(
+    'player_stat_snapshot', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id', ondelete='CASCADE'), nullable=False),
+    Column('day', Date, nullable=False),
+    Column('resolution', String(5), nullable=False, default='day'),
+    Column('experience', Integer, nullable=False, default=0),
+    Column('kills', Integer, nullable=False, default=0),
+    Column('wins', Integer, nullable=False, default=0),
+    Column('beds_broken', Integer, nullable=False, default=0),
+    Column('coins', Integer, nullable=False, default=0),
+    Column('reputation', Integer, nullable=False, default=0),
+    Column('taken_at', DateTime, nullable=False),
+    UniqueConstraint('player_id', 'day', name='uq_player_stat_snapshot_day'),
+    Index('ix_player_stat_snapshot_resolution', 'resolution', 'day'),
+    Index('ix_player_stat_snapshot_taken_at', 'taken_at'),
+)
+Table(
+    'player_title', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('title_id', Integer, ForeignKey('custom_title.id'), nullable=False),
+    Column('assigned_at', DateTime),
+    Column('assigned_by', String(100), default='admin'),
+    Column('is_active', Boolean, default=True),
+)
+Table(
+    'reputation_log', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('change_amount', Integer, nullable=False),
+    Column('reason', String(200), nullable=False),
+    Column('given_by', String(100)),
+    Column('created_at', DateTime),
+)
+Table(
+    'shop_purchase', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('item_id', Integer, ForeignKey('shop_item.id'), nullable=False),
+    Column('purchase_price_coins', Integer, nullable=False, default=0),
+    Column('purchase_price_reputation', Integer, default=0),
+    Column('purchased_at', DateTime),
+)
+Table(
+    'tournament', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('description', Text),
+    Column('tournament_type', String(50), nullable=False, default='singles'),
+    Column('start_date', DateTime, nullable=False),
+    Column('end_date', DateTime),
+    Column('entry_fee', Integer, nullable=False, default=0),
+    Column('prize_pool', Integer, nullable=False, default=0),
+    Column('max_participants', Integer, nullable=False, default=100),
+    Column('participant_count', Integer, nullable=False, default=0),
+    Column('status', String(20), nullable=False, default='upcoming'),
+    Column('format', String(30), nullable=False, default='single_elimination'),
+    Column('seed_by', String(20), nullable=False, default='experience'),
+    Column('swiss_rounds', SmallInteger),
+    Column('organizer_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('created_at', DateTime),
+    Column('is_active', Boolean, nullable=False, default=True),
+)
+Table(
+    'windowed_stat', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('window_key', String(20), nullable=False),
+    Column('player_id', Integer, ForeignKey('player.id', ondelete='CASCADE'), nullable=False),
+    Column('experience', Integer, nullable=False, default=0),
+    Column('kills', Integer, nullable=False, default=0),
+    Column('final_kills', Integer, nullable=False, default=0),
+    Column('deaths', Integer, nullable=False, default=0),
+    Column('beds_broken', Integer, nullable=False, default=0),
+    Column('games_played', Integer, nullable=False, default=0),
+    Column('wins', Integer, nullable=False, default=0),
+    Column('computed_at', DateTime, nullable=False),
+    UniqueConstraint('window_key', 'player_id', name='uq_windowed_stat_player'),
+    Index('ix_windowed_stat_beds_broken', 'window_key', 'beds_broken', 'player_id'),
+    Index('ix_windowed_stat_experience', 'window_key', 'experience', 'player_id'),
+    Index('ix_windowed_stat_final_kills', 'window_key', 'final_kills', 'player_id'),
+    Index('ix_windowed_stat_kills', 'window_key', 'kills', 'player_id'),
+    Index('ix_windowed_stat_wins', 'window_key', 'wins', 'player_id'),
+)
+Table(
+    'clan_member', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('clan_id', Integer, ForeignKey('clan.id'), nullable=False),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('role', String(20), nullable=False, default='member'),
+    Column('joined_at', DateTime),
+    Column('is_active', Boolean, nullable=False, default=True),
+    Column('contribution', Integer, nullable=False, default=0),
+    Index('ix_clan_member_clan_active', 'clan_id', 'is_active'),
+    Index('ix_clan_member_player_active', 'player_id', 'is_active'),
+)
+Table(
+    'tournament_match', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('tournament_id', Integer, ForeignKey('tournament.id'), nullable=False),
+    Column('bracket', String(1), nullable=False, default='W'),
+    Column('round', SmallInteger, nullable=False),
+    Column('slot', SmallInteger, nullable=False),
+    Column('player1_id', Integer, ForeignKey('player.id')),
+    Column('player2_id', Integer, ForeignKey('player.id')),
+    Column('winner_id', Integer, ForeignKey('player.id')),
+    Column('score1', SmallInteger),
+    Column('score2', SmallInteger),
+    Column('completed_at', DateTime),
+    Column('rating_period', Integer),
+    UniqueConstraint('tournament_id', 'bracket', 'round', 'slot', name='uq_tournament_match_slot'),
+)
+Table(
+    'tournament_participant', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('tournament_id', Integer, ForeignKey('tournament.id'), nullable=False),
+    Column('player_id', Integer, ForeignKey('player.id'), nullable=False),
+    Column('clan_id', Integer, ForeignKey('clan.id')),
+    Column('joined_at', DateTime),
+    Column('placement', Integer),
+    Column('seed', Integer),
+    Column('team', SmallInteger),
+    Column('prize_won', Integer, nullable=False, default=0),
+    Column('is_active', Boolean, nullable=False, default=True),
+    UniqueConstraint('tournament_id', 'player_id', name='uq_tournament_participant'),
+)
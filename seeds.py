@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Default data: site and gradient themes, quests, achievements, titles, cursors,
+shop items, badges, admin roles and game modes.
+
+The rows live in seed_data/<name>.json rather than in models.py. seed_all()
+runs after the migrations at startup and never on the request path. It
+compares the sha256 of every file with the checksum recorded in the
+seed_checksum table; unchanged files are not even parsed. A changed (or never
+seeded) file is loaded, the natural keys already present are read in one
+query, and the missing rows go in with one executemany. Existing rows are
+never updated, so admin edits to default items survive a reseed, and defaults
+an admin deleted only come back when their file changes or on force.
+
+Usage: python seeds.py [--force]
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, Column, String, DateTime, inspect, select, insert, delete
+
+from app import db
+
+SEED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed_data')
+
+# File name -> (model, natural key)
+SEEDS = {
+    'site_themes': ('SiteTheme', 'name'),
+    'quests': ('Quest', 'title'),
+    'achievements': ('Achievement', 'title'),
+    'titles': ('CustomTitle', 'name'),
+    'gradient_themes': ('GradientTheme', 'name'),
+    'cursor_themes': ('CursorTheme', 'name'),
+    'shop_items': ('ShopItem', 'name'),
+    'badges': ('Badge', 'name'),
+    'admin_roles': ('AdminCustomRole', 'name'),
+    'game_modes': ('GameMode', 'name'),
+}
+
+# Kept out of db.metadata, like schema_version
+_metadata = MetaData()
+seed_checksum = Table(
+    'seed_checksum', _metadata,
+    Column('name', String(64), primary_key=True),
+    Column('checksum', String(64), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _path(name):
+    return os.path.join(SEED_DIR, f'{name}.json')
+
+
+def checksum(name):
+    with open(_path(name), 'rb') as source:
+        return hashlib.sha256(source.read()).hexdigest()
+
+
+def load(name):
+    with open(_path(name), encoding='utf-8') as source:
+        return json.load(source)
+
+
+def pending():
+    """Seed files whose content differs from what was last seeded"""
+    recorded = {}
+    if inspect(db.engine).has_table('seed_checksum'):
+        recorded = dict(db.session.execute(select(seed_checksum.c.name, seed_checksum.c.checksum)).all())
+    return [name for name in SEEDS if recorded.get(name) != checksum(name)]
+
+
+def seed(name):
+    """Insert the rows of one seed file whose natural key is missing; returns rows inserted"""
+    import models
+
+    model_name, key = SEEDS[name]
+    model = getattr(models, model_name)
+    column = getattr(model, key)
+    rows = load(name)
+    existing = set(db.session.execute(select(column).where(column.in_([row[key] for row in rows]))).scalars())
+    missing = [row for row in rows if row[key] not in existing]
+    if missing:
+        db.session.execute(insert(model), missing)
+
+    digest = checksum(name)
+    db.session.execute(delete(seed_checksum).where(seed_checksum.c.name == name))
+    db.session.execute(insert(seed_checksum).values(name=name, checksum=digest, applied_at=datetime.utcnow()))
+    return len(missing)
+
+
+def apply_seeds(force=False):
+    """Seed every pending file (every file on force) in the current transaction; returns {name: rows inserted}"""
+    seed_checksum.create(bind=db.session.connection(), checkfirst=True)
+    return {name: seed(name) for name in (list(SEEDS) if force else pending())}
+
+
+def seed_all(force=False):
+    """Reseed what changed under the migration lock and commit; returns {name: rows inserted}"""
+    if not force and not pending():
+        db.session.rollback()
+        return {}
+
+    from migrations import migration_lock
+    with migration_lock():
+        try:
+            inserted = apply_seeds(force)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return inserted
+
+
+if __name__ == '__main__':
+    import sys
+    from app import app
+
+    if sys.argv[1:] not in ([], ['--force']):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    with app.app_context():
+        inserted = seed_all(force=sys.argv[1:] == ['--force'])
+        for name, count in inserted.items():
+            print(f"{name}: {count} rows inserted")
+        if not inserted:
+            print("Seed data is up to date")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Binary whole-instance snapshot and restore.
+
+A snapshot file is the magic header followed by length-prefixed zlib blocks:
+
+    b'BWSNAP' version kind | [uint32 size][zlib block] ... | uint32 0
+
+kind 'S' (SQLite): the blocks are the database file itself, copied with the
+SQLite online backup API so the copy is consistent while the app is running.
+
+kind 'C' (columnar, any other engine): each block holds up to
+SNAPSHOT_CHUNK_SIZE rows of one table in primary-key order, stored column by
+column as typed arrays (int64, float64, uint8 booleans, int64 microsecond
+timestamps, int32 date ordinals) or length-prefixed UTF-8 strings, each with a
+null mask.
+
+Restoring replaces all data. A SQLite snapshot restored into SQLite is copied
+back with the backup API; any other combination is bulk-loaded table by table.
+
+Usage: python snapshot.py create <file> [--columnar] | restore <file>
+"""
+
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import insert, Boolean, Integer, Float, Numeric, DateTime, Date
+
+from app import db
+from backup import backup_tables, table_chunks, sync_id_sequence, _converters
+from leaderboard_rows import refresh_rows
+
+MAGIC = b'BWSNAP'
+VERSION = 1
+KIND_SQLITE = b'S'
+KIND_COLUMNAR = b'C'
+SNAPSHOT_CHUNK_SIZE = 5000
+FILE_BLOCK_SIZE = 1 << 20
+NULL_LENGTH = 0xFFFFFFFF
+
+_EPOCH = datetime(1970, 1, 1)
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _is_sqlite():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def _write_block(out, payload, level=6):
+    data = zlib.compress(payload, level)
+    out.write(struct.pack('<I', len(data)))
+    out.write(data)
+
+
+def _read_blocks(stream):
+    """Yield decompressed blocks until the terminating zero length"""
+    while True:
+        header = stream.read(4)
+        if len(header) < 4:
+            raise ValueError("Truncated snapshot")
+        size, = struct.unpack('<I', header)
+        if size == 0:
+            return
+        yield zlib.decompress(stream.read(size))
+
+
+def _pack_array(typecode, values):
+    packed = array(typecode, values)
+    if not _LITTLE_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _type_code(column):
+    """One-letter storage type for a column"""
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return 'b'
+    if isinstance(column_type, Integer):
+        return 'i'
+    if isinstance(column_type, (Float, Numeric)):
+        return 'f'
+    if isinstance(column_type, DateTime):
+        return 't'
+    if isinstance(column_type, Date):
+        return 'd'
+    return 's'
+
+
+def _encode_column(code, values):
+    """Null mask plus typed payload for one column of a block"""
+    mask = bytes(value is None for value in values)
+    if code == 'i':
+        body = _pack_array('q', (v or 0 for v in values))
+    elif code == 'f':
+        body = _pack_array('d', (v or 0.0 for v in values))
+    elif code == 'b':
+        body = bytes(bool(v) for v in values)
+    elif code == 't':
+        body = _pack_array('q', ((v - _EPOCH) // timedelta(microseconds=1) if v else 0 for v in values))
+    elif code == 'd':
+        body = _pack_array('i', (v.toordinal() if v else 0 for v in values))
+    else:
+        encoded = [None if v is None else str(v).encode('utf-8') for v in values]
+        lengths = _pack_array('I', (NULL_LENGTH if v is None else len(v) for v in encoded))
+        body = lengths + b''.join(v for v in encoded if v)
+    return mask + body
+
+
+def _decode_column(code, count, data, offset):
+    """Decode one column; returns (values, new offset)"""
+    mask = data[offset:offset + count]
+    offset += count
+    if code in ('i', 't'):
+        raw = _unpack_array('q', data[offset:offset + 8 * count])
+        offset += 8 * count
+        if code == 't':
+            values = [_EPOCH + timedelta(microseconds=v) for v in raw]
+        else:
+            values = list(raw)
+    elif code == 'f':
+        values = list(_unpack_array('d', data[offset:offset + 8 * count]))
+        offset += 8 * count
+    elif code == 'b':
+        values = [bool(b) for b in data[offset:offset + count]]
+        offset += count
+    elif code == 'd':
+        values = [date.fromordinal(v) if v else None
+                  for v in _unpack_array('i', data[offset:offset + 4 * count])]
+        offset += 4 * count
+    else:
+        lengths = _unpack_array('I', data[offset:offset + 4 * count])
+        offset += 4 * count
+        values = []
+        for length in lengths:
+            if length == NULL_LENGTH:
+                values.append(None)
+            else:
+                values.append(data[offset:offset + length].decode('utf-8'))
+                offset += length
+    return [None if null else value for value, null in zip(values, mask)], offset
+
+
+def _pack_name(name):
+    encoded = name.encode('utf-8')
+    return struct.pack('<H', len(encoded)) + encoded
+
+
+def _unpack_name(data, offset):
+    length, = struct.unpack_from('<H', data, offset)
+    offset += 2
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+
+def _encode_block(table, rows):
+    """Serialize a chunk of rows of one table column by column"""
+    columns = list(table.columns)
+    parts = [_pack_name(table.name), struct.pack('<IH', len(rows), len(columns))]
+    for column in columns:
+        code = _type_code(column)
+        parts.append(_pack_name(column.name) + code.encode('ascii'))
+        parts.append(_encode_column(code, [row[column.name] for row in rows]))
+    return b''.join(parts)
+
+
+def _decode_block(data):
+    """Inverse of _encode_block; returns (table name, list of row dicts)"""
+    name, offset = _unpack_name(data, 0)
+    count, column_count = struct.unpack_from('<IH', data, offset)
+    offset += 6
+    columns = {}
+    for _ in range(column_count):
+        column_name, offset = _unpack_name(data, offset)
+        code = chr(data[offset])
+        columns[column_name], offset = _decode_column(code, count, data, offset + 1)
+    names = list(columns)
+    return name, [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+# Snapshot
+
+def create_snapshot(out, columnar=None):
+    """Write a snapshot of the whole database to a binary file object.
+
+    Uses the SQLite backup API on SQLite unless columnar=True.
+    """
+    columnar = not _is_sqlite() if columnar is None else columnar
+    if columnar:
+        out.write(MAGIC + bytes([VERSION]) + KIND_COLUMNAR)
+        connection = db.session.connection()
+        for table in backup_tables():
+            for rows in table_chunks(connection, table, chunk_size=SNAPSHOT_CHUNK_SIZE):
+                _write_block(out, _encode_block(table, rows))
+    else:
+        out.write(MAGIC + bytes([VERSION]) + KIND_SQLITE)
+        with tempfile.TemporaryDirectory() as workdir:
+            copy_path = os.path.join(workdir, 'snapshot.db')
+            _sqlite_backup(copy_path)
+            with open(copy_path, 'rb') as copy:
+                for chunk in iter(lambda: copy.read(FILE_BLOCK_SIZE), b''):
+                    _write_block(out, chunk, level=1)
+    out.write(struct.pack('<I', 0))
+
+
+def _sqlite_backup(path):
+    """Consistent copy of the live SQLite database through the online backup API"""
+    raw = db.engine.raw_connection()
+    try:
+        target = sqlite3.connect(path)
+        with target:
+            raw.driver_connection.backup(target)
+        target.close()
+    finally:
+        raw.close()
+
+
+# Restore
+
+def restore_snapshot(stream):
+    """Replace the database contents with a snapshot; returns rows restored per table"""
+    header = stream.read(len(MAGIC) + 2)
+    if header[:len(MAGIC)] != MAGIC or header[len(MAGIC)] != VERSION:
+        raise ValueError("Not a snapshot file")
+    kind = header[-1:]
+
+    if kind == KIND_SQLITE:
+        with tempfile.TemporaryDirectory() as workdir:
+            copy_path = os.path.join(workdir, 'snapshot.db')
+            with open(copy_path, 'wb') as copy:
+                for block in _read_blocks(stream):
+                    copy.write(block)
+            if _is_sqlite():
+                return _sqlite_restore(copy_path)
+            return _load_tables(_sqlite_file_blocks(copy_path))
+    if kind == KIND_COLUMNAR:
+        return _load_tables(_decode_block(block) for block in _read_blocks(stream))
+    raise ValueError("Unknown snapshot kind")
+
+
+def _sqlite_restore(path):
+    """Copy a SQLite snapshot file over the live database with the backup API"""
+    db.session.remove()
+    raw = db.engine.raw_connection()
+    try:
+        source = sqlite3.connect(path)
+        source.backup(raw.driver_connection)
+        counts = {name: source.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+                  for name, in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        source.close()
+    finally:
+        raw.close()
+    db.engine.dispose()
+
+    # The copy bypassed the session, so invalidate caches explicitly
+    from data_version import bump
+    bump()
+    db.session.commit()
+    return counts
+
+
+def _sqlite_file_blocks(path):
+    """Read a SQLite snapshot table by table for loading into another engine"""
+    source = sqlite3.connect(path)
+    source.row_factory = sqlite3.Row
+    try:
+        present = {name for name, in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in backup_tables():
+            if table.name not in present:
+                continue
+            converters = _converters(table)
+            cursor = source.execute(f'SELECT * FROM "{table.name}" ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(SNAPSHOT_CHUNK_SIZE)
+                if not rows:
+                    break
+                decoded = []
+                for row in rows:
+                    row = dict(row)
+                    for name, convert in converters.items():
+                        if isinstance(row.get(name), str):
+                            row[name] = convert(row[name])
+                    decoded.append(row)
+                yield table.name, decoded
+    finally:
+        source.close()
+
+
+def _load_tables(blocks):
+    """Wipe every table, then bulk-insert blocks of (table name, rows) in primary-key order"""
+    tables = {table.name: table for table in backup_tables()}
+    for table in reversed(list(tables.values())):
+        db.session.execute(table.delete())
+
+    counts = {}
+    loaded = []
+    for name, rows in blocks:
+        table = tables.get(name)
+        if table is None or not rows:
+            continue
+        columns = {column.name for column in table.columns}
+        if not columns.issuperset(rows[0]):  # snapshot from a newer schema
+            rows = [{key: value for key, value in row.items() if key in columns} for row in rows]
+        db.session.execute(insert(table), rows)
+        counts[name] = counts.get(name, 0) + len(rows)
+        if name not in loaded:
+            loaded.append(name)
+
+    for name in loaded:
+        sync_id_sequence(db.session, name)
+    refresh_rows()
+    db.session.commit()
+    return counts
+
+
+if __name__ == '__main__':
+    from app import app
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ('create', 'restore'):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    with app.app_context():
+        if sys.argv[1] == 'create':
+            with open(sys.argv[2], 'wb') as snapshot_file:
+                create_snapshot(snapshot_file, columnar=True if '--columnar' in sys.argv else None)
+            print(f"Snapshot written to {sys.argv[2]}")
+        else:
+            with open(sys.argv[2], 'rb') as snapshot_file:
+                restored = restore_snapshot(snapshot_file)
+            print(f"Restored {sum(restored.values())} rows in {len(restored)} tables")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Daily player stat snapshots for progress charts.
+
+run_snapshot_job() is meant to run once a day (cron / Railway schedule):
+
+* take_daily_snapshot() copies the charted totals of every player whose
+  last_updated moved since the previous snapshot into one row per player and
+  day, with one INSERT ... SELECT (plus an UPDATE for a second run on the same
+  day), so the cost follows activity rather than the number of players;
+* downsample() thins old points: daily rows older than DAILY_DAYS collapse
+  to the last row of their week, weekly rows older than WEEKLY_DAYS to the last
+  row of their month. Totals are cumulative, so the last row of a period is
+  the period's value.
+
+player_history() reads a series from the (player_id, day) index in one query.
+
+Usage: python stat_snapshots.py
+"""
+
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import select, insert, exists, func, literal, true, Date, DateTime, String
+
+from app import db
+from models import Player, PlayerStatSnapshot
+
+SNAPSHOT_FIELDS = ('experience', 'kills', 'wins', 'beds_broken', 'coins', 'reputation')
+
+# ?range= values of /api/player/<id>/history -> days back (None = everything)
+HISTORY_RANGES = {'7d': 7, '30d': 30, '90d': 90, '1y': 365, 'all': None}
+
+DAILY_DAYS = 35
+WEEKLY_DAYS = 400
+DOWNSAMPLE_CHUNK_SIZE = 1000
+
+_player = Player.__table__
+_snapshot = PlayerStatSnapshot.__table__
+
+
+def take_daily_snapshot(day=None):
+    """Record today's totals for players changed since the last snapshot; returns rows written"""
+    now = datetime.utcnow()
+    day = day or now.date()
+    since = db.session.query(func.max(PlayerStatSnapshot.taken_at)).scalar()
+    changed = _player.c.last_updated >= since if since else true()
+
+    updated = db.session.execute(
+        _snapshot.update()
+        .where(_snapshot.c.player_id == _player.c.id, _snapshot.c.day == day, changed)
+        .values(taken_at=now, **{field: _player.c[field] for field in SNAPSHOT_FIELDS})
+    ).rowcount
+
+    has_row = exists().where(_snapshot.c.player_id == _player.c.id, _snapshot.c.day == day)
+    inserted = db.session.execute(
+        insert(_snapshot).from_select(
+            ['player_id', 'day', 'resolution', 'taken_at', *SNAPSHOT_FIELDS],
+            select(_player.c.id, literal(day, Date), literal('day', String), literal(now, DateTime),
+                   *[_player.c[field] for field in SNAPSHOT_FIELDS])
+            .where(changed, ~has_row)
+        )
+    ).rowcount
+    return updated + inserted
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _collapse(resolution, coarser, bucket, cutoff):
+    """Keep only the last row per player and bucket among rows of a resolution older than cutoff"""
+    rows = db.session.execute(
+        select(_snapshot.c.id, _snapshot.c.player_id, _snapshot.c.day)
+        .where(_snapshot.c.resolution == resolution, _snapshot.c.day < cutoff)
+        .order_by(_snapshot.c.player_id, _snapshot.c.day)
+    )
+    keep, drop = [], []
+    last_key = last_id = None
+    for row_id, player_id, day in rows:
+        key = (player_id, bucket(day))
+        if last_id is not None:
+            (drop if key == last_key else keep).append(last_id)
+        last_key, last_id = key, row_id
+    if last_id is not None:
+        keep.append(last_id)
+
+    for start in range(0, len(drop), DOWNSAMPLE_CHUNK_SIZE):
+        db.session.execute(_snapshot.delete().where(
+            _snapshot.c.id.in_(drop[start:start + DOWNSAMPLE_CHUNK_SIZE])))
+    for start in range(0, len(keep), DOWNSAMPLE_CHUNK_SIZE):
+        db.session.execute(_snapshot.update().where(
+            _snapshot.c.id.in_(keep[start:start + DOWNSAMPLE_CHUNK_SIZE])).values(resolution=coarser))
+    return len(drop)
+
+
+def downsample(today=None):
+    """Thin daily points to weekly and weekly to monthly; returns rows removed.
+
+    Cutoffs are aligned to period starts so a period is always collapsed whole.
+    """
+    today = today or date.today()
+    removed = _collapse('day', 'week', _week_start, _week_start(today - timedelta(days=DAILY_DAYS)))
+    removed += _collapse('week', 'month', _month_start, _month_start(today - timedelta(days=WEEKLY_DAYS)))
+    return removed
+
+
+def run_snapshot_job(day=None):
+    """Daily job: snapshot changed players, then downsample; commits"""
+    written = take_daily_snapshot(day)
+    removed = downsample(day)
+    db.session.commit()
+    return written, removed
+
+
+def player_history(player_id, metric='experience', range_key='30d', today=None):
+    """Time series of one metric as [{'date', 'value', 'resolution'}], oldest first.
+
+    Joined to the player, so rows left by a deleted player (whose id SQLite may
+    hand out again) never show up in a new player's chart.
+    """
+    column = _snapshot.c[metric]
+    query = (select(_snapshot.c.day, column, _snapshot.c.resolution)
+             .join(_player, _player.c.id == _snapshot.c.player_id)
+             .where(_snapshot.c.player_id == player_id)
+             .order_by(_snapshot.c.day))
+    days = HISTORY_RANGES[range_key]
+    if days is not None:
+        query = query.where(_snapshot.c.day >= (today or date.today()) - timedelta(days=days))
+    return [{'date': day.isoformat(), 'value': value, 'resolution': resolution}
+            for day, value, resolution in db.session.execute(query)]
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        written, removed = run_snapshot_job()
+        print(f"Snapshot rows written: {written}, old points removed: {removed}")
@@ -0,0 +1,139 @@
+"""
+Team balancing for team and clan tournaments.
+
+Participants' stats are loaded into a NumPy matrix in one query, reduced to a
+composite skill score (z-scored stats times weights), then split into K teams of
+equal size (±1) whose total skill is as even as possible: a greedy pass assigns
+players strongest-first to the weakest open team, and a local search keeps
+applying the single player swap that most reduces the variance of team totals.
+"""
+
+import numpy as np
+
+from app import db
+from models import Player, TournamentParticipant, LEVEL_THRESHOLDS
+
+STAT_COLUMNS = ('kills', 'final_kills', 'kd_ratio', 'win_rate', 'level')
+
+# Relative weight of each (standardized) stat in the composite skill score
+SKILL_WEIGHTS = np.array([0.15, 0.25, 0.25, 0.2, 0.15])
+
+_LEVEL_THRESHOLDS = np.array(LEVEL_THRESHOLDS)
+
+
+def player_levels(experience):
+    """Vectorized Player.level for an array of experience values"""
+    experience = np.asarray(experience, dtype=np.int64)
+    levels = np.maximum(1, np.searchsorted(_LEVEL_THRESHOLDS, experience, side='right'))
+    prestige = np.minimum(1000, 100 + (experience - _LEVEL_THRESHOLDS[-1]) // 2500)
+    return np.where(experience >= _LEVEL_THRESHOLDS[-1], prestige, levels)
+
+
+def stat_matrix(kills, final_kills, deaths, wins, games_played, experience):
+    """Build the (n, 5) STAT_COLUMNS matrix from raw player columns"""
+    kills = np.asarray(kills, dtype=float)
+    deaths = np.asarray(deaths, dtype=float)
+    games = np.asarray(games_played, dtype=float)
+    kd_ratio = np.divide(kills, deaths, out=kills.copy(), where=deaths > 0)
+    win_rate = np.divide(np.asarray(wins, dtype=float) * 100, games, out=np.zeros_like(games), where=games > 0)
+    return np.column_stack([kills, np.asarray(final_kills, dtype=float), kd_ratio, win_rate,
+                            player_levels(experience)])
+
+
+def composite_scores(stats, weights=SKILL_WEIGHTS):
+    """Standardize each stat column and combine them into one skill score per player"""
+    std = stats.std(axis=0)
+    std[std == 0] = 1
+    return ((stats - stats.mean(axis=0)) / std) @ weights
+
+
+def balance_teams(scores, team_count, max_swaps=500):
+    """Split players into team_count teams minimizing the variance of team skill totals.
+
+    Returns an array with each player's team index (0-based). Team sizes differ
+    by at most one and are never changed by the refinement step.
+    """
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    team_count = max(1, min(team_count, n))
+    assignment = np.empty(n, dtype=np.intp)
+
+    capacity = np.full(team_count, n // team_count)
+    capacity[:n % team_count] += 1
+    totals = np.zeros(team_count)
+    for player in np.argsort(-scores, kind='stable'):
+        open_totals = np.where(capacity > 0, totals, np.inf)
+        team = int(np.argmin(open_totals))
+        assignment[player] = team
+        totals[team] += scores[player]
+        capacity[team] -= 1
+
+    # Local search: swapping a (team i) with b (team j) moves d = s_a - s_b from
+    # i to j and lowers the sum of squared totals by 2(d(T_i - T_j) - d^2).
+    # Try the heaviest team against the lightest first, then the lightest team
+    # against the heaviest, and stop when neither has an improving swap.
+    for _ in range(max_swaps):
+        order = np.argsort(totals)
+        candidates = [(order[-1], other) for other in order[:-1]] + \
+                     [(other, order[0]) for other in order[:0:-1]]
+        for heavy, light in candidates:
+            if _swap_best(scores, assignment, totals, heavy, light):
+                break
+        else:
+            break
+
+    return assignment
+
+
+def _swap_best(scores, assignment, totals, heavy, light):
+    """Apply the best variance-reducing swap between two teams; returns False if none helps"""
+    heavy_members = np.flatnonzero(assignment == heavy)
+    light_members = np.flatnonzero(assignment == light)
+    delta = scores[heavy_members][:, None] - scores[light_members][None, :]
+    gain = delta * (totals[heavy] - totals[light]) - delta * delta
+    best = int(np.argmax(gain))
+    if gain.flat[best] <= 1e-9:
+        return False
+
+    a, b = divmod(best, len(light_members))
+    moved = delta[a, b]
+    totals[heavy] -= moved
+    totals[light] += moved
+    assignment[heavy_members[a]], assignment[light_members[b]] = light, heavy
+    return True
+
+
+def team_totals(scores, assignment, team_count):
+    """Total skill score of every team"""
+    return np.bincount(assignment, weights=scores, minlength=team_count)
+
+
+def assign_teams(tournament, team_count):
+    """Balance a tournament's active participants into teams and store TournamentParticipant.team.
+
+    Returns a list of per-team dicts (team number, size, skill total), or an
+    empty list if there are fewer participants than teams.
+    """
+    rows = (db.session.query(TournamentParticipant.id, Player.kills, Player.final_kills, Player.deaths,
+                             Player.wins, Player.games_played, Player.experience)
+            .join(Player, Player.id == TournamentParticipant.player_id)
+            .filter(TournamentParticipant.tournament_id == tournament.id,
+                    TournamentParticipant.is_active == True)
+            .order_by(TournamentParticipant.id)
+            .all())
+    if team_count < 2 or len(rows) < team_count:
+        return []
+
+    participant_ids, *columns = zip(*rows)
+    scores = composite_scores(stat_matrix(*columns))
+    assignment = balance_teams(scores, team_count)
+
+    db.session.execute(db.update(TournamentParticipant), [
+        {'id': participant_id, 'team': int(team) + 1}
+        for participant_id, team in zip(participant_ids, assignment)
+    ])
+
+    sizes = np.bincount(assignment, minlength=team_count)
+    totals = team_totals(scores, assignment, team_count)
+    return [{'team': team + 1, 'size': int(sizes[team]), 'skill': round(float(totals[team]), 2)}
+            for team in range(team_count)]
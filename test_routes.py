@@ -13,7 +13,6 @@ from models import Player
 def client():
     """Create a test client"""
     app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     
     with app.test_client() as client:
         with app.app_context():
@@ -130,6 +129,872 @@ def test_api_stats(client):
     assert 'stats' in data
     assert 'charts' in data
 
+def _make_clan(leader, name, tag, **kwargs):
+    """Create a clan led by the given player"""
+    from models import Clan, ClanMember
+    clan = Clan(name=name, tag=tag, leader_id=leader.id, member_count=1, **kwargs)
+    db.session.add(clan)
+    db.session.flush()
+    db.session.add(ClanMember(clan_id=clan.id, player_id=leader.id, role='leader'))
+    db.session.commit()
+    return clan
+
+def test_clans_keyset_pagination(client):
+    """Test clan listing pages through every clan exactly once"""
+    from models import Clan
+    for i in range(35):
+        leader = Player(nickname=f"ClanLeader{i}")
+        db.session.add(leader)
+        db.session.commit()
+        _make_clan(leader, f"Clan{i}", f"C{i}", experience=i * 10000)
+
+    first, cursor = Clan.get_clans_page(sort_by='level', limit=30)
+    assert len(first) == 30
+    assert first[0].level >= first[-1].level
+    second, last_cursor = Clan.get_clans_page(sort_by='level', cursor=cursor, limit=30)
+    assert len(second) == 5
+    assert last_cursor is None
+    assert {c.id for c in first}.isdisjoint({c.id for c in second})
+
+    response = client.get('/clans?sort=members')
+    assert response.status_code == 200
+    assert b'cursor=' in response.data
+
+    debtor = Player(nickname="ClanDebtor")
+    db.session.add(debtor)
+    db.session.commit()
+    _make_clan(debtor, "Debtors", "DEBT", experience=-25000)
+    assert Clan.query.filter(Clan.level == 1).count() == 2  # same clamp as the Python side
+
+def test_join_and_leave_clan_maintain_member_count(client):
+    """Test join/leave keep the stored clan member counter in sync"""
+    from models import Clan
+    leader = Player(nickname="Leader")
+    joiner = Player(nickname="Joiner")
+    db.session.add_all([leader, joiner])
+    db.session.commit()
+    clan = _make_clan(leader, "Counters", "CNT")
+
+    with client.session_transaction() as sess:
+        sess['player_nickname'] = "Joiner"
+
+    client.post(f'/join_clan/{clan.id}')
+    db.session.expire_all()
+    assert db.session.get(Clan, clan.id).member_count == 2
+
+    client.post(f'/leave_clan/{clan.id}')
+    db.session.expire_all()
+    assert db.session.get(Clan, clan.id).member_count == 1
+
+def test_clan_aggregates_follow_member_stats(client):
+    """Test clan totals are updated incrementally on join, stat change and leave"""
+    from models import Clan
+    leader = Player(nickname="AggLeader", kills=10, deaths=5, wins=2)
+    member = Player(nickname="AggMember", kills=30, deaths=5, wins=4)
+    db.session.add_all([leader, member])
+    db.session.commit()
+    clan = _make_clan(leader, "Aggregates", "AGG")
+    assert (clan.total_kills, clan.total_wins) == (10, 2)
+
+    with client.session_transaction() as sess:
+        sess['player_nickname'] = "AggMember"
+        sess['is_admin'] = True
+    client.post(f'/join_clan/{clan.id}')
+    client.post(f'/modify/{member.id}', data={'operation': 'add', 'kills': 5, 'wins': 1})
+
+    db.session.expire_all()
+    clan = db.session.get(Clan, clan.id)
+    assert clan.total_kills == 45
+    assert clan.total_wins == 7
+    assert clan.avg_kd == 4.5
+    assert clan.experience > 0  # member's XP gain credited to the clan
+
+    response = client.get(f'/api/clans/compare/{clan.id}/{clan.id}')
+    assert response.get_json()['clan1']['total_kills'] == 45
+
+    client.post(f'/leave_clan/{clan.id}')
+    db.session.expire_all()
+    assert db.session.get(Clan, clan.id).total_kills == 10
+
+def test_clans_sort_by_aggregate(client):
+    """Test /clans accepts aggregate sort keys"""
+    response = client.get('/clans?sort=avg_kd')
+    assert response.status_code == 200
+
+def test_join_clan_never_exceeds_capacity(client):
+    """Test clan joins stop at max_members and a player holds one active membership"""
+    from models import Clan, ClanMember
+    players = [Player(nickname=f"Cap{i}") for i in range(4)]
+    db.session.add_all(players)
+    db.session.commit()
+    clan = _make_clan(players[0], "Capacity", "CAP", max_members=2)
+    other = _make_clan(players[3], "Other", "OTH")
+
+    for player in players[1:3]:
+        with client.session_transaction() as sess:
+            sess['player_nickname'] = player.nickname
+        client.post(f'/join_clan/{clan.id}')
+
+    with client.session_transaction() as sess:
+        sess['player_nickname'] = "Cap3"
+    client.post(f'/join_clan/{clan.id}')  # already leads another clan
+
+    db.session.expire_all()
+    assert db.session.get(Clan, clan.id).member_count == 2
+    assert ClanMember.query.filter_by(clan_id=clan.id, is_active=True).count() == 2
+    assert db.session.get(Clan, other.id).member_count == 1
+
+def test_join_tournament_slot_reservation(client):
+    """Test tournament joins respect capacity, reject duplicates and charge once"""
+    from datetime import datetime, timedelta
+    from models import Tournament, TournamentParticipant
+    players = [Player(nickname=f"Entrant{i}", coins=100) for i in range(3)]
+    db.session.add_all(players)
+    db.session.commit()
+    tournament = Tournament(name="Cup", start_date=datetime.utcnow() + timedelta(days=1),
+                            max_participants=2, entry_fee=10, organizer_id=players[0].id)
+    db.session.add(tournament)
+    db.session.commit()
+
+    for player in players + players[:1]:
+        with client.session_transaction() as sess:
+            sess['player_nickname'] = player.nickname
+        client.post(f'/join_tournament/{tournament.id}')
+
+    db.session.expire_all()
+    assert db.session.get(Tournament, tournament.id).participant_count == 2
+    assert TournamentParticipant.query.filter_by(tournament_id=tournament.id).count() == 2
+    assert db.session.get(Player, players[0].id).coins == 90
+    assert db.session.get(Player, players[2].id).coins == 100
+
+def test_single_elimination_bracket_and_prizes(client):
+    """Test a 5-player bracket seeds by experience, resolves byes and splits prizes"""
+    from datetime import datetime, timedelta
+    from models import Tournament, TournamentParticipant, TournamentMatch
+    players = [Player(nickname=f"Seed{i}", experience=1000 - i * 100) for i in range(5)]
+    db.session.add_all(players)
+    db.session.commit()
+    tournament = Tournament(name="Bracket Cup", start_date=datetime.utcnow() + timedelta(days=1),
+                            prize_pool=1000, organizer_id=players[0].id)
+    db.session.add(tournament)
+    db.session.commit()
+    db.session.add_all([TournamentParticipant(tournament_id=tournament.id, player_id=p.id) for p in players])
+    db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    client.post(f'/admin/tournament/{tournament.id}/start', data={'format': 'single_elimination'})
+
+    # Higher seed always wins: play every playable match until the final is decided
+    seed = {p.id: i for i, p in enumerate(players)}
+    while True:
+        db.session.expire_all()
+        playable = [m for m in TournamentMatch.query.filter_by(tournament_id=tournament.id) if m.is_playable]
+        if not playable:
+            break
+        match = playable[0]
+        winner = min(match.player1_id, match.player2_id, key=seed.get)
+        client.post(f'/admin/tournament/{tournament.id}/match/{match.id}', data={'winner_id': winner})
+
+    client.post(f'/admin/complete_tournament/{tournament.id}')
+    db.session.expire_all()
+    results = {p.player_id: (p.placement, p.prize_won)
+               for p in TournamentParticipant.query.filter_by(tournament_id=tournament.id)}
+    assert db.session.get(Tournament, tournament.id).status == 'completed'
+    assert results[players[0].id] == (1, 500)
+    assert results[players[1].id] == (2, 300)
+    assert results[players[2].id] == (3, 100)
+    assert results[players[3].id] == (3, 100)
+    assert results[players[4].id][0] == 5
+    assert db.session.get(Player, players[0].id).coins == 500
+
+    # Completing the tournament rates its matches as one Glicko-2 period
+    from models import PlayerRating
+    ratings = {r.player_id: r for r in PlayerRating.query}
+    assert ratings[players[0].id].rating > 1500 > ratings[players[4].id].rating
+    assert ratings[players[0].id].matches_rated == 2  # bye in round 1
+    leaderboard = client.get('/api/ratings/leaderboard').get_json()
+    assert leaderboard['players'][0]['player_id'] == players[0].id
+
+def test_double_elimination_grand_final_reset():
+    """Test the reset match is only played when the losers-bracket champion wins the final"""
+    from tournament_engine import elimination_skeleton, resolve_bracket, elimination_placements, VOID
+    specs = elimination_skeleton(4, double=True)
+    results = {('W', 1, 0): 1, ('W', 1, 1): 2, ('W', 2, 0): 1, ('L', 1, 0): 3, ('L', 2, 0): 2}
+
+    state = resolve_bracket(specs, [1, 2, 3, 4], {**results, ('F', 1, 0): 1})
+    assert state[('F', 2, 0)] == (VOID, VOID, 1, 2)
+    assert elimination_placements(specs, state, double=True) == {1: 1, 2: 2, 3: 3, 4: 4}
+
+    results[('F', 1, 0)] = 2
+    state = resolve_bracket(specs, [1, 2, 3, 4], results)
+    assert state[('F', 2, 0)] == (1, 2, None, None)
+    assert elimination_placements(specs, state, double=True) is None
+    state = resolve_bracket(specs, [1, 2, 3, 4], {**results, ('F', 2, 0): 2})
+    assert elimination_placements(specs, state, double=True) == {2: 1, 1: 2, 3: 3, 4: 4}
+
+def test_balance_teams_for_team_tournament(client):
+    """Test the team balancer splits participants into equal, evenly skilled teams"""
+    from datetime import datetime, timedelta
+    import numpy as np
+    from models import Tournament, TournamentParticipant
+    from team_balancer import balance_teams, team_totals
+    players = [Player(nickname=f"Teammate{i}", kills=i * 100, final_kills=i * 20, deaths=100,
+                      wins=i * 5, games_played=100, experience=i * 50000) for i in range(8)]
+    db.session.add_all(players)
+    db.session.commit()
+    tournament = Tournament(name="Team Cup", tournament_type='teams', organizer_id=players[0].id,
+                            start_date=datetime.utcnow() + timedelta(days=1))
+    db.session.add(tournament)
+    db.session.commit()
+    db.session.add_all([TournamentParticipant(tournament_id=tournament.id, player_id=p.id) for p in players])
+    db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    client.post(f'/admin/tournament/{tournament.id}/balance_teams', data={'team_count': 2})
+
+    db.session.expire_all()
+    teams = [p.team for p in TournamentParticipant.query.filter_by(tournament_id=tournament.id)]
+    assert sorted(teams) == [1, 1, 1, 1, 2, 2, 2, 2]
+
+    scores = np.arange(8, dtype=float)
+    assignment = balance_teams(scores, 2)
+    assert np.bincount(assignment).tolist() == [4, 4]
+    assert team_totals(scores, assignment, 2).tolist() == [14.0, 14.0]
+
+def test_glicko2_matches_reference_example():
+    """Test the vectorized Glicko-2 update against the example in Glickman's paper"""
+    from rating_engine import glicko2_period
+    rating, rd, volatility = glicko2_period([1500, 1400, 1550, 1700], [200, 30, 100, 300], [0.06] * 4,
+                                            [0, 0, 0], [1, 2, 3], [1, 0, 0])
+    assert round(rating[0], 2) == 1464.05
+    assert round(rd[0], 2) == 151.52
+    assert abs(volatility[0] - 0.05999) < 1e-5
+
+def _count_statements(fn):
+    """Run fn and return the number of SQL statements it sent"""
+    from sqlalchemy import event
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return len(statements)
+
+def test_rating_leaderboard_loads_players_in_one_query(client):
+    """Test the rating leaderboard does not load each row's player separately"""
+    from models import PlayerRating
+    players = [Player(nickname=f"Rated{i}") for i in range(5)]
+    db.session.add_all(players)
+    db.session.commit()
+    db.session.add_all([PlayerRating(player_id=p.id, rating=1500 + i) for i, p in enumerate(players)])
+    db.session.commit()
+
+    assert _count_statements(lambda: client.get('/api/ratings/leaderboard')) == 1
+    assert client.get('/api/ratings/leaderboard').get_json()['players'][0]['nickname'] == 'Rated4'
+
+def test_recalculate_mode_ratings_matches_auto_calculation(client):
+    """Test the set-based per-mode recalculation agrees with calculate_auto_ratings and keeps admin tiers"""
+    from models import GameMode, PlayerGameRating
+    players = [Player(nickname=f"ModePlayer{i}", kills=i * 3000, deaths=1000, beds_broken=i * 400,
+                      wins=i * 100, games_played=1000) for i in range(1, 5)]
+    db.session.add_all(players)
+    db.session.commit()
+    from seeds import seed
+    seed('game_modes')
+    mode = GameMode.query.filter_by(name='solo').first()
+    manual = PlayerGameRating(player_id=players[0].id, game_mode_id=mode.id, kd_rating='S+',
+                              kills_rating='S+', objective_rating='S+', efficiency_rating='S+',
+                              last_evaluated_by='admin')
+    manual.update_overall_rating()
+    db.session.add(manual)
+    db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    response = client.post(f'/admin/game_modes/{mode.id}/recalculate')
+    assert response.get_json()['success'] is True
+
+    db.session.expire_all()
+    for player in players[1:]:
+        stored = PlayerGameRating.query.filter_by(player_id=player.id, game_mode_id=mode.id).one()
+        expected = PlayerGameRating(mode_kills=stored.mode_kills, mode_objectives=stored.mode_objectives,
+                                    mode_kd_ratio=player.kd_ratio, mode_win_rate=player.win_rate)
+        expected.calculate_auto_ratings()
+        assert (stored.kd_rating, stored.kills_rating, stored.overall_rating, stored.overall_score) == \
+               (expected.kd_rating, expected.kills_rating, expected.overall_rating, expected.overall_score)
+    assert db.session.get(PlayerGameRating, manual.id).overall_rating == 'S+'
+
+    leaderboard = client.get(f'/api/leaderboard/mode/{mode.id}').get_json()
+    assert leaderboard['players'][0]['player_id'] == players[0].id
+    # The mode and one page query, players joined in
+    db.session.expire_all()
+    assert _count_statements(lambda: client.get(f'/api/leaderboard/mode/{mode.id}')) == 2
+    assert client.get(f'/api/player/{players[1].id}/rating/{mode.id}').get_json()['success'] is True
+
+def test_export_streams_filtered_csv(client):
+    """Test /export streams a filtered, sorted CSV and can gzip it"""
+    import csv
+    import gzip
+    db.session.add_all([
+        Player(nickname="Exporter1", kills=50, deaths=10, games_played=20, server_ip="mc.one"),
+        Player(nickname="Exporter2", kills=90, deaths=0, games_played=5, server_ip="mc.one"),
+        Player(nickname="Exporter3", kills=70, deaths=7, games_played=30, server_ip="mc.two"),
+    ])
+    db.session.commit()
+
+    response = client.get('/export?sort=kills&server_ip=mc.one')
+    assert response.is_streamed
+    rows = list(csv.reader(response.get_data(as_text=True).splitlines()))
+    assert [row[0] for row in rows[1:]] == ["Exporter2", "Exporter1"]
+    assert rows[1][6] == '90'  # K/D with zero deaths follows Player.kd_ratio
+
+    response = client.get('/export?min_games=10&gzip=1')
+    rows = list(csv.reader(gzip.decompress(response.get_data()).decode('utf-8').splitlines()))
+    assert sorted(row[0] for row in rows[1:]) == ["Exporter1", "Exporter3"]
+
+def test_export_database_streams_every_table(client, sample_player):
+    """Test the NDJSON backup covers all tables and can resume after a given row"""
+    import json
+    from models import Quest
+    extra = Player(nickname="BackupPlayer")
+    db.session.add(extra)
+    db.session.add(Quest(title="Backup quest", description="d", type="kills", target_value=1))
+    db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    response = client.get('/admin/export-db')
+    assert response.is_streamed
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert records[0]['type'] == 'header' and records[-1]['type'] == 'end'
+    ended = {r['table'] for r in records if r.get('type') == 'table_end'}
+    assert ended == {name for name, table in db.metadata.tables.items() if not table.info.get('derived')}
+    assert {r['row']['nickname'] for r in records if r.get('table') == 'player' and 'row' in r} == \
+           {"TestPlayer", "BackupPlayer"}
+
+    response = client.get(f'/admin/export-db?resume_table=player&resume_id={sample_player.id}')
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    player_rows = [r['row']['nickname'] for r in records if r.get('table') == 'player' and 'row' in r]
+    assert player_rows == ["BackupPlayer"]
+    assert not any(r.get('table') == 'quest' for r in records)
+
+def test_import_database_round_trip(client):
+    """Test an NDJSON backup restores with remapped foreign keys and skips existing rows on re-import"""
+    import io
+    from models import Clan, ClanMember, Quest, Achievement
+    from seeds import seed
+    seed('quests')
+    seed('achievements')
+    leader = Player(nickname="ImportLeader", kills=10)
+    member = Player(nickname="ImportMember", kills=5)
+    db.session.add_all([leader, member])
+    db.session.commit()
+    clan = _make_clan(leader, "Importers", "IMP")
+    # An earlier membership the member left must not hide the active one
+    db.session.add(ClanMember(clan_id=clan.id, player_id=member.id, role='member', is_active=False))
+    db.session.add(ClanMember(clan_id=clan.id, player_id=member.id, role='member'))
+    db.session.commit()
+    quests, achievements = Quest.query.count(), Achievement.query.count()
+    assert quests and achievements
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    backup = client.get('/admin/export-db?gzip=1').get_data()
+
+    client.post('/admin/import-db', data={'database_file': (io.BytesIO(backup), 'backup.ndjson.gz'),
+                                          'clear_existing': 'on'}, content_type='multipart/form-data')
+    db.session.expire_all()
+    restored = Clan.query.filter_by(name="Importers").one()
+    assert restored.leader.nickname == "ImportLeader"
+    assert sorted(m.player.nickname for m in restored.members if m.is_active) == ["ImportLeader", "ImportMember"]
+
+    client.post('/admin/import-db', data={'database_file': (io.BytesIO(backup), 'backup.ndjson.gz')},
+                content_type='multipart/form-data')
+    with client.session_transaction() as sess:
+        assert sess['_flashes'][-1][0] == 'success'
+    assert Player.query.count() == 2
+    assert ClanMember.query.filter_by(is_active=True).count() == 2
+    assert (Quest.query.count(), Achievement.query.count()) == (quests, achievements)
+
+def test_columnar_snapshot_round_trip(client):
+    """Test a columnar snapshot restores rows with nulls, dates and ids intact"""
+    import io
+    player = Player(nickname="SnapshotPlayer", kills=42, real_name="Снимок", skin_url=None)
+    db.session.add(player)
+    db.session.commit()
+    player_id, created_at = player.id, player.created_at
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    snapshot = client.get('/admin/snapshot?columnar=1').get_data()
+    Player.query.delete()
+    db.session.commit()
+
+    client.post('/admin/snapshot/restore', data={'snapshot_file': (io.BytesIO(snapshot), 'db.bwsnap')},
+                content_type='multipart/form-data')
+    db.session.expire_all()
+    restored = Player.query.filter_by(nickname="SnapshotPlayer").one()
+    assert (restored.id, restored.kills, restored.real_name, restored.skin_url) == (player_id, 42, "Снимок", None)
+    assert restored.created_at == created_at
+
+def test_ingest_matches_applies_batch_once(client, monkeypatch):
+    """Test ingested match deltas are summed per player, credited to clans and deduplicated"""
+    from models import Clan
+    monkeypatch.setenv('INGEST_TOKENS', 'lobby:s3cret')
+    veteran = Player(nickname="IngestVeteran", kills=10, deaths=10)
+    db.session.add(veteran)
+    db.session.commit()
+    clan = _make_clan(veteran, "Ingesters", "ING")
+
+    batch = {'matches': [
+        {'match_id': 'm1', 'players': [{'nickname': 'IngestVeteran', 'kills': 3, 'deaths': 1, 'win': True},
+                                       {'nickname': 'IngestRookie', 'kills': 1, 'beds_broken': 1}]},
+        {'match_id': 'm2', 'players': [{'nickname': 'IngestVeteran', 'kills': 2, 'final_kills': 1}]},
+    ]}
+    assert client.post('/api/ingest/matches', json=batch).status_code == 401
+    headers = {'Authorization': 'Bearer s3cret'}
+    response = client.post('/api/ingest/matches', json=batch, headers=headers)
+    assert response.get_json()['accepted'] == 2
+    assert response.get_json()['created'] == 1
+
+    db.session.expire_all()
+    veteran = Player.query.filter_by(nickname="IngestVeteran").one()
+    assert (veteran.kills, veteran.deaths, veteran.games_played, veteran.wins) == (15, 11, 2, 1)
+    assert veteran.experience == veteran.calculate_auto_experience()
+    assert db.session.get(Clan, clan.id).total_kills == 15
+    assert Player.query.filter_by(nickname="IngestRookie").one().beds_broken == 1
+
+    response = client.post('/api/ingest/matches', json=batch, headers=headers)
+    assert response.get_json()['duplicates'] == 2
+    db.session.expire_all()
+    assert Player.query.filter_by(nickname="IngestVeteran").one().kills == 15
+
+def test_match_facts_rebuild_player_totals(client, monkeypatch):
+    """Test every counter change leaves a fact and drifted totals are rebuilt from facts"""
+    from models import MatchParticipation
+    monkeypatch.setenv('INGEST_TOKENS', 's3cret')
+    player = Player(nickname="FactPlayer", kills=7)
+    db.session.add(player)
+    db.session.commit()
+
+    client.post('/api/ingest/matches', headers={'X-Server-Token': 's3cret'}, json={'matches': [
+        {'match_id': 'f1', 'mode': 'solo', 'players': [{'nickname': 'FactPlayer', 'kills': 4, 'win': True}]}
+    ]})
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    client.post(f'/modify/{player.id}', data={'operation': 'subtract', 'kills': 2})
+    sources = [f.source for f in MatchParticipation.query.filter_by(player_id=player.id).order_by('id')]
+    assert sources == ['baseline', 'match', 'adjustment']
+
+    db.session.execute(db.text("UPDATE player SET kills = 0, wins = 5 WHERE id = :id"), {'id': player.id})
+    db.session.commit()
+    response = client.post('/admin/rebuild_player_totals')
+    assert response.get_json()['fixed'] == 1
+    db.session.expire_all()
+    player = db.session.get(Player, player.id)
+    assert (player.kills, player.wins, player.games_played) == (9, 1, 1)
+
+def test_deleting_players_removes_their_facts(client):
+    """Test /delete and /clear remove only per-player rows and never rewrite clans or tournaments"""
+    from datetime import date, datetime
+    from models import (MatchParticipation, PlayerStatSnapshot, LeaderboardRow, Clan, ClanMember,
+                        Tournament, TournamentParticipant)
+    leader = Player(nickname="FactLeader", kills=3)
+    officer = Player(nickname="FactOfficer", kills=2)
+    member = Player(nickname="FactMember", kills=5)
+    db.session.add_all([leader, officer, member])
+    db.session.commit()
+    clan = Clan(name="FactClan", tag="FCT", leader_id=leader.id)
+    db.session.add(clan)
+    db.session.commit()
+    db.session.add_all([ClanMember(clan_id=clan.id, player_id=leader.id, role='leader'),
+                        ClanMember(clan_id=clan.id, player_id=member.id),
+                        ClanMember(clan_id=clan.id, player_id=officer.id, role='officer')])
+    db.session.add(PlayerStatSnapshot(player_id=member.id, day=date.today(), kills=5))
+    tournament = Tournament(name="FactCup", start_date=datetime.utcnow(), organizer_id=officer.id)
+    db.session.add(tournament)
+    db.session.commit()
+    member_id, leader_id, officer_id, clan_id = member.id, leader.id, officer.id, clan.id
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    client.post(f'/delete/{member_id}')
+    db.session.expire_all()
+    assert db.session.get(Clan, clan_id).member_count == 2
+    assert db.session.get(Clan, clan_id).total_kills == 5
+    assert not MatchParticipation.query.filter_by(player_id=member_id).count()
+    assert not PlayerStatSnapshot.query.filter_by(player_id=member_id).count()
+
+    # Leadership passes to the officer; the clan and its other memberships stay
+    client.post(f'/delete/{leader_id}')
+    db.session.expire_all()
+    assert db.session.get(Player, leader_id) is None
+    assert db.session.get(Clan, clan_id).leader_id == officer_id
+    assert ClanMember.query.filter_by(player_id=officer_id).one().role == 'leader'
+
+    # The organizer of a tournament stays, and so does everything while it exists
+    client.post(f'/delete/{officer_id}')
+    client.post('/clear')
+    db.session.expire_all()
+    assert db.session.get(Player, officer_id) is not None
+    assert Tournament.query.count() == 1
+
+    db.session.delete(db.session.get(Tournament, tournament.id))
+    db.session.delete(db.session.get(Clan, clan_id))
+    db.session.commit()
+    client.post('/clear')
+    assert Player.query.count() == 0
+    for model in (MatchParticipation, LeaderboardRow, ClanMember, TournamentParticipant):
+        assert model.query.count() == 0
+
+def test_stat_snapshots_track_changes_and_downsample(client):
+    """Test snapshots only cover changed players and old daily points thin out to weekly"""
+    from datetime import date, timedelta
+    from models import PlayerStatSnapshot
+    from stat_snapshots import take_daily_snapshot, downsample
+    active = Player(nickname="SnapActive", experience=100)
+    idle = Player(nickname="SnapIdle", experience=50)
+    db.session.add_all([active, idle])
+    db.session.commit()
+
+    start = date.today() - timedelta(days=70)
+    start -= timedelta(days=start.weekday())  # a Monday
+    assert take_daily_snapshot(start) == 2
+    for offset in range(1, 7):
+        active.experience += 10
+        db.session.commit()
+        assert take_daily_snapshot(start + timedelta(days=offset)) == 1
+
+    assert downsample() == 6
+    db.session.commit()
+    week = PlayerStatSnapshot.query.filter_by(player_id=active.id).all()
+    assert [(s.day, s.resolution, s.experience) for s in week] == [(start + timedelta(days=6), 'week', 160)]
+
+    response = client.get(f'/api/player/{active.id}/history?metric=experience&range=all')
+    assert response.get_json()['points'] == [
+        {'date': (start + timedelta(days=6)).isoformat(), 'value': 160, 'resolution': 'week'}]
+    assert client.get(f'/api/player/{active.id}/history?metric=password').status_code == 400
+
+    active_id = active.id
+    db.session.delete(active)
+    db.session.commit()
+    assert PlayerStatSnapshot.query.filter_by(player_id=active_id).count() == 0
+
+def test_windowed_leaderboard_ranks_recent_gains(client, monkeypatch):
+    """Test ?window= ranks materialized stat gains, not lifetime totals"""
+    from datetime import datetime, timedelta
+    from leaderboard_windows import refresh_windows, window_leaderboard
+    monkeypatch.setenv('INGEST_TOKENS', 's3cret')
+    db.session.add(Player(nickname="WindowVeteran", kills=5000, experience=900000))
+    db.session.commit()
+    refresh_windows()
+    assert 'нет результатов матчей' in client.get('/?window=7d').get_data(as_text=True)
+
+    old = (datetime.utcnow() - timedelta(days=3)).isoformat()
+    client.post('/api/ingest/matches', headers={'X-Server-Token': 's3cret'}, json={'matches': [
+        {'match_id': 'w1', 'played_at': old, 'players': [{'nickname': 'WindowVeteran', 'kills': 1},
+                                                         {'nickname': 'WindowRookie', 'kills': 2}]},
+        {'match_id': 'w2', 'players': [{'nickname': 'WindowRookie', 'kills': 6, 'win': True}]},
+    ]})
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    veteran = Player.query.filter_by(nickname="WindowVeteran").one()
+    # An admin adjustment is recorded as a fact but is not a gain
+    client.post(f'/modify/{veteran.id}', data={'operation': 'add', 'kills': 50}, follow_redirects=True)
+    counts = refresh_windows()
+    assert (counts['24h'], counts['7d']) == (1, 2)
+
+    rookie = Player.query.filter_by(nickname="WindowRookie").one()
+    week = window_leaderboard('7d', sort_by='kills')
+    assert [(row.player_id, row.kills) for row in week] == [(rookie.id, 8), (veteran.id, 1)]
+    assert week[0].experience == 8 * 15 + 300 + 2 * 40
+
+    response = client.get('/?window=24h&sort=kills')
+    assert response.status_code == 200
+    assert b'WindowRookie' in response.data and b'WindowVeteran' not in response.data
+    assert client.get('/?window=1y').status_code == 400
+
+def test_api_leaderboard_conditional_get(client, sample_player):
+    """Test unchanged polls get 304 and any write changes the ETag"""
+    first = client.get('/api/leaderboard?limit=10')
+    etag = first.headers['ETag']
+    assert 'stale-while-revalidate' in first.headers['Cache-Control']
+
+    assert client.get('/api/leaderboard?limit=10', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/leaderboard?limit=20', headers={'If-None-Match': etag}).status_code == 200
+
+    # Lazily created defaults (profile view) and bulk statements that match nothing are not writes
+    from data_version import current
+    from models import ASCENDData
+    client.get(f'/player/{sample_player.id}')
+    client.get(f'/api/player/{sample_player.id}/ascend-data')
+    Player.query.filter(Player.nickname == 'Nobody').update({'kills': 0})
+    db.session.commit()
+    assert ASCENDData.query.filter_by(player_id=sample_player.id).count() == 1
+    assert client.get('/api/leaderboard?limit=10', headers={'If-None-Match': etag}).status_code == 304
+    version = current()[0]
+
+    sample_player.kills += 1
+    db.session.commit()
+    assert current()[0] == version + 1
+    assert client.get('/api/leaderboard?limit=10', headers={'If-None-Match': etag}).status_code == 200
+
+def test_page_cache_shared_between_visitors(client, sample_player):
+    """Test anonymous and logged-in visitors share a cached page until the next write"""
+    assert client.get('/statistics?x=').headers['X-Page-Cache'] == 'MISS'
+    assert client.get('/statistics').headers['X-Page-Cache'] == 'HIT'
+
+    with client.session_transaction() as sess:
+        sess['player_nickname'] = 'TestPlayer'
+    response = client.get('/statistics')
+    assert response.headers['X-Page-Cache'] == 'HIT'
+    assert b'window.currentPlayer' in response.data and b'fa-sign-in-alt' not in response.data
+
+    sample_player.wins += 1
+    db.session.commit()
+    assert client.get('/statistics').headers['X-Page-Cache'] == 'MISS'
+    assert 'X-Page-Cache' not in client.get('/clans').headers
+
+def test_fragment_cache_follows_player_version(client, sample_player):
+    """Test cached leaderboard rows are re-rendered when stats or roles change"""
+    from models import AdminCustomRole, PlayerAdminRole
+    import fragment_cache
+    app.config['PAGE_CACHE_DISABLED'] = True
+    try:
+        first = fragment_cache.leaderboard_row_html(sample_player)
+        assert fragment_cache.leaderboard_row_html(sample_player) is first
+
+        role = AdminCustomRole(name='Moderator')
+        db.session.add(role)
+        db.session.flush()
+        db.session.add(PlayerAdminRole(player_id=sample_player.id, role_id=role.id))
+        db.session.commit()
+        assert sample_player.render_version == 1
+        assert b'Moderator' in client.get('/').data
+        assert 'Moderator' in fragment_cache.role_html(sample_player)
+        assert fragment_cache.nickname_html(sample_player) is fragment_cache.nickname_html(sample_player)
+
+        role.name = 'Helper'
+        db.session.commit()
+        assert sample_player.render_version == 2
+        assert b'Helper' in client.get('/').data
+        assert 'Helper' in fragment_cache.role_html(sample_player)
+
+        sample_player.kills = 4321
+        db.session.commit()
+        assert '4321' in fragment_cache.leaderboard_row_html(sample_player)
+    finally:
+        app.config['PAGE_CACHE_DISABLED'] = False
+
+def test_leaderboard_rows_follow_writes(client, sample_player):
+    """Test the denormalized leaderboard rows track ORM, bulk and ingest writes"""
+    from models import LeaderboardRow, AdminCustomRole, PlayerAdminRole
+    row = db.session.get(LeaderboardRow, sample_player.id)
+    assert (row.kills, row.kd_ratio, row.level) == (100, 2.0, sample_player.level)
+
+    sample_player.deaths = 25
+    role = AdminCustomRole(name='Builder', color='#00ff00')
+    db.session.add(role)
+    db.session.flush()
+    db.session.add(PlayerAdminRole(player_id=sample_player.id, role_id=role.id))
+    db.session.commit()
+    row = db.session.get(LeaderboardRow, sample_player.id)
+    assert (row.kd_ratio, row.display_role, row.role_color) == (4.0, 'Builder', '#00ff00')
+    assert b'style="color: #00ff00"' in client.get('/').data
+    assert client.get('/api/leaderboard').get_json()['players'][0]['role_color'] == '#00ff00'
+
+    # Bulk edits of a shared definition reach the rows of its holders
+    AdminCustomRole.query.filter_by(name='Builder').update({'color': '#0000ff'})
+    db.session.commit()
+    db.session.expire_all()
+    row = db.session.get(LeaderboardRow, sample_player.id)
+    assert (row.role_color, row.render_version) == ('#0000ff', db.session.get(Player, sample_player.id).render_version)
+
+    PlayerAdminRole.query.filter_by(player_id=sample_player.id).update({'is_active': False})
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(LeaderboardRow, sample_player.id).display_role == sample_player.role
+
+    from ingest import ingest_matches
+    ingest_matches([{'match_id': 'row-1', 'players': [{'nickname': 'NewcomerRow', 'kills': 3, 'win': True}]}])
+    db.session.commit()
+    data = client.get('/api/leaderboard?sort=kills').get_json()
+    assert [p['nickname'] for p in data['players']] == ['TestPlayer', 'NewcomerRow']
+
+    newcomer = Player.query.filter_by(nickname='NewcomerRow').one()
+    db.session.delete(newcomer)
+    db.session.commit()
+    assert db.session.get(LeaderboardRow, newcomer.id) is None
+
+def test_hashed_assets_and_compression(client):
+    """Test static URLs are fingerprinted and served precompressed with immutable caching"""
+    import gzip
+    import re
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    html = gzip.decompress(response.data).decode('utf-8')
+    css_url = re.search(r'/static/dist/css/style\.[0-9a-f]+\.css', html).group(0)
+
+    asset = client.get(css_url, headers={'Accept-Encoding': 'gzip'})
+    assert asset.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in asset.headers['Cache-Control']
+    assert b'{' in gzip.decompress(asset.data) and b'/*' not in gzip.decompress(asset.data)
+    asset.close()
+
+def test_emoji_uploads_deduplicated(client):
+    """Test identical emoji uploads render from one fingerprinted file"""
+    import os
+    import re
+    from emoji_sprites import build_sprites, STATIC_DIR
+    from models import AdminCustomRole
+    names = sorted(os.listdir(os.path.join(STATIC_DIR, 'emojis')))[:2]
+    if len(names) < 2:
+        pytest.skip('needs two uploaded emojis')
+    built = build_sprites()
+    if built['emojis'][names[0]] != built['emojis'][names[1]]:
+        pytest.skip('uploaded emojis differ')
+
+    first = AdminCustomRole(name='a', emoji_url=f'/static/emojis/{names[0]}').display_emoji
+    second = AdminCustomRole(name='b', emoji_url=f'/static/emojis/{names[1]}').display_emoji
+    assert first == second
+    url = re.search(r'src="([^"]+)"', first)
+    if url:
+        assert url.group(1).startswith('/static/dist/emojis/')
+        response = client.get(url.group(1))
+        assert response.status_code == 200
+        assert 'immutable' in response.headers['Cache-Control']
+        response.close()
+
+def test_migrations_versioned_and_adopt_legacy_schema(client, monkeypatch):
+    """Test migrations apply once, adopt older databases and stop the boot when they fail"""
+    import migrations
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.exc import IntegrityError
+    from migrations import upgrade, current_version, baseline_schema, unique_indexes, LATEST_VERSION
+    assert upgrade() == []
+    assert current_version() == LATEST_VERSION
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        # Tables from the old boot, created before their uniqueness was enforced
+        connection.execute(text('CREATE TABLE tournament_participant '
+                                '(id INTEGER PRIMARY KEY, tournament_id INTEGER, player_id INTEGER)'))
+        connection.execute(text('CREATE TABLE clan_member '
+                                '(id INTEGER PRIMARY KEY, clan_id INTEGER, player_id INTEGER, is_active BOOLEAN)'))
+        baseline_schema(connection)
+        connection.execute(text('ALTER TABLE player DROP COLUMN render_version'))
+        baseline_schema(connection)
+        assert 'render_version' in {c['name'] for c in inspect(connection).get_columns('player')}
+
+        connection.execute(text('INSERT INTO tournament_participant (tournament_id, player_id) '
+                                'VALUES (1, 1), (1, 1), (1, 2)'))
+        connection.execute(text('INSERT INTO clan_member (clan_id, player_id, is_active) '
+                                'VALUES (1, 1, 1), (2, 1, 1), (2, 2, 1)'))
+        unique_indexes(connection)
+        assert connection.execute(text('SELECT count(*) FROM tournament_participant')).scalar() == 2
+        assert connection.execute(text('SELECT clan_id FROM clan_member WHERE player_id = 1 AND is_active')).all() == [(2,)]
+        inspector = inspect(connection)
+        assert 'uq_tournament_participant' in {i['name'] for i in inspector.get_indexes('tournament_participant')}
+        assert 'uq_clan_member_active_player' in {i['name'] for i in inspector.get_indexes('clan_member')}
+    with engine.connect() as connection:
+        with pytest.raises(IntegrityError):
+            connection.execute(text('INSERT INTO tournament_participant (tournament_id, player_id) VALUES (1, 1)'))
+        connection.execute(text('INSERT INTO clan_member (clan_id, player_id, is_active) VALUES (3, 2, 0)'))
+        with pytest.raises(IntegrityError):
+            connection.execute(text('INSERT INTO clan_member (clan_id, player_id, is_active) VALUES (3, 2, 1)'))
+    engine.dispose()
+
+    # Tables dropped behind the version rows are recreated and reseeded
+    from models import GameMode
+    GameMode.__table__.drop(bind=db.engine)
+    assert upgrade() == ['baseline_schema']
+    assert GameMode.query.count() > 0
+    assert upgrade() == []
+
+    def broken():
+        raise RuntimeError('migration failed')
+    monkeypatch.setattr(migrations, 'upgrade', broken)
+    monkeypatch.setenv('MIGRATE_ON_STARTUP', '1')
+    with pytest.raises(RuntimeError):
+        migrations.upgrade_on_startup()
+
+def test_frozen_migrations_match_the_models(client):
+    """Test the data migrations' frozen formulas give what the live models compute"""
+    from sqlalchemy import select
+    from migrations import ascend_defaults, leaderboard_rows
+    from models import ASCENDData, LeaderboardRow
+    veteran = Player(nickname='FrozenVeteran', experience=13117500 + 100 * 2500 + 1200, kills=30, deaths=0,
+                     wins=3, games_played=10, beds_broken=4, final_kills=7)
+    rookie = Player(nickname='FrozenRookie')
+    db.session.add_all([veteran, rookie])
+    db.session.commit()
+    assert veteran.level == 200
+
+    connection = db.session.connection()
+    rows = LeaderboardRow.__table__
+    before = [dict(row) for row in connection.execute(select(rows).order_by(rows.c.player_id)).mappings()]
+    leaderboard_rows(connection)
+    after = [dict(row) for row in connection.execute(select(rows).order_by(rows.c.player_id)).mappings()]
+    assert after == before
+
+    ascend_defaults(connection)
+    cards = {card.player_id: card for card in ASCENDData.query.filter(
+        ASCENDData.player_id.in_([veteran.id, rookie.id]))}
+    assert cards[veteran.id].comment.startswith('Legendary player')
+    assert cards[rookie.id].comment.startswith('New player')
+    assert cards[rookie.id].overall_tier == 'D' and cards[rookie.id].evaluator_name == 'Elite Squad'
+    db.session.rollback()
+
+def test_seeding_gated_by_checksum(client):
+    """Test default data is bulk inserted once and skipped while the seed files are unchanged"""
+    from sqlalchemy import update
+    from models import ShopItem
+    from seeds import seed_all, pending, seed_checksum, load
+    seed_all(force=True)
+    assert ShopItem.query.count() == len(load('shop_items'))
+    assert pending() == [] and seed_all() == {}
+
+    ShopItem.query.filter_by(name=load('shop_items')[0]['name']).delete()
+    db.session.execute(update(seed_checksum).where(seed_checksum.c.name == 'shop_items').values(checksum='stale'))
+    db.session.commit()
+    assert pending() == ['shop_items']
+    assert seed_all() == {'shop_items': 1}
+    assert ShopItem.query.count() == len(load('shop_items'))
+
+def test_app_import_defers_views(tmp_path):
+    """Test importing the app leaves the view modules to the first request"""
+    import subprocess
+    code = ("import sys, app; print('routes' in sys.modules); "
+            "app.app.test_client().get('/'); print('routes' in sys.modules)")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'views.db'}", PAGE_CACHE_DISABLED='1')
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', 'True']
+
+def test_engine_profiles(monkeypatch):
+    """Test engine options follow the backend and the pool sizing environment"""
+    from engine_profiles import engine_options, profile_for, LEGACY_OPTIONS, _sqlite_pragmas
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    monkeypatch.setenv('GUNICORN_THREADS', '4')
+    monkeypatch.setenv('DB_MAX_CONNECTIONS', '20')
+    options = engine_options('postgresql://user@host/db')
+    assert (options['pool_size'], options['max_overflow']) == (5, 0)
+    assert options['connect_args'] == {'options': '-c statement_timeout=30000'}
+
+    assert engine_options('sqlite://') == {}
+    assert engine_options('sqlite:////tmp/app.db')['pool_size'] == 8
+    for profile in ('sqlite', 'sqlite-safe'):
+        assert 'PRAGMA foreign_keys=ON' in _sqlite_pragmas(profile)
+    monkeypatch.setenv('DB_PROFILE', 'legacy')
+    assert engine_options('sqlite:////tmp/app.db') == LEGACY_OPTIONS
+    monkeypatch.setenv('DB_PROFILE', 'mysql-turbo')
+    with pytest.raises(ValueError):
+        profile_for('sqlite:////tmp/app.db')
+
 # Performance test
 def test_index_page_performance(client):
     """Test that main page loads reasonably fast"""
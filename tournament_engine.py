@@ -0,0 +1,373 @@
+"""
+Tournament bracket and seeding engine.
+
+Supports single elimination, double elimination and Swiss. Elimination brackets
+are described by a static skeleton of matches whose two slots are fed either by
+a seed or by the winner/loser of an earlier match; the current bracket state is
+always re-derived from (seeds, recorded winners), so corrections to a result
+propagate automatically. Everything is O(matches) in plain Python, which keeps
+seeding and round generation for 1,000+ participants in the low milliseconds.
+"""
+
+import math
+from collections import namedtuple, defaultdict
+from datetime import datetime
+
+from sqlalchemy import insert, update
+
+from app import db
+from models import Player, PlayerRating, TournamentParticipant, TournamentMatch
+from rating_engine import DEFAULT_RATING
+
+FORMATS = ('single_elimination', 'double_elimination', 'swiss')
+SEED_STATS = ('experience', 'kd_ratio', 'rating')
+
+# Default prize shares for 1st, 2nd, 3rd place; tied placements split their shares
+PRIZE_SHARES = (0.5, 0.3, 0.2)
+
+VOID = 0  # empty slot (bye); real player ids are always positive
+
+MatchSpec = namedtuple('MatchSpec', 'key source1 source2')
+
+
+def _seed_order_by(seed_by):
+    """ORDER BY clause for a seeding stat, served by the player leaderboard indexes"""
+    if seed_by == 'kd_ratio':
+        return (db.cast(Player.kills, db.Float) /
+                db.case((Player.deaths > 0, Player.deaths), else_=1)).desc()
+    if seed_by == 'rating':
+        # Glicko-2 match rating; players without rated matches sit at the starting rating
+        return db.func.coalesce(PlayerRating.rating, DEFAULT_RATING).desc()
+    return Player.experience.desc()
+
+
+def seed_positions(size):
+    """Bracket order of seeds (1-based) so that seeds 1 and 2 can only meet in the final"""
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def elimination_skeleton(participants, double=False):
+    """Build the list of MatchSpec for an elimination bracket in dependency order"""
+    rounds = max(1, math.ceil(math.log2(max(participants, 2))))
+    size = 2 ** rounds
+    order = seed_positions(size)
+
+    specs = []
+    for slot in range(size // 2):
+        specs.append(MatchSpec(('W', 1, slot), ('seed', order[2 * slot]), ('seed', order[2 * slot + 1])))
+    for rnd in range(2, rounds + 1):
+        for slot in range(size >> rnd):
+            specs.append(MatchSpec(('W', rnd, slot),
+                                   ('winner', ('W', rnd - 1, 2 * slot)),
+                                   ('winner', ('W', rnd - 1, 2 * slot + 1))))
+    if not double:
+        return specs
+
+    # Losers bracket: odd rounds pair up survivors, even rounds take the next
+    # winners-bracket round's losers (in reverse order to postpone rematches)
+    lb_rounds = 2 * (rounds - 1)
+    for rnd in range(1, lb_rounds + 1):
+        count = size >> ((rnd + 1) // 2 + 1)
+        for slot in range(count):
+            if rnd == 1:
+                sources = ('loser', ('W', 1, 2 * slot)), ('loser', ('W', 1, 2 * slot + 1))
+            elif rnd % 2 == 0:
+                sources = ('winner', ('L', rnd - 1, slot)), ('loser', ('W', rnd // 2 + 1, count - 1 - slot))
+            else:
+                sources = ('winner', ('L', rnd - 1, 2 * slot)), ('winner', ('L', rnd - 1, 2 * slot + 1))
+            specs.append(MatchSpec(('L', rnd, slot), *sources))
+
+    # Grand final; if the losers-bracket champion wins it, both players have one
+    # loss and the conditional reset match (F, 2) decides the title
+    challenger = ('winner', ('L', lb_rounds, 0)) if lb_rounds else ('loser', ('W', rounds, 0))
+    specs.append(MatchSpec(('F', 1, 0), ('winner', ('W', rounds, 0)), challenger))
+    specs.append(MatchSpec(('F', 2, 0), ('reset', ('F', 1, 0)), ('reset', ('F', 1, 0))))
+    return specs
+
+
+def _bracket_reset(final, recorded):
+    """Outcome of the reset match from the first grand final's outcome.
+
+    Not needed (no players, the first final's result carried over) when the
+    winners-bracket champion won; otherwise a rematch between the same players.
+    """
+    player1, player2, winner, loser = final
+    if winner is None:
+        return None, None, None, None
+    if winner == player1 or loser == VOID:
+        return VOID, VOID, winner, loser
+    if recorded in (player1, player2):
+        return player1, player2, recorded, (player2 if recorded == player1 else player1)
+    return player1, player2, None, None
+
+
+def resolve_bracket(specs, seeds, results):
+    """Derive every match's players from seeds and recorded winners.
+
+    seeds lists player ids by seed (index 0 is seed 1); results maps match key to
+    winner id. Returns key -> (player1, player2, winner, loser) where None means
+    not decided yet and VOID marks a bye. Byes advance automatically; a stored
+    winner that is no longer one of the match's players is ignored.
+    """
+    state = {}
+
+    def value(source):
+        kind, ref = source
+        if kind == 'seed':
+            return seeds[ref - 1] if ref <= len(seeds) else VOID
+        outcome = state[ref]
+        return outcome[2] if kind == 'winner' else outcome[3]
+
+    for spec in specs:
+        if spec.source1[0] == 'reset':
+            state[spec.key] = _bracket_reset(state[spec.source1[1]], results.get(spec.key))
+            continue
+        player1, player2 = value(spec.source1), value(spec.source2)
+        winner = loser = None
+        if player1 is not None and player2 is not None:
+            if player1 == VOID or player2 == VOID:
+                winner, loser = (player2 if player1 == VOID else player1), VOID
+            else:
+                recorded = results.get(spec.key)
+                if recorded in (player1, player2):
+                    winner, loser = recorded, (player2 if recorded == player1 else player1)
+        state[spec.key] = (player1, player2, winner, loser)
+    return state
+
+
+def elimination_placements(specs, state, double=False):
+    """Return player_id -> placement, or None while the bracket is unfinished.
+
+    Players knocked out in the same round share a placement (e.g. both losing
+    semi-finalists are 3rd in single elimination).
+    """
+    final_key = specs[-1].key
+    champion = state[final_key][2]
+    if champion in (None, VOID):
+        return None
+
+    phases = defaultdict(list)
+    phase_order = []
+    for spec in specs:
+        bracket, rnd, _ = spec.key
+        if double and (bracket == 'W' or spec.key == ('F', 1, 0)):
+            continue  # Losers drop to the losers bracket / the reset match settles the final
+        if (bracket, rnd) not in phases:
+            phase_order.append((bracket, rnd))
+        phases[(bracket, rnd)].append(spec.key)
+
+    remaining = len({p for outcome in state.values() for p in outcome[:2] if p not in (None, VOID)})
+    placements = {}
+    for phase in phase_order:
+        losers = [state[key][3] for key in phases[phase] if state[key][3] not in (None, VOID)]
+        for loser in losers:
+            placements[loser] = remaining - len(losers) + 1
+        remaining -= len(losers)
+    placements[champion] = 1
+    return placements
+
+
+def swiss_pairings(standings, played, had_bye):
+    """Pair players with equal or nearest scores, avoiding rematches greedily.
+
+    standings is a list of player ids best-first; played is a set of frozenset
+    pairs already met; had_bye is the set of players who already got a bye.
+    Returns (pairs, bye_player).
+    """
+    pool = list(standings)
+    bye = None
+    if len(pool) % 2:
+        bye = next((p for p in reversed(pool) if p not in had_bye), pool[-1])
+        pool.remove(bye)
+
+    pairs = []
+    while pool:
+        player = pool.pop(0)
+        partner = next((i for i, other in enumerate(pool) if frozenset((player, other)) not in played), 0)
+        pairs.append((player, pool.pop(partner)))
+    return pairs, bye
+
+
+def swiss_standings(seeds, matches):
+    """Return (standings, points) ordered by points, Buchholz, then seed"""
+    points = {player_id: 0 for player_id in seeds}
+    opponents = defaultdict(list)
+    for match in matches:
+        if match.winner_id:
+            points[match.winner_id] = points.get(match.winner_id, 0) + 1
+        if match.player1_id and match.player2_id:
+            opponents[match.player1_id].append(match.player2_id)
+            opponents[match.player2_id].append(match.player1_id)
+
+    seed_rank = {player_id: index for index, player_id in enumerate(seeds)}
+    buchholz = {p: sum(points.get(o, 0) for o in opponents[p]) for p in seeds}
+    standings = sorted(seeds, key=lambda p: (-points[p], -buchholz[p], seed_rank[p]))
+    return standings, points
+
+
+def prize_split(prize_pool, placements, shares=PRIZE_SHARES):
+    """Split the prize pool by placement; tied players share the places they occupy"""
+    if not placements:
+        return {}
+    shares = list(shares[:len(placements)])
+    scale = 1 / sum(shares) if shares else 0  # fewer players than paid places: rescale
+
+    by_place = defaultdict(list)
+    for player_id, place in placements.items():
+        by_place[place].append(player_id)
+
+    prizes = {}
+    for place, players in by_place.items():
+        pooled = sum(shares[place - 1:place - 1 + len(players)])
+        amount = int(prize_pool * pooled * scale / len(players))
+        for player_id in players:
+            if amount:
+                prizes[player_id] = amount
+
+    leftover = prize_pool - sum(prizes.values())
+    if leftover > 0 and by_place.get(1):
+        champion = by_place[1][0]
+        prizes[champion] = prizes.get(champion, 0) + leftover
+    return prizes
+
+
+# Database integration
+
+def seed_participants(tournament, seed_by='experience'):
+    """Assign seeds by a player stat in one ordered query; returns player ids by seed"""
+    query = (db.session.query(TournamentParticipant.id, TournamentParticipant.player_id)
+             .join(Player, Player.id == TournamentParticipant.player_id)
+             .filter(TournamentParticipant.tournament_id == tournament.id,
+                     TournamentParticipant.is_active == True))
+    if seed_by == 'rating':
+        query = query.outerjoin(PlayerRating, PlayerRating.player_id == Player.id)
+    rows = query.order_by(_seed_order_by(seed_by), Player.id.asc()).all()
+
+    if rows:
+        db.session.execute(update(TournamentParticipant), [
+            {'id': participant_id, 'seed': seed}
+            for seed, (participant_id, _) in enumerate(rows, 1)
+        ])
+    return [player_id for _, player_id in rows]
+
+
+def _seeded_players(tournament):
+    """Player ids ordered by their stored seed"""
+    return [row.player_id for row in
+            db.session.query(TournamentParticipant.player_id)
+            .filter_by(tournament_id=tournament.id, is_active=True)
+            .filter(TournamentParticipant.seed.isnot(None))
+            .order_by(TournamentParticipant.seed)]
+
+
+def _match_row(tournament_id, key, player1=None, player2=None, winner=None):
+    """Insert parameters for a TournamentMatch row; byes are stored as NULL players"""
+    bracket, rnd, slot = key
+    return {
+        'tournament_id': tournament_id, 'bracket': bracket, 'round': rnd, 'slot': slot,
+        'player1_id': player1 or None, 'player2_id': player2 or None, 'winner_id': winner or None,
+    }
+
+
+def _insert_swiss_round(tournament, rnd, seeds, matches):
+    """Generate and insert one Swiss round from the current standings"""
+    standings, _ = swiss_standings(seeds, matches)
+    played = {frozenset((m.player1_id, m.player2_id)) for m in matches if m.player1_id and m.player2_id}
+    had_bye = {m.player1_id for m in matches if m.player2_id is None}
+    pairs, bye = swiss_pairings(standings, played, had_bye)
+
+    rows = [_match_row(tournament.id, ('S', rnd, slot), p1, p2) for slot, (p1, p2) in enumerate(pairs)]
+    if bye:
+        rows.append(_match_row(tournament.id, ('S', rnd, len(pairs)), bye, None, bye))
+    if rows:
+        db.session.execute(insert(TournamentMatch), rows)
+
+
+def start_tournament(tournament, tournament_format='single_elimination', seed_by='experience'):
+    """Seed participants and generate the opening bracket or Swiss round"""
+    if tournament_format not in FORMATS:
+        raise ValueError(f"Unknown tournament format: {tournament_format}")
+    if seed_by not in SEED_STATS:
+        raise ValueError(f"Unknown seeding stat: {seed_by}")
+
+    TournamentMatch.query.filter_by(tournament_id=tournament.id).delete(synchronize_session=False)
+    seeds = seed_participants(tournament, seed_by)
+    if len(seeds) < 2:
+        raise ValueError("At least two participants are required")
+
+    tournament.format = tournament_format
+    tournament.seed_by = seed_by
+    tournament.status = 'active'
+
+    if tournament_format == 'swiss':
+        tournament.swiss_rounds = tournament.swiss_rounds or math.ceil(math.log2(len(seeds)))
+        _insert_swiss_round(tournament, 1, seeds, [])
+        return
+
+    specs = elimination_skeleton(len(seeds), double=tournament_format == 'double_elimination')
+    state = resolve_bracket(specs, seeds, {})
+    db.session.execute(insert(TournamentMatch), [
+        _match_row(tournament.id, spec.key, *state[spec.key][:3]) for spec in specs
+    ])
+
+
+def _elimination_state(tournament, matches, seeds):
+    """Rebuild the bracket skeleton and resolve it against stored winners"""
+    specs = elimination_skeleton(len(seeds), double=tournament.format == 'double_elimination')
+    results = {(m.bracket, m.round, m.slot): m.winner_id for m in matches if m.winner_id}
+    return specs, resolve_bracket(specs, seeds, results)
+
+
+def record_result(tournament, match, winner_id, score1=None, score2=None):
+    """Record a match result and advance the bracket (or open the next Swiss round)"""
+    if winner_id not in (match.player1_id, match.player2_id) or not winner_id:
+        raise ValueError("Winner must be one of the match players")
+
+    match.winner_id = winner_id
+    match.score1 = score1
+    match.score2 = score2
+    match.completed_at = datetime.utcnow()
+    db.session.flush()
+
+    seeds = _seeded_players(tournament)
+    matches = TournamentMatch.query.filter_by(tournament_id=tournament.id).all()
+
+    if tournament.format == 'swiss':
+        current = [m for m in matches if m.round == match.round]
+        last_round = max(m.round for m in matches)
+        if match.round == last_round < (tournament.swiss_rounds or 0) and all(m.winner_id for m in current):
+            _insert_swiss_round(tournament, last_round + 1, seeds, matches)
+        return
+
+    # Re-derive the whole bracket and write back only rows that changed
+    _, state = _elimination_state(tournament, matches, seeds)
+    changes = []
+    for m in matches:
+        player1, player2, winner, _ = state[(m.bracket, m.round, m.slot)]
+        row = (player1 or None, player2 or None, winner or None)
+        if row != (m.player1_id, m.player2_id, m.winner_id):
+            changes.append({'id': m.id, 'player1_id': row[0], 'player2_id': row[1], 'winner_id': row[2]})
+    if changes:
+        db.session.execute(update(TournamentMatch), changes)
+
+
+def final_placements(tournament):
+    """Return player_id -> placement once the tournament is decided, else None"""
+    seeds = _seeded_players(tournament)
+    matches = TournamentMatch.query.filter_by(tournament_id=tournament.id).all()
+    if not matches:
+        return None
+
+    if tournament.format == 'swiss':
+        rounds_played = max(m.round for m in matches)
+        if rounds_played < (tournament.swiss_rounds or 0) or not all(m.winner_id for m in matches):
+            return None
+        standings, _ = swiss_standings(seeds, matches)
+        return {player_id: place for place, player_id in enumerate(standings, 1)}
+
+    specs, state = _elimination_state(tournament, matches, seeds)
+    return elimination_placements(specs, state, double=tournament.format == 'double_elimination')